@@ -0,0 +1,127 @@
+#analytics.py
+# Dashboard counters kept in the analytics_counters table. The crud write
+# paths apply deltas inside their own transaction, so the admin dashboard
+# reads a handful of small rows instead of running COUNT(*) over the big
+# tables. `python -m app.analytics recompute` rebuilds every counter from
+# scratch to repair drift.
+import argparse
+from collections import Counter
+from sqlalchemy import delete, func, insert, inspect, select, update
+from sqlalchemy.orm import Session
+from . import models
+from .database import SessionLocal, engine
+
+USERS = "users"
+PROPERTIES = "properties"
+TENANTS = "tenants"
+APPLICATIONS = "applications"
+APPLICATION_STATUS_PREFIX = "applications.status:"
+PROPERTY_LOCATION_PREFIX = "properties.location:"
+PROPERTY_BEDROOMS_PREFIX = "properties.bedrooms:"
+
+
+def application_deltas(status: str, sign: int = 1) -> Counter:
+    return Counter({APPLICATIONS: sign, APPLICATION_STATUS_PREFIX + str(status): sign})
+
+
+def property_deltas(location, number_of_bedrooms, sign: int = 1) -> Counter:
+    deltas = Counter({PROPERTIES: sign})
+    if location is not None:
+        deltas[PROPERTY_LOCATION_PREFIX + location] += sign
+    if number_of_bedrooms is not None:
+        deltas[PROPERTY_BEDROOMS_PREFIX + str(number_of_bedrooms)] += sign
+    return deltas
+
+
+def bump(db: Session, deltas):
+    """Apply counter deltas in the caller's transaction; the caller commits."""
+    rows = [{"name": name, "value": delta} for name, delta in deltas.items() if delta]
+    if not rows:
+        return
+    table = models.AnalyticsCounter.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        stmt = upsert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.name],
+            set_={"value": table.c.value + stmt.excluded.value},
+        )
+        db.execute(stmt, rows)
+        return
+    for row in rows:
+        result = db.execute(
+            update(table).where(table.c.name == row["name"]).values(value=table.c.value + row["value"])
+        )
+        if result.rowcount == 0:
+            db.execute(insert(table).values(**row))
+
+
+def recompute(db: Session):
+    """Rebuild every counter from the source tables in one transaction."""
+    totals = Counter()
+    totals[USERS] = db.scalar(select(func.count()).select_from(models.User))
+    totals[TENANTS] = db.scalar(select(func.count()).select_from(models.Tenant))
+    # Delisted properties don't count; archived applications do
+    live = models.Property.deleted_at.is_(None)
+    totals[PROPERTIES] = db.scalar(select(func.count()).select_from(models.Property).where(live))
+    for location, count in db.execute(
+        select(models.Property.location, func.count()).where(live, models.Property.location.is_not(None)).group_by(models.Property.location)
+    ):
+        totals[PROPERTY_LOCATION_PREFIX + location] = count
+    for bedrooms, count in db.execute(
+        select(models.Property.number_of_bedrooms, func.count())
+        .where(live, models.Property.number_of_bedrooms.is_not(None))
+        .group_by(models.Property.number_of_bedrooms)
+    ):
+        totals[PROPERTY_BEDROOMS_PREFIX + str(bedrooms)] = count
+    for model in (models.RentalApplication, models.ArchivedApplication):
+        for status, count in db.execute(select(model.status, func.count()).group_by(model.status)):
+            totals[APPLICATIONS] += count
+            totals[APPLICATION_STATUS_PREFIX + str(status)] += count
+
+    table = models.AnalyticsCounter.__table__
+    db.execute(delete(table))
+    rows = [{"name": name, "value": value} for name, value in totals.items()]
+    if rows:
+        db.execute(insert(table), rows)
+    db.commit()
+    return snapshot(db)
+
+
+def _strip(prefix: str, counters: dict) -> dict:
+    return {name[len(prefix):]: value for name, value in counters.items() if name.startswith(prefix) and value}
+
+
+def snapshot(db: Session) -> dict:
+    counters = dict(db.execute(select(models.AnalyticsCounter.name, models.AnalyticsCounter.value)).all())
+    return {
+        "total_users": counters.get(USERS, 0),
+        "total_properties": counters.get(PROPERTIES, 0),
+        "total_tenants": counters.get(TENANTS, 0),
+        "total_applications": counters.get(APPLICATIONS, 0),
+        "applications_by_status": _strip(APPLICATION_STATUS_PREFIX, counters),
+        "properties_by_location": _strip(PROPERTY_LOCATION_PREFIX, counters),
+        "properties_by_bedrooms": _strip(PROPERTY_BEDROOMS_PREFIX, counters),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the admin analytics counters")
+    parser.add_argument("command", choices=["recompute"])
+    parser.parse_args(argv)
+    # Schema changes belong to `python -m app.cli migrate`
+    if not inspect(engine).has_table(models.AnalyticsCounter.__tablename__):
+        raise SystemExit("No analytics_counters table; run `python -m app.cli migrate` first")
+    db = SessionLocal()
+    try:
+        print(recompute(db))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+#archive.py
+# Archival tiering, so the hot tables hold only the working set. Deleting a
+# property only delists it (deleted_at). The live-listing indexes are
+# partial and skip delisted rows. Two scheduled jobs move old rows into
+# same-shaped archive tables, in keyset batches with one commit each:
+# - delisted properties older than PROPERTY_ARCHIVE_AFTER_DAYS, with their
+#   applications;
+# - decided (non-pending) applications older than APPLICATION_ARCHIVE_AFTER_DAYS.
+# Properties still referenced by agreements, the ledger or maintenance
+# requests stay where they are. The admin archive endpoints read the archive
+# tables back.
+import os
+from datetime import datetime, timedelta
+from typing import Sequence
+from sqlalchemy import DateTime, delete, exists, insert, literal, literal_column, select
+from sqlalchemy.orm import Session
+from . import models
+
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000"))
+ARCHIVE_INTERVAL_SECONDS = int(os.getenv("ARCHIVE_INTERVAL_SECONDS", "86400"))
+APPLICATION_ARCHIVE_AFTER_DAYS = int(os.getenv("APPLICATION_ARCHIVE_AFTER_DAYS", "180"))
+PROPERTY_ARCHIVE_AFTER_DAYS = int(os.getenv("PROPERTY_ARCHIVE_AFTER_DAYS", "30"))
+
+# Literal rather than a bound parameter, so SQLite can match the partial index
+_PENDING = literal_column("'pending'")
+
+
+def _move(db: Session, source, target, ids: Sequence[int], now: datetime):
+    """Copy rows ``ids`` from ``source`` into ``target`` (same columns plus archived_at), then delete them."""
+    names = [column.name for column in source.columns if column.name in target.columns]
+    db.execute(
+        insert(target).from_select(
+            names + ["archived_at"],
+            select(*(source.c[name] for name in names), literal(now, DateTime)).where(source.c.id.in_(ids)),
+        )
+    )
+    db.execute(delete(source).where(source.c.id.in_(ids)))
+
+
+def _move_applications(db: Session, ids: Sequence[int], now: datetime):
+    # Submission receipts only matter while a client is polling them
+    submissions = models.ApplicationSubmission
+    db.execute(delete(submissions).where(submissions.application_id.in_(ids)))
+    _move(db, models.RentalApplication.__table__, models.ArchivedApplication.__table__, ids, now)
+
+
+def archive_applications(db: Session, context) -> int:
+    """Move decided applications past the retention window; returns how many moved."""
+    application = models.RentalApplication
+    cutoff = context.now - timedelta(days=APPLICATION_ARCHIVE_AFTER_DAYS)
+    statement = (
+        select(application.id)
+        .where(application.status != _PENDING, application.submission_date < cutoff)
+        .order_by(application.submission_date, application.id)
+        .limit(ARCHIVE_BATCH_SIZE)
+    )
+    moved = 0
+    while True:
+        # Moved rows leave the table, so each batch starts from the front again
+        ids = db.scalars(statement).all()
+        if not ids:
+            return moved
+        _move_applications(db, ids, context.now)
+        db.commit()
+        moved += len(ids)
+        context.renew()
+
+
+def archive_properties(db: Session, context) -> int:
+    """Move properties delisted before the cutoff, with their applications; returns how many moved."""
+    prop = models.Property
+    cutoff = context.now - timedelta(days=PROPERTY_ARCHIVE_AFTER_DAYS)
+    statement = (
+        select(prop.id)
+        .where(
+            prop.deleted_at < cutoff,
+            ~exists().where(models.RentalAgreement.property_id == prop.id),
+            ~exists().where(models.LedgerEntry.property_id == prop.id),
+            ~exists().where(models.MaintenanceRequest.property_id == prop.id),
+        )
+        .order_by(prop.deleted_at, prop.id)
+        .limit(ARCHIVE_BATCH_SIZE)
+    )
+    moved = 0
+    while True:
+        ids = db.scalars(statement).all()
+        if not ids:
+            return moved
+        application_ids = db.scalars(
+            select(models.RentalApplication.id).where(models.RentalApplication.property_id.in_(ids))
+        ).all()
+        if application_ids:
+            _move_applications(db, application_ids, context.now)
+        _move(db, prop.__table__, models.ArchivedProperty.__table__, ids, context.now)
+        db.commit()
+        moved += len(ids)
+        context.renew()
@@ -0,0 +1,142 @@
+#async_crud.py
+# Async counterparts of the app.crud functions used by the routers.
+# Each one hands the sync implementation to AsyncSession.run_sync, so the
+# query logic lives only in crud.py while the I/O goes through the async driver.
+from typing import List, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from . import analytics, crud, schemas
+
+
+async def create_user(db: AsyncSession, user: schemas.UserCreate, hashed_password: str):
+    return await db.run_sync(crud.create_user, user, hashed_password)
+
+async def update_user_password(db: AsyncSession, username: str, hashed_password: str):
+    return await db.run_sync(crud.update_user_password, username, hashed_password)
+
+
+async def create_property(db: AsyncSession, property: schemas.PropertyCreate, owner_id: int):
+    return await db.run_sync(crud.create_property, property, owner_id)
+
+async def update_property(
+    db: AsyncSession,
+    property_id: int,
+    property: schemas.PropertyUpdate,
+    expected_version: Optional[int] = None,
+):
+    return await db.run_sync(crud.update_property, property_id, property, expected_version)
+
+async def delete_property(db: AsyncSession, property_id: int):
+    return await db.run_sync(crud.delete_property, property_id)
+
+async def get_properties(db: AsyncSession, **filters):
+    return await db.run_sync(crud.get_properties, **filters)
+
+async def search_properties(db: AsyncSession, query: str, limit: int = 20):
+    return await db.run_sync(crud.search_properties, query, limit)
+
+async def get_properties_nearby(db: AsyncSession, latitude: float, longitude: float, radius_km: float, limit: int = 50):
+    return await db.run_sync(crud.get_properties_nearby, latitude, longitude, radius_km, limit)
+
+async def get_properties_in_viewport(db: AsyncSession, south: float, west: float, north: float, east: float, limit: int = 200):
+    return await db.run_sync(crud.get_properties_in_viewport, south, west, north, east, limit)
+
+async def get_property(db: AsyncSession, property_id: int):
+    return await db.run_sync(crud.get_property, property_id)
+
+
+async def get_tenants(db: AsyncSession, skip: int = 0, limit: int = 10, columns: Optional[list] = None):
+    return await db.run_sync(crud.get_tenants, skip, limit, columns)
+
+async def get_tenant(db: AsyncSession, tenant_id: int):
+    return await db.run_sync(crud.get_tenant, tenant_id)
+
+async def get_tenant_by_email(db: AsyncSession, email: str):
+    return await db.run_sync(crud.get_tenant_by_email, email)
+
+async def create_tenant(db: AsyncSession, tenant: schemas.TenantCreate):
+    return await db.run_sync(crud.create_tenant, tenant)
+
+
+# Admin-related CRUD operations
+
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.run_sync(crud.get_user, user_id)
+
+async def get_user_by_username(db: AsyncSession, username: str):
+    return await db.run_sync(crud.get_user_by_username, username)
+
+async def get_user_by_username_or_email(db: AsyncSession, username: str, email: str):
+    return await db.run_sync(crud.get_user_by_username_or_email, username, email)
+
+async def get_users(db: AsyncSession, skip: int = 0, limit: int = 10, columns: Optional[list] = None):
+    return await db.run_sync(crud.get_users, skip, limit, columns)
+
+async def update_user_role(db: AsyncSession, user_id: int, role: str):
+    return await db.run_sync(crud.update_user_role, user_id, role)
+
+
+# Application-related CRUD operations
+
+async def create_application(db: AsyncSession, application: schemas.RentalApplicationCreate):
+    return await db.run_sync(crud.create_application, application)
+
+async def get_application_submission_for_user(db: AsyncSession, submission_id: str, user_id: int, is_admin: bool):
+    return await db.run_sync(crud.get_application_submission_for_user, submission_id, user_id, is_admin)
+
+async def get_application(db: AsyncSession, application_id: int, load: Optional[str] = None):
+    return await db.run_sync(crud.get_application, application_id, load)
+
+async def get_application_for_user(db: AsyncSession, application_id: int, user_id: int, is_admin: bool, load: Optional[str] = None):
+    return await db.run_sync(crud.get_application_for_user, application_id, user_id, is_admin, load)
+
+async def update_application_status(db: AsyncSession, application_id: int, status: str):
+    return await db.run_sync(crud.update_application_status, application_id, status)
+
+async def review_applications(db: AsyncSession, decisions: List[schemas.ApplicationDecision]):
+    return await db.run_sync(crud.review_applications, decisions)
+
+async def list_applications(db: AsyncSession, skip: int = 0, limit: int = 10, load: Optional[str] = None, columns: Optional[list] = None):
+    return await db.run_sync(crud.list_applications, skip, limit, load, columns)
+
+async def list_user_applications(db: AsyncSession, user_id: int, skip: int = 0, limit: int = 10, load: Optional[str] = "selectin"):
+    return await db.run_sync(crud.list_user_applications, user_id, skip, limit, load)
+
+
+# Analytics counters
+
+async def get_analytics(db: AsyncSession):
+    return await db.run_sync(analytics.snapshot)
+
+async def recompute_analytics(db: AsyncSession):
+    return await db.run_sync(analytics.recompute)
+
+
+# Rental agreements, maintenance requests and scheduled jobs
+
+async def create_rental_agreement(db: AsyncSession, agreement: schemas.RentalAgreementCreate):
+    return await db.run_sync(crud.create_rental_agreement, agreement)
+
+async def create_maintenance_request(db: AsyncSession, request: schemas.MaintenanceRequestCreate):
+    return await db.run_sync(crud.create_maintenance_request, request)
+
+async def get_scheduled_jobs(db: AsyncSession):
+    return await db.run_sync(crud.get_scheduled_jobs)
+
+
+# Payments ledger
+
+async def record_payment(db: AsyncSession, payment: schemas.PaymentCreate, idempotency_key: Optional[str] = None):
+    return await db.run_sync(crud.record_payment, payment, idempotency_key)
+
+async def get_tenant_balance(db: AsyncSession, tenant_id: int):
+    return await db.run_sync(crud.get_tenant_balance, tenant_id)
+
+async def get_ledger_history(db: AsyncSession, tenant_id: int, cursor: Optional[str] = None, limit: int = 50):
+    return await db.run_sync(crud.get_ledger_history, tenant_id, cursor, limit)
+
+
+async def get_archived_applications(db: AsyncSession, **filters):
+    return await db.run_sync(crud.get_archived_applications, **filters)
+
+async def get_archived_properties(db: AsyncSession, **filters):
+    return await db.run_sync(crud.get_archived_properties, **filters)
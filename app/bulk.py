@@ -0,0 +1,248 @@
+#bulk.py
+# Streaming CSV / NDJSON import and export. Uploads are decoded line by line
+# as they arrive, validated per row, and written in batches (one executemany
+# and one commit per batch). CSV lines are fed to csv.reader as they come, so
+# a quoted field may span lines (csv.writer writes descriptions with
+# newlines) and exports import back unchanged. Exports stream from a
+# server-side cursor so memory stays flat regardless of table size.
+import codecs
+import csv
+import io
+import json
+import os
+from collections import deque
+from typing import AsyncIterator, Callable, List, Optional
+from pydantic import ValidationError
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from .database import AsyncSessionLocal
+from .schemas import BulkImportError, BulkImportResult
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+BULK_MAX_REPORTED_ERRORS = int(os.getenv("BULK_MAX_REPORTED_ERRORS", "1000"))
+# Bounds how much a CSV record with an unclosed quote can buffer
+BULK_MAX_RECORD_CHARS = int(os.getenv("BULK_MAX_RECORD_CHARS", "65536"))
+
+FORMATS = ("csv", "ndjson")
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def detect_format(requested: Optional[str], content_type: Optional[str]) -> str:
+    if requested:
+        fmt = requested.lower()
+    elif content_type and "csv" in content_type:
+        fmt = "csv"
+    else:
+        fmt = "ndjson"
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format: {fmt}")
+    return fmt
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into lines without buffering the whole body."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+class _NeedMoreInput(Exception):
+    pass
+
+
+class _RecordTooLong(Exception):
+    pass
+
+
+class _CsvFeed:
+    """Line iterator for csv.reader, refilled as the upload arrives.
+
+    csv.reader starts a record over on every call, so when the lines run out
+    inside a quoted field the record's lines are put back and parsed again
+    once more have arrived.
+    """
+
+    def __init__(self):
+        self.pending = deque()
+        self.record = []
+        self.size = 0
+        self.closed = False
+        self.truncated = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if not self.pending:
+            if not self.closed:
+                raise _NeedMoreInput
+            self.truncated = bool(self.record)
+            raise StopIteration
+        line = self.pending.popleft()
+        self.record.append(line)
+        self.size += len(line)
+        if len(self.record) > 1 and self.size > BULK_MAX_RECORD_CHARS:
+            raise _RecordTooLong
+        return line
+
+    def parse(self, reader):
+        """Yield ``(values_or_None, error_or_None)`` for each record complete so far."""
+        while True:
+            self.record, self.size = [], 0
+            try:
+                values = next(reader)
+            except _NeedMoreInput:
+                self.pending.extendleft(reversed(self.record))
+                return
+            except StopIteration:
+                return
+            except _RecordTooLong:
+                yield None, f"record longer than {BULK_MAX_RECORD_CHARS} characters or unclosed quote"
+                continue
+            except csv.Error as exc:
+                yield None, str(exc)
+                continue
+            if self.truncated:
+                yield None, "unclosed quoted field at end of input"
+                return
+            yield values, None
+
+
+async def iter_csv(lines: AsyncIterator[str]):
+    """Parse CSV lines into ``(values_or_None, error_or_None)`` records as they arrive."""
+    feed = _CsvFeed()
+    reader = csv.reader(feed)
+    async for line in lines:
+        feed.pending.append(line + "\n")
+        for item in feed.parse(reader):
+            yield item
+    feed.closed = True
+    for item in feed.parse(reader):
+        yield item
+
+
+async def iter_records(lines: AsyncIterator[str], fmt: str):
+    """Yield ``(row_number, record_or_None, error_or_None)``; rows count records, not lines."""
+    row = 0
+    if fmt == "csv":
+        header = None
+        async for values, error in iter_csv(lines):
+            if error is None and not "".join(values).strip() and len(values) <= 1:
+                continue
+            if error is None and header is None:
+                header = [name.strip() for name in values]
+                continue
+            row += 1
+            if error is None and len(values) != len(header):
+                error = f"expected {len(header)} columns, got {len(values)}"
+            if error is not None:
+                yield row, None, error
+                continue
+            # Empty CSV cells mean "not provided"
+            yield row, {key: value for key, value in zip(header, values) if value != ""}, None
+        return
+
+    async for line in lines:
+        if not line.strip():
+            continue
+        row += 1
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("each line must be a JSON object")
+        except ValueError as exc:
+            yield row, None, str(exc)
+            continue
+        yield row, record, None
+
+
+async def import_records(
+    db: AsyncSession,
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    schema,
+    write_batch: Callable,
+) -> BulkImportResult:
+    """Validate records against ``schema`` and hand them to ``write_batch`` in batches.
+
+    ``write_batch(session, rows)`` runs inside ``run_sync`` and returns the subset
+    of rows it rejected as ``{index_in_batch: reason}``. Each batch commits on
+    its own; a batch the database refuses (say, a unique key taken by a
+    concurrent write) is rolled back and all its rows are reported as failed,
+    and the import carries on with the next one.
+    """
+    inserted = 0
+    failed = 0
+    errors: List[BulkImportError] = []
+
+    def report(row: int, error: str):
+        nonlocal failed
+        failed += 1
+        if len(errors) < BULK_MAX_REPORTED_ERRORS:
+            errors.append(BulkImportError(row=row, error=error))
+
+    async def flush(batch):
+        nonlocal inserted
+        try:
+            rejected = await db.run_sync(write_batch, [values for _, values in batch])
+        except IntegrityError as exc:
+            await db.rollback()
+            reason = f"batch rejected by the database: {exc.orig}"
+            rejected = {index: reason for index in range(len(batch))}
+        for index, reason in sorted(rejected.items()):
+            report(batch[index][0], reason)
+        inserted += len(batch) - len(rejected)
+
+    batch = []
+    async for row, record, error in iter_records(iter_lines(chunks), fmt):
+        if error is not None:
+            report(row, error)
+            continue
+        try:
+            item = schema(**record)
+        except ValidationError as exc:
+            report(row, "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors()))
+            continue
+        batch.append((row, item.model_dump()))
+        if len(batch) >= BULK_BATCH_SIZE:
+            await flush(batch)
+            batch = []
+    if batch:
+        await flush(batch)
+    errors.sort(key=lambda error: error.row)
+    return BulkImportResult(inserted=inserted, failed=failed, errors=errors)
+
+
+async def export_rows(statement, columns: List[str], fmt: str) -> AsyncIterator[str]:
+    """Stream ``statement`` as CSV or NDJSON from a server-side cursor.
+
+    Uses its own session so the stream outlives the request's dependencies.
+    """
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(statement.execution_options(yield_per=BULK_BATCH_SIZE))
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            async for partition in result.partitions():
+                writer.writerows(partition)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue()
+        else:
+            async for partition in result.partitions():
+                yield "".join(json.dumps(dict(zip(columns, values)), default=str) + "\n" for values in partition)
+
+
+def export_statement(model, columns: List[str]):
+    return select(*(getattr(model, column) for column in columns)).order_by(model.id)
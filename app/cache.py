@@ -0,0 +1,309 @@
+#cache.py
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from .database import read_your_writes
+
+
+class TTLCache:
+    """Thread-safe LRU mapping whose entries expire ``ttl`` seconds after being set."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class LocalSharedBackend:
+    """In-process stand-in for a shared cache such as Redis.
+
+    Stores bytes with a TTL and supports atomic increments, which is all
+    ResponseCache and the rate limiter need from a shared backend.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        expires_at = None if ttl is None else time.monotonic() + ttl
+        with self._lock:
+            self._data[key] = (value, expires_at)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def incr(self, key: str, ttl: Optional[float] = None) -> int:
+        """Increment a counter; ``ttl`` applies when the counter is created."""
+        now = time.monotonic()
+        with self._lock:
+            value, expires_at = self._data.get(key, (b"0", None))
+            if expires_at is not None and expires_at <= now:
+                value, expires_at = b"0", None
+            if value == b"0" and ttl is not None:
+                expires_at = now + ttl
+            value = str(int(value) + 1).encode()
+            self._data[key] = (value, expires_at)
+            return int(value)
+
+
+class RedisBackend:
+    """Shared backend on Redis; needs the optional ``redis`` package."""
+
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self._client.get(key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float] = None):
+        self._client.set(key, value, ex=None if ttl is None else max(1, int(ttl)))
+
+    def delete(self, key: str):
+        self._client.delete(key)
+
+    def incr(self, key: str, ttl: Optional[float] = None) -> int:
+        if ttl is None:
+            return self._client.incr(key)
+        pipeline = self._client.pipeline()
+        pipeline.incr(key)
+        pipeline.expire(key, max(1, int(ttl)), nx=True)
+        return pipeline.execute()[0]
+
+
+def shared_backend_from_url(url: Optional[str]):
+    if not url:
+        return None
+    if url == "local://":
+        return LocalSharedBackend()
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBackend(url)
+    raise ValueError(f"Unsupported response cache backend: {url}")
+
+
+class PrincipalCache:
+    """Current token version per user id, so authenticated requests can skip the user lookup.
+
+    crud drops a user's entry when it bumps their token version. With a
+    shared backend the versions live there and the drop is seen by every
+    worker. Otherwise each worker caches its own copy, and workers other
+    than the one that made the change keep accepting the old token until
+    their entry expires: at most ``ttl`` seconds, or ``admin_ttl`` for
+    admins, whose tokens are worth revoking sooner.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 60.0, admin_ttl: float = 5.0, shared=None):
+        self.ttl = ttl
+        self.admin_ttl = admin_ttl
+        self.shared = shared
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, user_id: int) -> Optional[int]:
+        if self.shared is not None:
+            raw = self.shared.get(f"ver:{user_id}")
+            return None if raw is None else int(raw)
+        return self.local.get(user_id)
+
+    def set(self, user_id: int, token_version: int, is_admin: bool = False):
+        ttl = self.admin_ttl if is_admin else self.ttl
+        if self.shared is not None:
+            self.shared.set(f"ver:{user_id}", str(token_version).encode(), ttl)
+        else:
+            self.local.set(user_id, token_version, ttl)
+
+    def pop(self, user_id: int):
+        if self.shared is not None:
+            self.shared.delete(f"ver:{user_id}")
+        self.local.pop(user_id)
+
+
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+PRINCIPAL_CACHE_ADMIN_TTL = float(os.getenv("PRINCIPAL_CACHE_ADMIN_TTL", "5"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+PRINCIPAL_CACHE_URL = os.getenv("PRINCIPAL_CACHE_URL")
+principal_cache = PrincipalCache(
+    maxsize=PRINCIPAL_CACHE_SIZE,
+    ttl=PRINCIPAL_CACHE_TTL,
+    admin_ttl=PRINCIPAL_CACHE_ADMIN_TTL,
+    shared=shared_backend_from_url(PRINCIPAL_CACHE_URL),
+)
+
+
+# A cached response: (etag, body, extra headers)
+CacheEntry = Tuple[str, bytes, Dict[str, str]]
+
+
+class ResponseCache:
+    """Two-tier cache of serialized responses grouped into namespaces.
+
+    Entries live in an in-process LRU and, when a shared backend is
+    configured, in the shared store too. Invalidating a namespace bumps its
+    generation number, which is part of every key, so stale entries simply
+    stop being addressed; with a shared backend the bump is seen by every
+    worker, otherwise only by this one (others catch up within the TTL).
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 30.0, shared=None):
+        self.ttl = ttl
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.shared = shared
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def _generation(self, namespace: str) -> int:
+        if self.shared is not None:
+            return int(self.shared.get(f"gen:{namespace}") or 0)
+        return self._generations.get(namespace, 0)
+
+    def key(self, namespace: str, key: str) -> str:
+        """Full key for ``key`` under the namespace's current generation.
+
+        Compute it once per request and use it for both get and set, so a
+        response built while a write invalidates the namespace is stored
+        under the old generation rather than the new one.
+        """
+        return f"{namespace}:{self._generation(namespace)}:{key}"
+
+    def get(self, full_key: str) -> Optional[CacheEntry]:
+        entry = self.local.get(full_key)
+        if entry is None and self.shared is not None:
+            raw = self.shared.get(full_key)
+            if raw is not None:
+                entry = _decode_entry(raw)
+                self.local.set(full_key, entry)
+        return entry
+
+    def set(self, full_key: str, entry: CacheEntry):
+        self.local.set(full_key, entry)
+        if self.shared is not None:
+            self.shared.set(full_key, _encode_entry(entry), self.ttl)
+
+    def invalidate(self, *namespaces: str):
+        for namespace in namespaces:
+            if self.shared is not None:
+                self.shared.incr(f"gen:{namespace}")
+            with self._lock:
+                self._generations[namespace] = self._generations.get(namespace, 0) + 1
+
+
+def _encode_entry(entry: CacheEntry) -> bytes:
+    etag, body, headers = entry
+    header_block = "\n".join(f"{name}:{value}" for name, value in headers.items())
+    return etag.encode() + b"\0" + header_block.encode() + b"\0" + body
+
+
+def _decode_entry(raw: bytes) -> CacheEntry:
+    etag, header_block, body = raw.split(b"\0", 2)
+    headers = dict(line.split(":", 1) for line in header_block.decode().splitlines() if line)
+    return etag.decode(), body, headers
+
+
+@lru_cache(maxsize=None)
+def _type_adapter(response_model) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+async def cached_json_response(
+    request: Request,
+    namespace: str,
+    response_model,
+    produce: Callable[[], Awaitable[Tuple[object, Dict[str, str]]]],
+) -> Response:
+    """Serve a JSON response from ``response_cache``, answering 304 when the ETag matches.
+
+    On a miss ``produce()`` returns ``(data, extra_headers)``; ``data`` is
+    serialized through ``response_model`` exactly as FastAPI would, unless
+    it is already-encoded JSON bytes. An ``ETag`` in the extra headers
+    replaces the default content hash. A caller pinned to the primary after
+    their own write skips the lookup (the entry may have been filled from a
+    replica that hasn't seen that write) and refreshes it instead.
+    """
+    full_key = response_cache.key(namespace, f"{request.url.path}?{request.url.query}")
+    entry = None if read_your_writes.get() else response_cache.get(full_key)
+    if entry is None:
+        data, headers = await produce()
+        if isinstance(data, bytes):
+            body = data
+        else:
+            adapter = _type_adapter(response_model)
+            body = adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+        etag = headers.pop("ETag", None) or '"' + hashlib.sha1(body).hexdigest() + '"'
+        entry = (etag, body, headers)
+        response_cache.set(full_key, entry)
+    etag, body, headers = entry
+    headers = {**headers, "ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+# Listing and detail responses for the read-heavy endpoints; the crud write
+# paths invalidate the "properties" and "tenants" namespaces after commit
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "4096"))
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL")
+response_cache = ResponseCache(
+    maxsize=RESPONSE_CACHE_SIZE,
+    ttl=RESPONSE_CACHE_TTL,
+    shared=shared_backend_from_url(RESPONSE_CACHE_URL),
+)
@@ -0,0 +1,116 @@
+#cli.py
+# Deployment entry points. `python -m app.cli migrate` creates missing tables,
+# adds columns and indexes that newer models define on existing tables
+# (existing rows get the column default), builds the search, geo and ledger
+# schema objects and seeds the scheduled job rows. It is idempotent; run it
+# once per release, before any worker starts, so workers never race each
+# other on DDL at boot.
+# `python -m app.cli serve --workers N` starts the API. With --preload the
+# parent imports and warms the app once and workers fork from it (needs the
+# optional gunicorn package).
+import argparse
+import os
+from sqlalchemy import inspect, literal
+from . import geo, ledger, models, search  # noqa: F401 (models registers the tables)
+from .database import Base, SessionLocal, engine
+from .scheduler import scheduler
+
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", "8000"))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "1"))
+
+
+def _column_ddl(column, dialect) -> str:
+    ddl = f"{dialect.identifier_preparer.format_column(column)} {column.type.compile(dialect=dialect)}"
+    if column.default is not None and column.default.is_scalar:
+        default = column.default.arg
+    elif column.server_default is not None:
+        default = column.server_default.arg
+    else:
+        default = None
+    if default is not None:
+        ddl += " DEFAULT " + str(literal(default).compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+        # Without a default, existing rows would violate NOT NULL
+        if not column.nullable:
+            ddl += " NOT NULL"
+    return ddl
+
+
+def _upgrade_existing_tables(connection):
+    """Add the columns and indexes create_all skips on tables that already exist."""
+    inspector = inspect(connection)
+    preparer = connection.dialect.identifier_preparer
+    for table in Base.metadata.sorted_tables:
+        present = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in present:
+                connection.exec_driver_sql(
+                    f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {_column_ddl(column, connection.dialect)}"
+                )
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+def migrate(bind=None):
+    bind = bind or engine
+    Base.metadata.create_all(bind=bind)
+    with bind.begin() as connection:
+        _upgrade_existing_tables(connection)
+    search.ensure_schema(bind)
+    geo.ensure_schema(bind)
+    ledger.ensure_schema(bind)
+    with SessionLocal(bind=bind) as db:
+        scheduler.ensure_rows(db)
+
+
+def _serve_preloaded(host: str, port: int, workers: int):
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        raise SystemExit("--preload needs gunicorn: pip install gunicorn")
+    from . import warmup
+
+    class PreloadedApplication(BaseApplication):
+        def load_config(self):
+            self.cfg.set("bind", f"{host}:{port}")
+            self.cfg.set("workers", workers)
+            self.cfg.set("worker_class", "uvicorn.workers.UvicornWorker")
+            self.cfg.set("preload_app", True)
+
+        def load(self):
+            from .main import app
+
+            warmup.preload()
+            return app
+
+    PreloadedApplication().run()
+
+
+def serve(host: str = SERVER_HOST, port: int = SERVER_PORT, workers: int = SERVER_WORKERS, preload: bool = False):
+    if preload:
+        _serve_preloaded(host, port, workers)
+        return
+    import uvicorn
+
+    uvicorn.run("app.main:app", host=host, port=port, workers=workers)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run migrations or serve the API")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("migrate", help="Create tables and schema objects")
+    serve_parser = commands.add_parser("serve", help="Run the API server")
+    serve_parser.add_argument("--host", default=SERVER_HOST)
+    serve_parser.add_argument("--port", type=int, default=SERVER_PORT)
+    serve_parser.add_argument("--workers", type=int, default=SERVER_WORKERS)
+    serve_parser.add_argument("--preload", action="store_true", help="Warm the app once and fork workers from it")
+    serve_parser.add_argument("--migrate", action="store_true", help="Run migrations before starting")
+    args = parser.parse_args(argv)
+    if args.command == "migrate" or args.migrate:
+        migrate()
+    if args.command == "serve":
+        serve(args.host, args.port, args.workers, args.preload)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,20 @@
 #crud.py
-from sqlalchemy.orm import Session
-from . import models, schemas
+import base64
+import json
+from collections import Counter
+from datetime import datetime
+from typing import List, Optional
+from sqlalchemy import and_, insert, literal_column, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, joinedload, selectinload
+from . import analytics, events, geo, ledger, models, schemas, search
+from .cache import principal_cache, response_cache
 
 
-def create_user(db: Session, user: schemas.UserCreate):
-    db_user = models.User(username=user.username, hashed_password=user.password)
+def create_user(db: Session, user: schemas.UserCreate, hashed_password: str):
+    db_user = models.User(username=user.username, email=user.email, hashed_password=hashed_password)
     db.add(db_user)
+    analytics.bump(db, {analytics.USERS: 1})
     db.commit()
     db.refresh(db_user)
     return db_user
@@ -15,51 +24,315 @@ def update_user_password(db: Session, username: str, hashed_password: str):
     if not db_user:
         return None
     db_user.hashed_password = hashed_password
+    db_user.token_version = models.User.token_version + 1
     db.commit()
+    db.refresh(db_user)
+    principal_cache.pop(db_user.id)
     return db_user
 
 
 def create_property(db: Session, property: schemas.PropertyCreate, owner_id: int):
     db_property = models.Property(**property.dict(), owner_id=owner_id)
     db.add(db_property)
+    db.flush()
+    search.index_properties(db, [db_property])
+    geo.index_properties(db, [(db_property.id, db_property.latitude, db_property.longitude)])
+    analytics.bump(db, analytics.property_deltas(db_property.location, db_property.number_of_bedrooms))
     db.commit()
+    response_cache.invalidate("properties")
     db.refresh(db_property)
+    events.publish("properties.created", _property_event(db_property))
     return db_property
 
 
 
-def update_property(db: Session, property_id: int, property: schemas.PropertyUpdate):
-    db_property = db.query(models.Property).filter(models.Property.id == property_id).first()
+def bulk_create_properties(db: Session, rows: List[dict], owner_id: int):
+    """Insert validated property rows in one executemany and one commit.
+
+    Returns the rows it rejected as ``{index: reason}`` (always empty here).
+    """
+    if not rows:
+        return {}
+    documents = db.execute(
+        insert(models.Property).returning(
+            models.Property.id,
+            models.Property.title,
+            models.Property.description,
+            models.Property.location,
+            models.Property.latitude,
+            models.Property.longitude,
+            sort_by_parameter_order=True,
+        ),
+        [dict(row, owner_id=owner_id) for row in rows],
+    ).all()
+    search.index_properties(db, documents)
+    geo.index_properties(db, [(doc.id, doc.latitude, doc.longitude) for doc in documents])
+    deltas = Counter()
+    for row in rows:
+        deltas.update(analytics.property_deltas(row.get("location"), row.get("number_of_bedrooms")))
+    analytics.bump(db, deltas)
+    db.commit()
+    response_cache.invalidate("properties")
+    for doc, row in zip(documents, rows):
+        events.publish("properties.created", _property_event(doc, price=row.get("price"), owner_id=owner_id))
+    return {}
+
+
+def _property_event(db_property, **overrides) -> dict:
+    data = {
+        "id": db_property.id,
+        "title": db_property.title,
+        "location": db_property.location,
+        "price": getattr(db_property, "price", None),
+        "owner_id": getattr(db_property, "owner_id", None),
+    }
+    data.update(overrides)
+    return data
+
+
+class StaleVersionError(Exception):
+    """The row changed since the version the client based its update on."""
+
+    def __init__(self, current_version: int):
+        super().__init__(f"Property was modified (current version {current_version})")
+        self.current_version = current_version
+
+
+def update_property(
+    db: Session,
+    property_id: int,
+    property: schemas.PropertyUpdate,
+    expected_version: Optional[int] = None,
+):
+    """Apply a partial update as one ``UPDATE ... WHERE id AND version RETURNING``.
+
+    With ``expected_version`` the update only lands if the row is still at
+    that version, otherwise StaleVersionError is raised. Returns None when
+    the property does not exist.
+    """
+    changes = property.dict(exclude_unset=True)
+    deltas = Counter()
+    if changes.keys() & {"location", "number_of_bedrooms"}:
+        # The analytics counters need the values being replaced, which
+        # RETURNING cannot give; pin the update to the version we read
+        current = db.execute(
+            select(models.Property.location, models.Property.number_of_bedrooms, models.Property.version)
+            .where(models.Property.id == property_id, models.Property.deleted_at.is_(None))
+        ).first()
+        if current is None:
+            return None
+        if expected_version is not None and current.version != expected_version:
+            raise StaleVersionError(current.version)
+        expected_version = current.version
+        deltas.update(analytics.property_deltas(current.location, current.number_of_bedrooms, -1))
+
+    statement = (
+        update(models.Property)
+        .where(models.Property.id == property_id, models.Property.deleted_at.is_(None))
+        .values(**changes, version=models.Property.version + 1)
+        .returning(models.Property)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    if expected_version is not None:
+        statement = statement.where(models.Property.version == expected_version)
+    db_property = db.execute(statement).scalars().first()
     if db_property is None:
-        return None
-    for var, value in vars(property).items():
-        setattr(db_property, var, value) if value else None
+        db.rollback()
+        current_version = db.execute(
+            select(models.Property.version).where(models.Property.id == property_id, models.Property.deleted_at.is_(None))
+        ).scalar()
+        if current_version is None:
+            return None
+        raise StaleVersionError(current_version)
+
+    if changes.keys() & {"title", "description", "location"}:
+        search.index_properties(db, [db_property])
+    if changes.keys() & {"latitude", "longitude"}:
+        geo.index_properties(db, [(db_property.id, db_property.latitude, db_property.longitude)])
+    if deltas:
+        deltas.update(analytics.property_deltas(db_property.location, db_property.number_of_bedrooms))
+        analytics.bump(db, deltas)
     db.commit()
-    db.refresh(db_property)
+    response_cache.invalidate("properties")
+    events.publish("properties.updated", _property_event(db_property))
     return db_property
 
 
 def delete_property(db: Session, property_id: int):
-    db_property = db.query(models.Property).filter(models.Property.id == property_id).first()
+    """Delist a property. The row stays (applications and the ledger refer to it)
+    until the archival job moves it to properties_archive."""
+    db_property = get_property(db, property_id)
     if db_property:
-        db.delete(db_property)
+        db_property.deleted_at = datetime.utcnow()
+        search.remove_properties(db, [db_property.id])
+        geo.remove_properties(db, [db_property.id])
+        analytics.bump(db, analytics.property_deltas(db_property.location, db_property.number_of_bedrooms, -1))
         db.commit()
+        response_cache.invalidate("properties")
+        events.publish("properties.deleted", {"id": db_property.id})
     return db_property
 
-# def get_properties(db: Session):
-#     return db.query(models.Property).all()
+def search_properties(db: Session, query: str, limit: int = 20):
+    """Full-text search; returns properties ranked best match first."""
+    ids = search.get_backend(db).search(db, query, limit)
+    if not ids:
+        return []
+    by_id = {p.id: p for p in db.query(models.Property).filter(models.Property.id.in_(ids), models.Property.deleted_at.is_(None))}
+    return [by_id[id] for id in ids if id in by_id]
+
+def get_properties_nearby(db: Session, latitude: float, longitude: float, radius_km: float, limit: int = 50):
+    """Properties within ``radius_km`` as ``(property, distance_km)`` pairs, nearest first."""
+    boxes = geo.radius_boxes(latitude, longitude, radius_km)
+    # Rank on the coordinates alone; only the nearest ``limit`` rows are loaded
+    candidates = db.execute(
+        select(models.Property.id, models.Property.latitude, models.Property.longitude).where(
+            geo.within_boxes(db, models.Property, boxes), models.Property.deleted_at.is_(None)
+        )
+    )
+    ranked = []
+    for id, lat, lon in candidates:
+        distance = geo.haversine_km(latitude, longitude, lat, lon)
+        if distance <= radius_km:
+            ranked.append((distance, id))
+    ranked.sort()
+    ranked = ranked[:limit]
+    if not ranked:
+        return []
+    by_id = {p.id: p for p in db.query(models.Property).filter(models.Property.id.in_([id for _, id in ranked]))}
+    return [(by_id[id], distance) for distance, id in ranked if id in by_id]
+
+def get_properties_in_viewport(db: Session, south: float, west: float, north: float, east: float, limit: int = 200):
+    """Properties inside a map viewport; ``west > east`` means it crosses the antimeridian."""
+    boxes = geo.split_viewport(south, west, north, east)
+    return (
+        db.query(models.Property)
+        .filter(geo.within_boxes(db, models.Property, boxes), models.Property.deleted_at.is_(None))
+        .order_by(models.Property.id)
+        .limit(limit)
+        .all()
+    )
+
+# Sort keys accepted by get_properties, mapped to (column, descending)
+PROPERTY_SORT_KEYS = {
+    "id": (models.Property.id, False),
+    "newest": (models.Property.id, True),
+    "price": (models.Property.price, False),
+    "-price": (models.Property.price, True),
+    "bedrooms": (models.Property.number_of_bedrooms, False),
+    "-bedrooms": (models.Property.number_of_bedrooms, True),
+}
+
+
+def encode_cursor(sort: str, value, last_id: int) -> str:
+    raw = json.dumps([sort, value, last_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _is_number(value, types) -> bool:
+    # bool is an int subclass, but never a valid key
+    return isinstance(value, types) and not isinstance(value, bool)
+
+
+def decode_cursor(cursor: str, value_types=None):
+    """Return ``(sort, value, last_id)``; ``value_types`` checks the sort value. Raises ValueError."""
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        sort, value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+        if not isinstance(sort, str) or not _is_number(last_id, int):
+            raise ValueError
+        if value_types is not None and not _is_number(value, value_types):
+            raise ValueError
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    return sort, value, last_id
+
+
+def get_properties(
+    db: Session,
+    location: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    min_bedrooms: Optional[int] = None,
+    max_bedrooms: Optional[int] = None,
+    owner_id: Optional[int] = None,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = 20,
+    columns: Optional[list] = None,
+):
+    """Filter properties and return one keyset-paginated page.
+
+    Returns ``(properties, next_cursor)``; ``next_cursor`` is None on the last page.
+    With ``columns`` the page holds plain rows of just those columns (which
+    must include id and the sort column).
+    Raises ValueError for an unknown sort key or a cursor issued for another sort.
+    """
+    if sort not in PROPERTY_SORT_KEYS:
+        raise ValueError(f"Unknown sort key: {sort}")
+    column, descending = PROPERTY_SORT_KEYS[sort]
+    query = db.query(*columns) if columns else db.query(models.Property)
+    # Matches the partial indexes' condition so they can be used
+    query = query.filter(models.Property.deleted_at.is_(None))
+    if location is not None:
+        query = query.filter(models.Property.location == location)
+    if min_price is not None:
+        query = query.filter(models.Property.price >= min_price)
+    if max_price is not None:
+        query = query.filter(models.Property.price <= max_price)
+    if min_bedrooms is not None:
+        query = query.filter(models.Property.number_of_bedrooms >= min_bedrooms)
+    if max_bedrooms is not None:
+        query = query.filter(models.Property.number_of_bedrooms <= max_bedrooms)
+    if owner_id is not None:
+        query = query.filter(models.Property.owner_id == owner_id)
+
+    if cursor:
+        value_types = (int, float) if column.type.python_type is float else int
+        cursor_sort, value, last_id = decode_cursor(cursor, value_types)
+        if cursor_sort != sort:
+            raise ValueError("Cursor does not match the requested sort")
+        if column is models.Property.id:
+            query = query.filter(column < last_id if descending else column > last_id)
+        elif descending:
+            query = query.filter(or_(column < value, and_(column == value, models.Property.id < last_id)))
+        else:
+            query = query.filter(or_(column > value, and_(column == value, models.Property.id > last_id)))
+
+    if column is models.Property.id:
+        order_by = [column.desc() if descending else column.asc()]
+    else:
+        order_by = [column.desc(), models.Property.id.desc()] if descending else [column.asc(), models.Property.id.asc()]
+
+    # Fetch one extra row to learn whether another page exists
+    rows = query.order_by(*order_by).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(sort, getattr(last, column.key), last.id)
+    return rows, next_cursor
 
 def get_property(db: Session, property_id: int):
-    return db.query(models.Property).filter(models.Property.id == property_id).first()
+    """A live (not delisted) property, or None."""
+    return (
+        db.query(models.Property)
+        .filter(models.Property.id == property_id, models.Property.deleted_at.is_(None))
+        .first()
+    )
 
 # Similarly, you would create CRUD operations for tenants and rental applications.
 
-def get_tenants(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(models.Tenant).offset(skip).limit(limit).all()
+def get_tenants(db: Session, skip: int = 0, limit: int = 10, columns: Optional[list] = None):
+    """Tenants in id order; with ``columns``, plain rows of just those columns."""
+    query = db.query(*columns) if columns else db.query(models.Tenant)
+    return query.order_by(models.Tenant.id).offset(skip).limit(limit).all()
 
 def get_tenant(db: Session, tenant_id: int):
     return db.query(models.Tenant).filter(models.Tenant.id == tenant_id).first()
 
+def get_tenant_by_email(db: Session, email: str):
+    return db.query(models.Tenant).filter(models.Tenant.email == email).first()
+
 
 def create_tenant(db: Session, tenant: schemas.TenantCreate):
     db_tenant = models.Tenant(
@@ -67,45 +340,469 @@ def create_tenant(db: Session, tenant: schemas.TenantCreate):
         email=tenant.email,
     )
     db.add(db_tenant)
+    analytics.bump(db, {analytics.TENANTS: 1})
     db.commit()
+    response_cache.invalidate("tenants")
     db.refresh(db_tenant)
     return db_tenant
 
 
+def bulk_create_tenants(db: Session, rows: List[dict]):
+    """Insert tenant rows in one batch, skipping emails that already exist.
+
+    Returns the rejected rows as ``{index: reason}``.
+    """
+    emails = {row["email"] for row in rows}
+    existing = set(db.scalars(select(models.Tenant.email).where(models.Tenant.email.in_(emails))))
+    rejected = {}
+    seen = set()
+    to_insert = []
+    for index, row in enumerate(rows):
+        if row["email"] in existing or row["email"] in seen:
+            rejected[index] = "Email is already registered"
+            continue
+        seen.add(row["email"])
+        to_insert.append({"name": row["name"], "email": row["email"]})
+    if to_insert:
+        db.execute(insert(models.Tenant), to_insert)
+        analytics.bump(db, {analytics.TENANTS: len(to_insert)})
+        db.commit()
+        response_cache.invalidate("tenants")
+    return rejected
+
+
 # Admin-related CRUD operations
 
+def get_user(db: Session, user_id: int):
+    return db.query(models.User).filter(models.User.id == user_id).first()
+
 def get_user_by_username(db: Session, username: str):
     return db.query(models.User).filter(models.User.username == username).first()
 
-def get_users(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(models.User).offset(skip).limit(limit).all()
+def get_user_by_username_or_email(db: Session, username: str, email: str):
+    return db.query(models.User).filter((models.User.username == username) | (models.User.email == email)).first()
+
+def get_users(db: Session, skip: int = 0, limit: int = 10, columns: Optional[list] = None):
+    query = db.query(*columns) if columns else db.query(models.User)
+    return query.order_by(models.User.id).offset(skip).limit(limit).all()
 
 def update_user_role(db: Session, user_id: int, role: str):
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if user:
-        user.is_admin = role.lower() == "admin"
+        is_admin = role.lower() == "admin"
+        if user.is_admin != is_admin:
+            user.is_admin = is_admin
+            user.token_version = models.User.token_version + 1
         db.commit()
         db.refresh(user)
+        principal_cache.pop(user.id)
     return user
 # Application-related CRUD operations
 
+TENANT_NOT_FOUND = "Tenant not found"
+PROPERTY_NOT_FOUND = "Property not found"
+DUPLICATE_PENDING = "A pending application for this tenant and property already exists"
+
+
+class ApplicationRejected(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+def _application_rejections(db: Session, pairs):
+    """Check (tenant_id, property_id) pairs with three set-based queries; returns ``{index: reason}``."""
+    tenant_ids = {tenant_id for tenant_id, _ in pairs}
+    property_ids = {property_id for _, property_id in pairs}
+    known_tenants = set(db.scalars(select(models.Tenant.id).where(models.Tenant.id.in_(tenant_ids))))
+    known_properties = set(db.scalars(
+        select(models.Property.id).where(models.Property.id.in_(property_ids), models.Property.deleted_at.is_(None))
+    ))
+    pending = set(
+        db.execute(
+            select(models.RentalApplication.tenant_id, models.RentalApplication.property_id).where(
+                models.RentalApplication.status == "pending",
+                models.RentalApplication.tenant_id.in_(tenant_ids),
+                models.RentalApplication.property_id.in_(property_ids),
+            )
+        ).tuples()
+    )
+    rejected = {}
+    for index, pair in enumerate(pairs):
+        tenant_id, property_id = pair
+        if tenant_id not in known_tenants:
+            rejected[index] = TENANT_NOT_FOUND
+        elif property_id not in known_properties:
+            rejected[index] = PROPERTY_NOT_FOUND
+        elif pair in pending:
+            rejected[index] = DUPLICATE_PENDING
+        else:
+            # Later copies of the same pair in this batch are duplicates
+            pending.add(pair)
+    return rejected
+
+def _application_audiences(db: Session, pairs):
+    """Users who may see events about each (tenant_id, property_id): the tenant's user and the owner."""
+    tenant_users = dict(db.execute(
+        select(models.Tenant.id, models.Tenant.user_id).where(models.Tenant.id.in_({t for t, _ in pairs}))
+    ).all())
+    owners = dict(db.execute(
+        select(models.Property.id, models.Property.owner_id).where(models.Property.id.in_({p for _, p in pairs}))
+    ).all())
+    return {pair: {tenant_users.get(pair[0]), owners.get(pair[1])} for pair in pairs}
+
+def _application_event(application_id: int, tenant_id: int, property_id: int, status: str) -> dict:
+    return {"id": application_id, "tenant_id": tenant_id, "property_id": property_id, "status": status}
+
 def create_application(db: Session, application: schemas.RentalApplicationCreate):
-    db_application = models.RentalApplication(**application.dict())
+    rejected = _application_rejections(db, [(application.tenant_id, application.property_id)])
+    if rejected:
+        raise ApplicationRejected(rejected[0])
+    db_application = models.RentalApplication(**application.dict(), status="pending")
     db.add(db_application)
-    db.commit()
+    analytics.bump(db, analytics.application_deltas(db_application.status))
+    pair = (application.tenant_id, application.property_id)
+    audience = _application_audiences(db, [pair])[pair]
+    try:
+        db.commit()
+    except IntegrityError:
+        # Lost a race with a concurrent submission; the partial unique index decided
+        db.rollback()
+        raise ApplicationRejected(DUPLICATE_PENDING)
     db.refresh(db_application)
+    events.publish("applications.created", _application_event(db_application.id, *pair, "pending"), audience)
     return db_application
 
-def get_application(db: Session, application_id: int):
-    return db.query(models.RentalApplication).filter(models.RentalApplication.id == application_id).first()
+def _write_application_batch(db: Session, submissions, pairs, rejected):
+    accepted = [index for index in range(len(submissions)) if index not in rejected]
+    application_ids = {}
+    if accepted:
+        now = datetime.utcnow()
+        result = db.execute(
+            insert(models.RentalApplication).returning(models.RentalApplication.id, sort_by_parameter_order=True),
+            [{"tenant_id": pairs[i][0], "property_id": pairs[i][1], "status": "pending", "submission_date": now} for i in accepted],
+        )
+        application_ids = dict(zip(accepted, result.scalars()))
+        analytics.bump(db, analytics.application_deltas("pending", len(accepted)))
+        audiences = _application_audiences(db, [pairs[i] for i in accepted])
+    outcomes = {}
+    for index, (submission_id, _, _) in enumerate(submissions):
+        if index in rejected:
+            outcomes[submission_id] = ("rejected", None, rejected[index])
+        else:
+            outcomes[submission_id] = ("accepted", application_ids[index], None)
+    db.execute(insert(models.ApplicationSubmission), [
+        {
+            "id": submission_id,
+            "tenant_id": pair[0],
+            "property_id": pair[1],
+            "status": outcomes[submission_id][0],
+            "application_id": outcomes[submission_id][1],
+            "error": outcomes[submission_id][2],
+            "user_id": user_id,
+        }
+        for (submission_id, _, user_id), pair in zip(submissions, pairs)
+    ])
+    db.commit()
+    for index in accepted:
+        events.publish("applications.created", _application_event(application_ids[index], *pairs[index], "pending"), audiences[pairs[index]])
+    return outcomes
+
+def ingest_application_batch(db: Session, submissions):
+    """Group-commit queued submissions given as ``(submission_id, RentalApplicationCreate, user_id)``.
+
+    Valid ones become pending applications and every submission gets an
+    outcome row, all in one commit. Returns ``{submission_id: (status, application_id, error)}``.
+    """
+    pairs = [(application.tenant_id, application.property_id) for _, application, _ in submissions]
+    rejected = _application_rejections(db, pairs)
+    try:
+        return _write_application_batch(db, submissions, pairs, rejected)
+    except IntegrityError:
+        # A concurrent synchronous submission took a pair; redo one at a time
+        db.rollback()
+    if len(submissions) > 1:
+        outcomes = {}
+        for submission in submissions:
+            outcomes.update(ingest_application_batch(db, [submission]))
+        return outcomes
+    return _write_application_batch(db, submissions, pairs, {0: DUPLICATE_PENDING})
+
+def get_application_submission_for_user(db: Session, submission_id: str, user_id: int, is_admin: bool):
+    """Fetch a submission's outcome only if the user submitted it (admins see all)."""
+    query = db.query(models.ApplicationSubmission).filter(models.ApplicationSubmission.id == submission_id)
+    if not is_admin:
+        query = query.filter(models.ApplicationSubmission.user_id == user_id)
+    return query.first()
+
+# Eager-loading strategies for an application's tenant and property
+APPLICATION_LOADERS = {"selectin": selectinload, "joined": joinedload}
+
+def _application_query(db: Session, load: Optional[str] = None):
+    query = db.query(models.RentalApplication)
+    if load is not None:
+        loader = APPLICATION_LOADERS[load]
+        query = query.options(loader(models.RentalApplication.tenant), loader(models.RentalApplication.property))
+    return query
+
+def get_application(db: Session, application_id: int, load: Optional[str] = None):
+    return _application_query(db, load).filter(models.RentalApplication.id == application_id).first()
+
+def get_application_for_user(db: Session, application_id: int, user_id: int, is_admin: bool, load: Optional[str] = None):
+    """Fetch an application only if the user may see it; ownership is checked in SQL."""
+    query = _application_query(db, load).filter(models.RentalApplication.id == application_id)
+    if not is_admin:
+        query = query.join(models.Tenant, models.RentalApplication.tenant_id == models.Tenant.id).filter(
+            models.Tenant.user_id == user_id
+        )
+    return query.first()
 
 def update_application_status(db: Session, application_id: int, status: str):
+    """Set an application's status; returns None when it does not exist.
+
+    Raises ApplicationRejected when reopening it would give the tenant a
+    second pending application for the same property.
+    """
     application = db.query(models.RentalApplication).filter(models.RentalApplication.id == application_id).first()
     if application:
+        deltas = analytics.application_deltas(application.status, -1)
+        deltas.update(analytics.application_deltas(status))
         application.status = status
-        db.commit()
+        analytics.bump(db, deltas)
+        pair = (application.tenant_id, application.property_id)
+        audience = _application_audiences(db, [pair])[pair]
+        try:
+            db.commit()
+        except IntegrityError:
+            # The partial unique index allows one pending application per pair
+            db.rollback()
+            raise ApplicationRejected(DUPLICATE_PENDING)
         db.refresh(application)
+        events.publish("applications.status", _application_event(application.id, *pair, status), audience)
     return application
 
-def list_applications(db: Session, skip: int = 0, limit: int = 10):
-    return db.query(models.RentalApplication).offset(skip).limit(limit).all()
\ No newline at end of file
+APPROVED = "approved"
+REJECTED = "rejected"
+APPLICATION_NOT_FOUND = "Application not found"
+NOT_PENDING = "Application is not pending"
+DUPLICATE_DECISION = "Application appears more than once in the batch"
+COMPETING_APPROVAL = "Another application for this property is approved in this batch"
+
+def review_applications(db: Session, decisions: List[schemas.ApplicationDecision]):
+    """Apply approve/reject decisions to pending applications in one transaction.
+
+    Approving an application rejects the other pending applications for its
+    property. Only rows still pending at UPDATE time change, so a concurrent
+    reviewer can't be overwritten. Returns one result per decision, then one
+    per auto-rejected application.
+    """
+    application = models.RentalApplication
+    # Literal rather than a bound parameter, so SQLite can use the partial pending index
+    pending = application.status == literal_column("'pending'")
+    ids = [decision.id for decision in decisions]
+    repeats = Counter(ids)
+    current = {
+        row.id: row for row in db.execute(
+            select(application.id, application.tenant_id, application.property_id, application.status)
+            .where(application.id.in_(ids))
+        )
+    }
+    errors, wanted, approved_properties = {}, {}, set()
+    for decision in decisions:
+        row = current.get(decision.id)
+        if row is None:
+            errors[decision.id] = APPLICATION_NOT_FOUND
+        elif repeats[decision.id] > 1:
+            errors[decision.id] = DUPLICATE_DECISION
+        elif row.status != "pending":
+            errors[decision.id] = NOT_PENDING
+        elif decision.status == APPROVED and row.property_id in approved_properties:
+            errors[decision.id] = COMPETING_APPROVAL
+        else:
+            wanted[decision.id] = decision.status
+            if decision.status == APPROVED:
+                approved_properties.add(row.property_id)
+
+    changed = {}
+    for new_status in (APPROVED, REJECTED):
+        chosen = [id for id, status in wanted.items() if status == new_status]
+        if chosen:
+            changed.update((id, new_status) for id in db.scalars(
+                update(application).where(application.id.in_(chosen), pending).values(status=new_status)
+                .returning(application.id).execution_options(synchronize_session=False)
+            ))
+    competitors = []
+    if approved_properties:
+        competitors = db.execute(
+            update(application)
+            .where(application.property_id.in_(approved_properties), pending)
+            .values(status=REJECTED)
+            .returning(application.id, application.tenant_id, application.property_id)
+            .execution_options(synchronize_session=False)
+        ).all()
+    for id in wanted.keys() - changed.keys():
+        # Decided by someone else between our read and the UPDATE
+        errors[id] = NOT_PENDING
+
+    deltas = Counter()
+    for status in list(changed.values()) + [REJECTED] * len(competitors):
+        deltas.update(analytics.application_deltas("pending", -1))
+        deltas.update(analytics.application_deltas(status))
+    pairs = {id: (current[id].tenant_id, current[id].property_id) for id in changed}
+    pairs.update((row.id, (row.tenant_id, row.property_id)) for row in competitors)
+    audiences = _application_audiences(db, list(set(pairs.values()))) if pairs else {}
+    analytics.bump(db, deltas)
+    db.commit()
+
+    statuses = dict(changed)
+    statuses.update((row.id, REJECTED) for row in competitors)
+    for id, status in statuses.items():
+        events.publish("applications.status", _application_event(id, *pairs[id], status), audiences[pairs[id]])
+    results = []
+    for decision in decisions:
+        if decision.id in changed:
+            results.append({"id": decision.id, "outcome": "updated", "status": changed[decision.id]})
+        else:
+            row = current.get(decision.id)
+            results.append({
+                "id": decision.id, "outcome": "skipped", "status": statuses.get(decision.id, row.status if row else None),
+                "error": errors[decision.id],
+            })
+    results.extend({"id": row.id, "outcome": "auto_rejected", "status": REJECTED} for row in competitors)
+    return results
+
+def list_applications(db: Session, skip: int = 0, limit: int = 10, load: Optional[str] = None, columns: Optional[list] = None):
+    query = db.query(*columns) if columns else _application_query(db, load)
+    return query.order_by(models.RentalApplication.id).offset(skip).limit(limit).all()
+
+def list_user_applications(db: Session, user_id: int, skip: int = 0, limit: int = 10, load: Optional[str] = "selectin"):
+    return (
+        _application_query(db, load)
+        .join(models.Tenant, models.RentalApplication.tenant_id == models.Tenant.id)
+        .filter(models.Tenant.user_id == user_id)
+        .order_by(models.RentalApplication.id.desc())
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
+
+# Rental agreements, maintenance requests and scheduled jobs
+
+def create_rental_agreement(db: Session, agreement: schemas.RentalAgreementCreate):
+    db_agreement = models.RentalAgreement(**agreement.dict(), active=True)
+    db.add(db_agreement)
+    db.commit()
+    db.refresh(db_agreement)
+    return db_agreement
+
+def create_maintenance_request(db: Session, request: schemas.MaintenanceRequestCreate):
+    db_request = models.MaintenanceRequest(**request.dict(), status="open")
+    db.add(db_request)
+    db.commit()
+    db.refresh(db_request)
+    return db_request
+
+def get_scheduled_jobs(db: Session):
+    return db.query(models.ScheduledJob).order_by(models.ScheduledJob.name).all()
+
+
+# Payments ledger
+
+def _replay_payment(db: Session, key: models.IdempotencyKey, request_hash: str):
+    if key.request_hash != request_hash:
+        raise ledger.IdempotencyConflict("Idempotency key was already used for a different request")
+    return db.get(models.LedgerEntry, key.entry_id), True
+
+def record_payment(db: Session, payment: schemas.PaymentCreate, idempotency_key: Optional[str] = None):
+    """Post a payment; returns ``(entry, replayed)``.
+
+    A repeated ``idempotency_key`` returns the entry the first request
+    created instead of posting again; reusing it for a different payment
+    raises IdempotencyConflict.
+    """
+    request_hash = ledger.request_fingerprint(payment.model_dump_json())
+    if idempotency_key:
+        existing = db.get(models.IdempotencyKey, idempotency_key)
+        if existing is not None:
+            return _replay_payment(db, existing, request_hash)
+    (entry_id,) = ledger.post_entries(db, [{
+        "tenant_id": payment.tenant_id,
+        "property_id": payment.property_id,
+        "agreement_id": None,
+        "kind": ledger.PAYMENT,
+        "amount_cents": -ledger.to_cents(payment.amount),
+        "period": None,
+        "reference": payment.reference,
+        "description": payment.description,
+    }])
+    if idempotency_key:
+        db.add(models.IdempotencyKey(key=idempotency_key, request_hash=request_hash, entry_id=entry_id))
+    try:
+        db.commit()
+    except IntegrityError:
+        # A concurrent request with the same key won the race
+        db.rollback()
+        existing = db.get(models.IdempotencyKey, idempotency_key) if idempotency_key else None
+        if existing is None:
+            raise
+        return _replay_payment(db, existing, request_hash)
+    return db.get(models.LedgerEntry, entry_id), False
+
+def get_tenant_balance(db: Session, tenant_id: int):
+    return db.get(models.TenantBalance, tenant_id)
+
+def get_ledger_history(db: Session, tenant_id: int, cursor: Optional[str] = None, limit: int = 50):
+    """One page of a tenant's entries, newest first; returns ``(entries, next_cursor)``."""
+    query = db.query(models.LedgerEntry).filter(models.LedgerEntry.tenant_id == tenant_id)
+    if cursor:
+        cursor_sort, _, last_id = decode_cursor(cursor)
+        if cursor_sort != "history":
+            raise ValueError("Invalid cursor")
+        query = query.filter(models.LedgerEntry.id < last_id)
+    rows = query.order_by(models.LedgerEntry.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor("history", None, rows[-1].id)
+    return rows, next_cursor
+
+
+def _archive_page(query, model, cursor: Optional[str], limit: int):
+    if cursor:
+        cursor_sort, _, last_id = decode_cursor(cursor)
+        if cursor_sort != "archive":
+            raise ValueError("Invalid cursor")
+        query = query.filter(model.id < last_id)
+    rows = query.order_by(model.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor("archive", None, rows[-1].id)
+    return rows, next_cursor
+
+def get_archived_applications(
+    db: Session,
+    tenant_id: Optional[int] = None,
+    property_id: Optional[int] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+):
+    """One page of archived applications, newest first; returns ``(applications, next_cursor)``."""
+    model = models.ArchivedApplication
+    query = db.query(model)
+    if tenant_id is not None:
+        query = query.filter(model.tenant_id == tenant_id)
+    if property_id is not None:
+        query = query.filter(model.property_id == property_id)
+    if status is not None:
+        query = query.filter(model.status == status)
+    return _archive_page(query, model, cursor, limit)
+
+def get_archived_properties(db: Session, owner_id: Optional[int] = None, cursor: Optional[str] = None, limit: int = 50):
+    """One page of archived properties, newest first; returns ``(properties, next_cursor)``."""
+    model = models.ArchivedProperty
+    query = db.query(model)
+    if owner_id is not None:
+        query = query.filter(model.owner_id == owner_id)
+    return _archive_page(query, model, cursor, limit)
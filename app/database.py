@@ -1,13 +1,166 @@
 #database.py
+import contextvars
+import os
+import random
+from typing import Optional
 from sqlalchemy.orm import Session, sessionmaker
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.sql.dml import UpdateBase
+from app.metrics import TimedAsyncAdaptedQueuePool, TimedQueuePool, instrument_engine
 
-# Set up the database engine and session
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"  # Example URL for SQLite
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).lower() in ("1", "true", "yes", "on")
+
+
+# Engine settings, overridable through the environment
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
+# Comma-separated read replicas. For SQLite, a read-only connection to the
+# same file works: sqlite:///file:test.db?mode=ro&uri=true
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))  # seconds
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+
+
+def _is_sqlite_memory(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers run alongside the single writer; NORMAL sync is safe under WAL
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    # SQLite has no statement timeout; bound how long a writer waits on the lock instead
+    cursor.execute(f"PRAGMA busy_timeout={DB_STATEMENT_TIMEOUT_MS}")
+    cursor.close()
+
+
+def _engine_options(url, is_async: bool, overrides: dict) -> dict:
+    backend = url.get_backend_name()
+    options = {
+        "pool_pre_ping": DB_POOL_PRE_PING,
+        "pool_recycle": DB_POOL_RECYCLE,
+    }
+    if not _is_sqlite_memory(url):
+        options.update(
+            poolclass=TimedAsyncAdaptedQueuePool if is_async else TimedQueuePool,
+            pool_size=DB_POOL_SIZE,
+            max_overflow=DB_MAX_OVERFLOW,
+            pool_timeout=DB_POOL_TIMEOUT,
+        )
+    connect_args = {}
+    if backend == "sqlite" and not is_async:
+        connect_args["check_same_thread"] = False
+    elif backend == "postgresql" and DB_STATEMENT_TIMEOUT_MS:
+        if is_async:
+            connect_args["server_settings"] = {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}
+        else:
+            connect_args["options"] = f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"
+    options["connect_args"] = connect_args
+    options.update(overrides)
+    return options
+
+
+def create_db_engine(url: Optional[str] = None, **overrides):
+    """Build the sync engine from the settings above; keyword overrides win."""
+    url = make_url(url or SQLALCHEMY_DATABASE_URL)
+    db_engine = create_engine(url, **_engine_options(url, False, overrides))
+    if url.get_backend_name() == "sqlite" and not _is_sqlite_memory(url):
+        event.listen(db_engine, "connect", _set_sqlite_pragmas)
+    return instrument_engine(db_engine)
+
+
+def create_async_db_engine(url: Optional[str] = None, **overrides):
+    """Async counterpart of create_db_engine; sync URLs are mapped to the async driver."""
+    url = make_url(to_async_url(url or SQLALCHEMY_DATABASE_URL))
+    db_engine = create_async_engine(url, **_engine_options(url, True, overrides))
+    if url.get_backend_name() == "sqlite" and not _is_sqlite_memory(url):
+        event.listen(db_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    instrument_engine(db_engine.sync_engine)
+    return db_engine
+
+
+def to_async_url(url) -> str:
+    """Map a sync database URL onto the matching async driver."""
+    if not isinstance(url, str):
+        url = url.render_as_string(hide_password=False)
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    if url.startswith("postgresql://"):
+        return "postgresql+asyncpg://" + url[len("postgresql://"):]
+    if url.startswith("postgres://"):
+        return "postgresql+asyncpg://" + url[len("postgres://"):]
+    return url
+
+
+# Set by ReadRoutingMiddleware for requests whose reads may go to a replica;
+# sessions opened anywhere else (jobs, the ingest writer) stay on the primary
+use_replica = contextvars.ContextVar("use_replica", default=False)
+# Set for callers pinned to the primary after their own write; they bypass
+# cached responses, which may have been filled from a lagging replica
+read_your_writes = contextvars.ContextVar("read_your_writes", default=False)
+
+
+class RoutingSession(Session):
+    """Session that reads from a replica when ``use_replica`` is set.
+
+    One replica is picked per session so its reads share a snapshot. Flushes
+    and DML go to the primary, and so does everything after the first write,
+    so a session always reads its own writes.
+    """
+
+    def __init__(self, *args, replicas=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica = random.choice(replicas) if replicas and use_replica.get() else None
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.replica is not None:
+            if not self._flushing and not isinstance(clause, UpdateBase):
+                return self.replica
+            self.replica = None
+        return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+
+
+# Set up the database engines and sessions
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine and session used by the routers; objects stay loaded after
+# commit so responses can be serialized outside the session's greenlet
+async_engine = create_async_db_engine()
+async_replica_engines = [create_async_db_engine(url) for url in DATABASE_REPLICA_URLS]
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    sync_session_class=RoutingSession,
+    replicas=[replica.sync_engine for replica in async_replica_engines],
+    autoflush=False,
+    expire_on_commit=False,
+)
+
+
+def _dispose_inherited_pools():
+    # Pooled connections opened before a fork (by a preloading parent) must
+    # not be shared with the child; drop them without closing the parent's
+    engine.dispose(close=False)
+    for async_db_engine in [async_engine, *async_replica_engines]:
+        async_db_engine.sync_engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_dispose_inherited_pools)
+
 Base = declarative_base()
 
 # Dependency to get the SQLAlchemy session
@@ -17,3 +170,9 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# Dependency to get an async SQLAlchemy session
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
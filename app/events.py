@@ -0,0 +1,190 @@
+#events.py
+# Server-push updates. The crud write paths publish small events after they
+# commit (an application changed status, a listing was added). The broker
+# fans each one out to every worker's EventBus, and each bus hands it to its
+# local subscribers: the /events/stream SSE connections, filtered per user.
+# local:// (the default) delivers within this process only. redis:// uses
+# Redis pub/sub so a write on one worker reaches streams on all of them.
+# Every subscriber has a bounded queue. A consumer that falls behind gets a
+# "resync" event and is disconnected rather than buffered without limit; on
+# reconnect it refetches.
+import asyncio
+import json
+import logging
+import os
+from typing import Iterable, NamedTuple, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+EVENT_BROKER_URL = os.getenv("EVENT_BROKER_URL", "local://")
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "100"))
+EVENT_MAX_SUBSCRIBERS = int(os.getenv("EVENT_MAX_SUBSCRIBERS", "1000"))
+EVENT_REDIS_CHANNEL = os.getenv("EVENT_REDIS_CHANNEL", "property-rental-events")
+
+TOPICS = ("applications", "properties")
+
+
+class Event(NamedTuple):
+    # "<topic>.<what happened>", e.g. "applications.status"
+    type: str
+    data: dict
+    # User ids allowed to see it; None means anyone
+    audience: Optional[Set[int]] = None
+
+    @property
+    def topic(self) -> str:
+        return self.type.split(".", 1)[0]
+
+    def encode(self) -> bytes:
+        audience = None if self.audience is None else sorted(self.audience)
+        return json.dumps({"type": self.type, "data": self.data, "audience": audience}, default=str).encode()
+
+    @classmethod
+    def decode(cls, payload: bytes) -> "Event":
+        message = json.loads(payload)
+        audience = message.get("audience")
+        return cls(message["type"], message["data"], None if audience is None else set(audience))
+
+
+class LocalBroker:
+    """In-process stand-in for a pub/sub broker: delivers straight back to this worker."""
+
+    def __init__(self):
+        self._handler = None
+
+    def start(self, handler):
+        self._handler = handler
+
+    def stop(self):
+        self._handler = None
+
+    def publish(self, payload: bytes):
+        if self._handler is not None:
+            self._handler(payload)
+
+
+class RedisBroker:
+    """Redis pub/sub fanout across workers; needs the optional ``redis`` package."""
+
+    def __init__(self, url: str, channel: str = EVENT_REDIS_CHANNEL):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self.channel = channel
+        self._thread = None
+
+    def start(self, handler):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(**{self.channel: lambda message: handler(message["data"])})
+        self._thread = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def stop(self):
+        if self._thread is not None:
+            self._thread.stop()
+            self._thread = None
+
+    def publish(self, payload: bytes):
+        self._client.publish(self.channel, payload)
+
+
+def broker_from_url(url: str):
+    if url == "local://":
+        return LocalBroker()
+    if url.startswith(("redis://", "rediss://")):
+        return RedisBroker(url)
+    raise ValueError(f"Unsupported event broker: {url}")
+
+
+class TooManySubscribers(Exception):
+    pass
+
+
+# Queue markers telling a stream to resync or to end
+OVERFLOW = object()
+CLOSED = object()
+
+
+class Subscription:
+    def __init__(self, user_id: Optional[int], is_admin: bool, topics: Iterable[str], queue_size: int):
+        self.user_id = user_id
+        self.is_admin = is_admin
+        self.topics = frozenset(topics)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size + 1)
+        self.queue_size = queue_size
+
+    def wants(self, event: Event) -> bool:
+        if event.topic not in self.topics:
+            return False
+        return event.audience is None or self.is_admin or self.user_id in event.audience
+
+
+class EventBus:
+    def __init__(self, broker=None, queue_size: int = EVENT_QUEUE_SIZE, max_subscribers: int = EVENT_MAX_SUBSCRIBERS):
+        self.broker = broker or broker_from_url(EVENT_BROKER_URL)
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._subscriptions: Set[Subscription] = set()
+        self._loop = None
+
+    def start(self):
+        if self._loop is None:
+            self._loop = asyncio.get_running_loop()
+            self.broker.start(self._receive)
+
+    def stop(self):
+        if self._loop is None:
+            return
+        self.broker.stop()
+        for subscription in list(self._subscriptions):
+            self._close(subscription, CLOSED)
+        self._loop = None
+
+    def publish(self, event_type: str, data: dict, audience: Optional[Iterable[int]] = None):
+        """Publish after the change has committed; never raises into the write path."""
+        event = Event(event_type, data, None if audience is None else {id for id in audience if id is not None})
+        try:
+            self.broker.publish(event.encode())
+        except Exception:
+            logger.exception("Publishing %s failed", event_type)
+
+    def subscribe(self, user_id: Optional[int], is_admin: bool, topics: Iterable[str] = TOPICS) -> Subscription:
+        if len(self._subscriptions) >= self.max_subscribers:
+            raise TooManySubscribers()
+        subscription = Subscription(user_id, is_admin, topics, self.queue_size)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        self._subscriptions.discard(subscription)
+
+    def _receive(self, payload: bytes):
+        # Called on the broker's thread (Redis) or inline (local)
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(self._fanout, Event.decode(payload))
+
+    def _fanout(self, event: Event):
+        for subscription in list(self._subscriptions):
+            if not subscription.wants(event):
+                continue
+            # One slot is kept for the end marker
+            if subscription.queue.qsize() >= subscription.queue_size:
+                self._close(subscription, OVERFLOW)
+            else:
+                subscription.queue.put_nowait(event)
+
+    def _close(self, subscription: Subscription, marker):
+        self.unsubscribe(subscription)
+        if marker is OVERFLOW:
+            # Nothing queued is worth delivering once the client has to resync
+            while not subscription.queue.empty():
+                subscription.queue.get_nowait()
+        if not subscription.queue.full():
+            subscription.queue.put_nowait(marker)
+
+
+event_bus = EventBus()
+
+
+def publish(event_type: str, data: dict, audience: Optional[Iterable[int]] = None):
+    event_bus.publish(event_type, data, audience)
@@ -0,0 +1,126 @@
+#geo.py
+# Radius and viewport search over property coordinates. Queries prefilter on
+# a bounding box, then rank candidates by exact great-circle distance. On
+# SQLite the box lookup goes through an R-tree virtual table kept in sync by
+# the crud write paths; other databases use the (latitude, longitude) B-tree.
+import math
+from typing import Iterable, List, Sequence, Tuple
+from sqlalchemy import and_, column, or_, select, table, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+# (south, west, north, east) in degrees
+Box = Tuple[float, float, float, float]
+
+# (id, latitude, longitude)
+PointDocument = Tuple[int, float, float]
+
+rtree = table("properties_rtree", column("id"), column("min_lat"), column("max_lat"), column("min_lon"), column("max_lon"))
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def split_viewport(south: float, west: float, north: float, east: float) -> List[Box]:
+    """Split a viewport crossing the antimeridian (west > east) into two boxes."""
+    if west <= east:
+        return [(south, west, north, east)]
+    return [(south, west, north, 180.0), (south, -180.0, north, east)]
+
+
+def radius_boxes(lat: float, lon: float, radius_km: float) -> List[Box]:
+    """Bounding boxes enclosing the circle of ``radius_km`` around (lat, lon)."""
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    south, north = max(-90.0, lat - dlat), min(90.0, lat + dlat)
+    # Near the poles the circle covers every longitude
+    cos_lat = math.cos(math.radians(max(abs(south), abs(north))))
+    if north >= 90.0 or south <= -90.0 or cos_lat <= 0:
+        return [(south, -180.0, north, 180.0)]
+    dlon = radius_km / (KM_PER_DEGREE_LAT * cos_lat)
+    if dlon >= 180.0:
+        return [(south, -180.0, north, 180.0)]
+    west, east = lon - dlon, lon + dlon
+    if west < -180.0:
+        west += 360.0
+    if east > 180.0:
+        east -= 360.0
+    return split_viewport(south, west, north, east)
+
+
+def install(connection: Connection):
+    """Create and backfill the SQLite R-tree; a no-op on other databases."""
+    if connection.dialect.name != "sqlite":
+        return
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'properties_rtree'"
+    ).first()
+    if exists:
+        return
+    connection.exec_driver_sql("CREATE VIRTUAL TABLE properties_rtree USING rtree(id, min_lat, max_lat, min_lon, max_lon)")
+    connection.exec_driver_sql(
+        "INSERT INTO properties_rtree (id, min_lat, max_lat, min_lon, max_lon) "
+        "SELECT id, latitude, latitude, longitude, longitude FROM properties "
+        "WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+    )
+
+
+def ensure_schema(engine):
+    with engine.begin() as connection:
+        install(connection)
+
+
+def _uses_rtree(db: Session) -> bool:
+    return db.get_bind().dialect.name == "sqlite"
+
+
+def remove_properties(db: Session, property_ids: Sequence[int]):
+    if property_ids and _uses_rtree(db):
+        db.execute(text("DELETE FROM properties_rtree WHERE id = :id"), [{"id": id} for id in property_ids])
+
+
+def index_properties(db: Session, documents: Iterable[PointDocument]):
+    """Add or move points; rows without coordinates are dropped from the index."""
+    if not _uses_rtree(db):
+        return
+    documents = list(documents)
+    remove_properties(db, [id for id, _, _ in documents])
+    rows = [{"id": id, "lat": lat, "lon": lon} for id, lat, lon in documents if lat is not None and lon is not None]
+    if rows:
+        db.execute(
+            text(
+                "INSERT INTO properties_rtree (id, min_lat, max_lat, min_lon, max_lon) "
+                "VALUES (:id, :lat, :lat, :lon, :lon)"
+            ),
+            rows,
+        )
+
+
+def within_boxes(db: Session, model, boxes: Sequence[Box]):
+    """WHERE clause matching rows of ``model`` whose coordinates fall in any of ``boxes``."""
+    exact = or_(
+        *(
+            and_(model.latitude.between(south, north), model.longitude.between(west, east))
+            for south, west, north, east in boxes
+        )
+    )
+    if not _uses_rtree(db):
+        return exact
+    # The R-tree stores 32-bit floats rounded outwards, so it only narrows the
+    # candidates; the exact comparison above still decides membership
+    candidates = select(rtree.c.id).where(
+        or_(
+            *(
+                and_(rtree.c.max_lat >= south, rtree.c.min_lat <= north, rtree.c.max_lon >= west, rtree.c.min_lon <= east)
+                for south, west, north, east in boxes
+            )
+        )
+    )
+    return and_(model.id.in_(candidates), exact)
@@ -0,0 +1,84 @@
+#hashing.py
+# bcrypt is CPU-bound and holds the GIL, so hashing and verification run in a
+# dedicated process pool. The number of in-flight calls is bounded: once the
+# pool is saturated new callers get a 429 instead of queueing without limit.
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from .metrics import PASSWORD_HASHING
+
+HASHING_WORKERS = int(os.getenv("HASHING_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+HASHING_MAX_PENDING = int(os.getenv("HASHING_MAX_PENDING", "64"))
+HASHING_RETRY_AFTER_SECONDS = int(os.getenv("HASHING_RETRY_AFTER_SECONDS", "1"))
+
+# Context for password hashing
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+# Module-level so they can be pickled into the worker processes
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class HashingService:
+    def __init__(self, max_workers: int = HASHING_WORKERS, max_pending: int = HASHING_MAX_PENDING):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self._executor = None
+        # Only touched from the event loop thread, so a plain counter is enough
+        self._pending = 0
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def start(self):
+        if self._executor is None:
+            # spawn rather than fork: the parent already runs threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _submit(self, operation: str, fn, *args):
+        if self._pending >= self.max_pending:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many authentication requests, please retry shortly",
+                headers={"Retry-After": str(HASHING_RETRY_AFTER_SECONDS)},
+            )
+        self._pending += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.start(), fn, *args)
+        except BrokenProcessPool:
+            # A worker died; drop the pool so the next call starts a fresh one
+            self._executor = None
+            raise
+        finally:
+            self._pending -= 1
+            PASSWORD_HASHING.observe(time.perf_counter() - start, operation)
+
+    async def hash(self, password: str) -> str:
+        return await self._submit("hash", _hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit("verify", _verify, plain_password, hashed_password)
+
+
+hashing_service = HashingService()
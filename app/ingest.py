@@ -0,0 +1,126 @@
+#ingest.py
+# Queued application submissions. Requests put a submission on an in-memory
+# queue and return 202 at once; a single writer task drains the queue in
+# micro-batches (up to APPLICATION_BATCH_SIZE items, or whatever arrived
+# within APPLICATION_BATCH_WAIT_MS of the first) and group-commits each batch,
+# so a burst on a hot listing costs one transaction per batch instead of one
+# per submission. Outcomes are persisted with the batch for status polling.
+import asyncio
+import logging
+import os
+import uuid
+from typing import Dict, Optional, Tuple
+from . import crud, schemas
+from .cache import TTLCache
+from .database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+APPLICATION_QUEUE_SIZE = int(os.getenv("APPLICATION_QUEUE_SIZE", "10000"))
+APPLICATION_BATCH_SIZE = int(os.getenv("APPLICATION_BATCH_SIZE", "500"))
+APPLICATION_BATCH_WAIT_MS = float(os.getenv("APPLICATION_BATCH_WAIT_MS", "20"))
+APPLICATION_RETRY_AFTER_SECONDS = int(os.getenv("APPLICATION_RETRY_AFTER_SECONDS", "1"))
+
+
+class QueueFull(Exception):
+    pass
+
+
+class ApplicationIngestor:
+    def __init__(self, session_factory=AsyncSessionLocal, max_queue: int = APPLICATION_QUEUE_SIZE,
+                 batch_size: int = APPLICATION_BATCH_SIZE, batch_wait_ms: float = APPLICATION_BATCH_WAIT_MS):
+        self.session_factory = session_factory
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._task = None
+        # Accepted by this worker but not committed yet, with the submitting user
+        self._queued: Dict[str, Tuple[schemas.RentalApplicationCreate, int]] = {}
+        # Batches whose commit failed outright; nothing was persisted for them
+        self._failed = TTLCache(maxsize=max_queue, ttl=3600)
+
+    def start(self):
+        if self._task is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        # Commit what was already acknowledged before shutting down
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    def submit(self, application: schemas.RentalApplicationCreate, user_id: int) -> str:
+        if self._queue is None:
+            raise RuntimeError("Application ingestion is not running")
+        submission_id = uuid.uuid4().hex
+        try:
+            self._queue.put_nowait((submission_id, application, user_id))
+        except asyncio.QueueFull:
+            raise QueueFull()
+        self._queued[submission_id] = (application, user_id)
+        return submission_id
+
+    def local_status(self, submission_id: str, user_id: int, is_admin: bool) -> Optional[schemas.ApplicationSubmissionRead]:
+        """Status of a submission this worker has not persisted yet, if any and if the user may see it."""
+        queued = self._queued.get(submission_id)
+        if queued is not None:
+            application, owner_id = queued
+            submission = schemas.ApplicationSubmissionRead(
+                id=submission_id, status="queued", tenant_id=application.tenant_id, property_id=application.property_id
+            )
+        else:
+            submission, owner_id = self._failed.get(submission_id, (None, None))
+        if submission is None or not (is_admin or owner_id == user_id):
+            return None
+        return submission
+
+    async def _next_batch(self):
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_wait
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                async with self.session_factory() as session:
+                    await session.run_sync(crud.ingest_application_batch, batch)
+            except Exception:
+                logger.exception("Committing %d application submissions failed", len(batch))
+                for submission_id, application, user_id in batch:
+                    self._failed.set(submission_id, (schemas.ApplicationSubmissionRead(
+                        id=submission_id,
+                        status="failed",
+                        tenant_id=application.tenant_id,
+                        property_id=application.property_id,
+                        error="Submission could not be saved, please submit again",
+                    ), user_id))
+            finally:
+                for submission_id, _, _ in batch:
+                    self._queued.pop(submission_id, None)
+                    self._queue.task_done()
+
+
+application_ingestor = ApplicationIngestor()
@@ -0,0 +1,197 @@
+#ledger.py
+# Append-only tenant ledger. Every posting inserts ledger_entries rows and
+# moves the tenant's tenant_balances snapshot in the same transaction, so a
+# balance is one primary-key read rather than a SUM over the history; each
+# entry also records the balance right after it. Database triggers refuse
+# UPDATE and DELETE on entries. Rent runs post charges for due agreements in
+# batches and advance their due dates in the same commit.
+import hashlib
+import os
+from calendar import monthrange
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Dict, List
+from sqlalchemy import bindparam, delete, insert, select, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from . import models
+
+LEDGER_BATCH_SIZE = int(os.getenv("LEDGER_BATCH_SIZE", "1000"))
+IDEMPOTENCY_KEY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "72"))
+
+RENT = "rent"
+PAYMENT = "payment"
+ADJUSTMENT = "adjustment"
+
+
+class IdempotencyConflict(Exception):
+    """An idempotency key was reused with a different request body."""
+
+
+def to_cents(amount) -> int:
+    return int((Decimal(str(amount)) * 100).to_integral_value(rounding=ROUND_HALF_UP))
+
+
+def request_fingerprint(payload: str) -> str:
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def add_month(day: date, anchor_day: int) -> date:
+    """The same day-of-month one month later, clamped to the month's end (Jan 31 -> Feb 28)."""
+    year, month = (day.year + 1, 1) if day.month == 12 else (day.year, day.month + 1)
+    return date(year, month, min(anchor_day, monthrange(year, month)[1]))
+
+
+def install(connection: Connection):
+    """Create the triggers that keep ledger_entries append-only."""
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        for operation in ("UPDATE", "DELETE"):
+            connection.exec_driver_sql(
+                f"CREATE TRIGGER IF NOT EXISTS ledger_entries_no_{operation.lower()} "
+                f"BEFORE {operation} ON ledger_entries "
+                "BEGIN SELECT RAISE(ABORT, 'ledger entries are append-only'); END"
+            )
+    elif dialect == "postgresql":
+        connection.exec_driver_sql(
+            "CREATE OR REPLACE FUNCTION ledger_entries_append_only() RETURNS trigger AS $$ "
+            "BEGIN RAISE EXCEPTION 'ledger entries are append-only'; END $$ LANGUAGE plpgsql"
+        )
+        connection.exec_driver_sql("DROP TRIGGER IF EXISTS ledger_entries_append_only ON ledger_entries")
+        connection.exec_driver_sql(
+            "CREATE TRIGGER ledger_entries_append_only BEFORE UPDATE OR DELETE ON ledger_entries "
+            "FOR EACH ROW EXECUTE FUNCTION ledger_entries_append_only()"
+        )
+
+
+def ensure_schema(engine):
+    with engine.begin() as connection:
+        install(connection)
+
+
+def _apply_balance_deltas(db: Session, deltas: Dict[int, int]) -> Dict[int, int]:
+    """Add per-tenant deltas to the balance snapshots; returns the new balances."""
+    table = models.TenantBalance.__table__
+    now = datetime.utcnow()
+    rows = [{"tenant_id": tenant_id, "balance_cents": delta, "updated_at": now} for tenant_id, delta in deltas.items()]
+    dialect = db.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        stmt = upsert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.tenant_id],
+            set_={"balance_cents": table.c.balance_cents + stmt.excluded.balance_cents, "updated_at": stmt.excluded.updated_at},
+        ).returning(table.c.tenant_id, table.c.balance_cents)
+        return {tenant_id: balance for tenant_id, balance in db.execute(stmt, rows)}
+    balances = {}
+    for row in rows:
+        result = db.execute(
+            update(table)
+            .where(table.c.tenant_id == row["tenant_id"])
+            .values(balance_cents=table.c.balance_cents + row["balance_cents"], updated_at=now)
+        )
+        if result.rowcount == 0:
+            db.execute(insert(table).values(**row))
+        balances[row["tenant_id"]] = db.scalar(select(table.c.balance_cents).where(table.c.tenant_id == row["tenant_id"]))
+    return balances
+
+
+def post_entries(db: Session, entries: List[dict]) -> List[int]:
+    """Append entries in the caller's transaction and return their ids; the caller commits.
+
+    Each entry needs tenant_id, kind and amount_cents; the balance columns
+    are filled in here.
+    """
+    if not entries:
+        return []
+    deltas = defaultdict(int)
+    for entry in entries:
+        deltas[entry["tenant_id"]] += entry["amount_cents"]
+    # The snapshot row lock serializes concurrent postings for a tenant, and
+    # the new balance minus this batch's total is where the batch starts
+    balances = _apply_balance_deltas(db, deltas)
+    running = {tenant_id: balances[tenant_id] - delta for tenant_id, delta in deltas.items()}
+    now = datetime.utcnow()
+    rows = []
+    for entry in entries:
+        running[entry["tenant_id"]] += entry["amount_cents"]
+        rows.append(dict(entry, balance_after_cents=running[entry["tenant_id"]], created_at=now))
+    result = db.execute(
+        insert(models.LedgerEntry).returning(models.LedgerEntry.id, sort_by_parameter_order=True),
+        rows,
+    )
+    return [entry_id for (entry_id,) in result]
+
+
+def post_rent_charges(db: Session, context) -> int:
+    """Charge every active agreement whose rent is due, a batch per commit.
+
+    Each charged agreement moves to its next due date in the same commit (an
+    agreement behind by several months is charged once per month), and the
+    unique (agreement_id, period) index rejects a second charge for a period.
+    """
+    agreement = models.RentalAgreement
+    today = context.now.date()
+    statement = (
+        select(
+            agreement.id,
+            agreement.tenant_id,
+            agreement.property_id,
+            agreement.monthly_rent,
+            agreement.start_date,
+            agreement.end_date,
+            agreement.next_due_date,
+        )
+        .where(agreement.active.is_(True), agreement.next_due_date <= today)
+        .order_by(agreement.next_due_date, agreement.id)
+        .limit(LEDGER_BATCH_SIZE)
+    )
+    table = agreement.__table__
+    advance = (
+        update(table)
+        .where(table.c.id == bindparam("row_id"))
+        .values(next_due_date=bindparam("next_due"), active=bindparam("still_active"))
+    )
+    posted = 0
+    while True:
+        # Every row in a batch is advanced or deactivated, so rerunning the
+        # query yields the next batch
+        rows = db.execute(statement).all()
+        if not rows:
+            return posted
+        charges = []
+        updates = []
+        for row in rows:
+            if row.end_date is not None and row.next_due_date > row.end_date:
+                updates.append({"row_id": row.id, "next_due": row.next_due_date, "still_active": False})
+                continue
+            charges.append({
+                "tenant_id": row.tenant_id,
+                "property_id": row.property_id,
+                "agreement_id": row.id,
+                "kind": RENT,
+                "amount_cents": to_cents(row.monthly_rent),
+                "period": row.next_due_date,
+                "description": f"Rent due {row.next_due_date.isoformat()}",
+            })
+            updates.append({
+                "row_id": row.id,
+                "next_due": add_month(row.next_due_date, row.start_date.day),
+                "still_active": True,
+            })
+        post_entries(db, charges)
+        db.execute(advance, updates)
+        db.commit()
+        posted += len(charges)
+        context.renew()
+
+
+def purge_idempotency_keys(db: Session, context) -> int:
+    cutoff = context.now - timedelta(hours=IDEMPOTENCY_KEY_TTL_HOURS)
+    result = db.execute(delete(models.IdempotencyKey).where(models.IdempotencyKey.created_at < cutoff))
+    db.commit()
+    return result.rowcount
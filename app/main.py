@@ -1,64 +1,112 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi.security import OAuth2PasswordBearer
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.openapi.utils import get_openapi
-from app.database import Base, engine
-from app.routers import properties, admin, application, tenants, auth
+from app import cli, warmup
+from app.hashing import hashing_service
+from app.ingest import application_ingestor
+from app.scheduler import scheduler
+from app import metrics, ratelimit, replicas
+from app.events import event_bus
+from app.routers import properties, admin, application, tenants, auth, payments, events
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+# Tables are created by `python -m app.cli migrate`, run once per deploy.
+# AUTO_MIGRATE=true runs it at startup instead (single-process dev setups).
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "false").lower() in ("1", "true", "yes", "on")
 
-app = FastAPI(title="Property Rental Management Platform")
-
-# Set up CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if AUTO_MIGRATE:
+        cli.migrate()
+    # Open pooled connections and compile the hot queries before taking traffic
+    await warmup.warm_up()
+    # Start the bcrypt worker processes up front so the first login doesn't pay for it
+    hashing_service.start()
+    # Reminder jobs; leases keep them single-run across workers
+    scheduler.start()
+    # Writer task that group-commits queued application submissions
+    application_ingestor.start()
+    # Fans committed changes out to the /events/stream subscribers
+    event_bus.start()
+    yield
+    # Ends open event streams so shutdown doesn't wait on them
+    event_bus.stop()
+    await application_ingestor.stop()
+    await scheduler.stop()
+    hashing_service.shutdown()
 
 # Define the OAuth2 scheme
 # Define the OAuth2 scheme
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")  # Ensure this matches the correct endpoint
 
-# Custom OpenAPI function
-def custom_openapi():
-    if app.openapi_schema:
-        return app.openapi_schema
-    openapi_schema = get_openapi(
-        title="Property Rental Management Platform",
-        version="1.0",
-        description="API for managing property rentals",
-        routes=app.routes,
+def create_app() -> FastAPI:
+    app = FastAPI(title="Property Rental Management Platform", lifespan=lifespan)
+
+    # Lets GET requests read from replicas unless the caller just wrote
+    app.add_middleware(replicas.ReadRoutingMiddleware)
+    # Admission control runs inside metrics so rejections are still counted;
+    # rate limiting goes first so throttled callers never take a slot
+    app.add_middleware(ratelimit.ConcurrencyLimitMiddleware)
+    app.add_middleware(ratelimit.RateLimitMiddleware)
+
+    # Per-route latency and database work, exposed at /metrics
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    # Set up CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:3000"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
     )
-    openapi_schema["components"]["securitySchemes"] = {
-        "OAuth2PasswordBearer": {
-            "type": "oauth2",
-            "flows": {
-                "password": {
-                    "tokenUrl": "/auth/token",  # Ensure this matches the actual endpoint
-                    "scopes": {}
+
+    # Custom OpenAPI function
+    def custom_openapi():
+        if app.openapi_schema:
+            return app.openapi_schema
+        openapi_schema = get_openapi(
+            title="Property Rental Management Platform",
+            version="1.0",
+            description="API for managing property rentals",
+            routes=app.routes,
+        )
+        openapi_schema["components"]["securitySchemes"] = {
+            "OAuth2PasswordBearer": {
+                "type": "oauth2",
+                "flows": {
+                    "password": {
+                        "tokenUrl": "/auth/token",  # Ensure this matches the actual endpoint
+                        "scopes": {}
+                    }
                 }
             }
         }
-    }
-    app.openapi_schema = openapi_schema
-    return app.openapi_schema
+        app.openapi_schema = openapi_schema
+        return app.openapi_schema
 
-app.openapi = custom_openapi
-#oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
-# Include routers
-app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
-app.include_router(properties.router, prefix="/properties", tags=["Property Listings"])
-app.include_router(tenants.router, prefix="/tenants", tags=["Tenant Management"])
-app.include_router(application.router, prefix="/applications", tags=["Rental Applications"])
-app.include_router(admin.router, prefix="/admin", tags=["Admin Dashboard"])
+    app.openapi = custom_openapi
+    #oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/token")
+    # Include routers
+    app.include_router(auth.router, prefix="/auth", tags=["Authentication"])
+    app.include_router(properties.router, prefix="/properties", tags=["Property Listings"])
+    app.include_router(tenants.router, prefix="/tenants", tags=["Tenant Management"])
+    app.include_router(application.router, prefix="/applications", tags=["Rental Applications"])
+    app.include_router(admin.router, prefix="/admin", tags=["Admin Dashboard"])
+    app.include_router(payments.router, prefix="/payments", tags=["Payments"])
+    app.include_router(events.router, prefix="/events", tags=["Events"])
 
-@app.get("/")
-def read_root():
-    return {"message": "Welcome to the Property Management API"}
+    @app.get("/metrics", include_in_schema=False)
+    def prometheus_metrics():
+        return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
+    @app.get("/")
+    def read_root():
+        return {"message": "Welcome to the Property Management API"}
 
+    return app
 
+app = create_app()
@@ -0,0 +1,254 @@
+#metrics.py
+# Lightweight in-process metrics rendered in the Prometheus text format.
+# MetricsMiddleware times every request and attributes the database work
+# recorded by the engine hooks to it; /metrics exposes the totals for this
+# worker process.
+import contextvars
+import hashlib
+import logging
+import os
+import re
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+logger = logging.getLogger(__name__)
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _format_labels(names, values) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount: float = 1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = sorted((labels, (list(s[0]), s[1], s[2])) for labels, s in self._series.items())
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                bucket_labels = _format_labels(self.labelnames + ("le",), labels + (bound,))
+                yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+            inf_labels = _format_labels(self.labelnames + ("le",), labels + ("+Inf",))
+            yield f"{self.name}_bucket{inf_labels} {count}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, labels)} {total}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}"
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by route", ("method", "route", "status")
+)
+REQUEST_QUERIES = Histogram(
+    "http_request_db_queries", "Database statements executed per request", ("method", "route"), COUNT_BUCKETS
+)
+REQUEST_QUERY_TIME = Histogram(
+    "http_request_db_seconds", "Time spent executing database statements per request", ("method", "route")
+)
+QUERY_LATENCY = Histogram("db_query_duration_seconds", "Database statement latency")
+SLOW_QUERIES = Counter("db_slow_queries_total", "Statements slower than SLOW_QUERY_MS", ("fingerprint",))
+POOL_CHECKOUT_WAIT = Histogram("db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection")
+PASSWORD_HASHING = Histogram("password_hashing_seconds", "Time spent in bcrypt, including queueing", ("operation",))
+RATE_LIMITED = Counter("http_rate_limited_total", "Requests rejected with 429 by rate-limit policy", ("policy",))
+REQUESTS_SHED = Counter("http_requests_shed_total", "Requests rejected with 503 by the concurrency limiter")
+ADMISSION_WAIT = Histogram("http_admission_wait_seconds", "Time requests waited for a concurrency slot")
+READ_ROUTING = Counter("db_read_routing_total", "Read-only requests by the database they read from", ("target",))
+
+REGISTRY = [
+    REQUEST_LATENCY,
+    REQUEST_QUERIES,
+    REQUEST_QUERY_TIME,
+    QUERY_LATENCY,
+    SLOW_QUERIES,
+    POOL_CHECKOUT_WAIT,
+    PASSWORD_HASHING,
+    RATE_LIMITED,
+    REQUESTS_SHED,
+    ADMISSION_WAIT,
+    READ_ROUTING,
+]
+
+
+def render() -> str:
+    return "\n".join(line for metric in REGISTRY for line in metric.render()) + "\n"
+
+
+class RequestStats:
+    __slots__ = ("queries", "query_time")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_time = 0.0
+
+
+# Set by MetricsMiddleware; the engine hooks add to whichever request is current
+current_request_stats = contextvars.ContextVar("current_request_stats", default=None)
+
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Normalize a statement so queries differing only in literals group together."""
+    normalized = _LITERALS.sub("?", statement)
+    normalized = re.sub(r"%\(\w+\)s|:\w+|\$\d+|%s", "?", normalized)
+    normalized = _IN_LISTS.sub("(?+)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    QUERY_LATENCY.observe(elapsed)
+    stats = current_request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_time += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        normalized = fingerprint(statement)
+        digest = hashlib.sha1(normalized.encode()).hexdigest()[:12]
+        SLOW_QUERIES.inc(digest)
+        logger.warning("Slow query %s (%.1f ms): %s", digest, elapsed * 1000, normalized)
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute; drop its start time
+    # so the connection's stack doesn't grow (or mistime the next query)
+    conn = exception_context.connection
+    if conn is not None and exception_context.execution_context is not None and conn.info.get("query_start"):
+        conn.info["query_start"].pop()
+
+
+def instrument_engine(engine):
+    """Attach the query hooks to a sync engine (use ``async_engine.sync_engine`` for async ones)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+    return engine
+
+
+class _TimedCheckoutMixin:
+    # recreate() builds the replacement pool from self.__class__, so the timing survives dispose()
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - start)
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def route_template(scope) -> str:
+    """Label for the matched route, e.g. /properties/{property_id}.
+
+    Rebuilt from the path and its parameters, which works however routers are
+    nested; unmatched paths share one label to keep cardinality bounded.
+    """
+    if scope.get("route") is None:
+        return "unmatched"
+    placeholders = {str(value): "{" + name + "}" for name, value in scope.get("path_params", {}).items()}
+    if not placeholders:
+        return scope["path"]
+    return "/".join(placeholders.get(segment, segment) for segment in scope["path"].split("/"))
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and database work per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = current_request_stats.set(stats)
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            current_request_stats.reset(token)
+            route_path = route_template(scope)
+            method = scope["method"]
+            REQUEST_LATENCY.observe(elapsed, method, route_path, str(status_code))
+            REQUEST_QUERIES.observe(stats.queries, method, route_path)
+            REQUEST_QUERY_TIME.observe(stats.query_time, method, route_path)
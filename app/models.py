@@ -1,8 +1,9 @@
 #model.py
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Date, DateTime, Index, text
 from sqlalchemy.orm import relationship
 from .database import Base
 from datetime import datetime
+from decimal import Decimal
 
 class User(Base):
     __tablename__ = 'users'
@@ -13,11 +14,17 @@ class User(Base):
     hashed_password = Column(String)
     is_active = Column(Boolean, default=True)
     is_admin = Column(Boolean, default=False)
+    # Bumped on role or password change to invalidate issued tokens
+    token_version = Column(Integer, default=0, nullable=False)
 
     # Define relationship to Properties and Tenants
     properties = relationship("Property", back_populates="owner")
     tenants = relationship("Tenant", back_populates="user")
 
+# Partial index conditions for live and delisted properties
+LIVE = text("deleted_at IS NULL")
+DELISTED = text("deleted_at IS NOT NULL")
+
 class Property(Base):
     __tablename__ = "properties"
 
@@ -25,14 +32,33 @@ class Property(Base):
     title = Column(String, index=True)
     description = Column(String)
     price = Column(Float)
-    location = Column(String, index=True)
+    location = Column(String)
     number_of_bedrooms = Column(Integer)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
     owner_id = Column(Integer, ForeignKey("users.id"))
+    # Incremented by every update; exposed as the ETag for If-Match
+    version = Column(Integer, default=1, nullable=False, server_default="1")
+    # Set when the listing is deleted; the archival job later moves it to properties_archive
+    deleted_at = Column(DateTime, nullable=True)
 
     # Set up the reverse relationship to User and to RentalApplication
     owner = relationship("User", back_populates="properties")
     rental_applications = relationship("RentalApplication", back_populates="property")
 
+    # Composite indexes for the search filters; each ends with the sort column
+    # and id so keyset pagination can walk the index without a sort step.
+    # They only cover live listings, so delisted rows don't weigh on them.
+    __table_args__ = (
+        Index("ix_properties_location_price", "location", "price", "id", sqlite_where=LIVE, postgresql_where=LIVE),
+        Index("ix_properties_bedrooms_price", "number_of_bedrooms", "price", "id", sqlite_where=LIVE, postgresql_where=LIVE),
+        Index("ix_properties_owner_id", "owner_id", "id", sqlite_where=LIVE, postgresql_where=LIVE),
+        Index("ix_properties_price", "price", "id", sqlite_where=LIVE, postgresql_where=LIVE),
+        Index("ix_properties_lat_lon", "latitude", "longitude", sqlite_where=LIVE, postgresql_where=LIVE),
+        # The archival job's scan; covers only delisted rows
+        Index("ix_properties_deleted_at", "deleted_at", sqlite_where=DELISTED, postgresql_where=DELISTED),
+    )
+
 class Tenant(Base):
     __tablename__ = "tenants"
 
@@ -58,5 +84,210 @@ class RentalApplication(Base):
     tenant = relationship("Tenant", back_populates="rental_applications")
     property = relationship("Property", back_populates="rental_applications")
 
+    # At most one pending application per tenant and property
+    __table_args__ = (
+        Index(
+            "uq_rental_applications_pending",
+            "tenant_id",
+            "property_id",
+            unique=True,
+            sqlite_where=text("status = 'pending'"),
+            postgresql_where=text("status = 'pending'"),
+        ),
+        # Pending applications per property, for reviewing a listing's queue
+        Index(
+            "ix_rental_applications_property_pending",
+            "property_id",
+            "id",
+            sqlite_where=text("status = 'pending'"),
+            postgresql_where=text("status = 'pending'"),
+        ),
+        # Decided applications by age, for the archival job
+        Index(
+            "ix_rental_applications_archivable",
+            "submission_date",
+            "id",
+            sqlite_where=text("status != 'pending'"),
+            postgresql_where=text("status != 'pending'"),
+        ),
+    )
+
+class ApplicationSubmission(Base):
+    __tablename__ = "application_submissions"
+
+    # Outcome of a queued submission, written in the same commit as the
+    # application it created; queued submissions have no row yet
+    id = Column(String, primary_key=True)
+    tenant_id = Column(Integer, nullable=False)
+    property_id = Column(Integer, nullable=False)
+    status = Column(String, nullable=False)
+    application_id = Column(Integer, ForeignKey("rental_applications.id"), nullable=True)
+    error = Column(String, nullable=True)
+    # Who submitted it; only they (and admins) may poll its status
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class ArchivedProperty(Base):
+    __tablename__ = "properties_archive"
+
+    # Delisted properties moved out of the hot table by the archival job;
+    # same columns and ids as properties
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    title = Column(String)
+    description = Column(String)
+    price = Column(Float)
+    location = Column(String)
+    number_of_bedrooms = Column(Integer)
+    latitude = Column(Float, nullable=True)
+    longitude = Column(Float, nullable=True)
+    owner_id = Column(Integer)
+    version = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_properties_archive_owner_id", "owner_id", "id"),
+    )
+
+class ArchivedApplication(Base):
+    __tablename__ = "rental_applications_archive"
+
+    # Decided applications past the retention window, and those of archived
+    # properties; same columns and ids as rental_applications
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    tenant_id = Column(Integer)
+    property_id = Column(Integer)
+    status = Column(String)
+    submission_date = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_rental_applications_archive_tenant_id", "tenant_id", "id"),
+        Index("ix_rental_applications_archive_property_id", "property_id", "id"),
+    )
+
+
+class RentalAgreement(Base):
+    __tablename__ = "rental_agreements"
+
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False)
+    property_id = Column(Integer, ForeignKey("properties.id"), nullable=False)
+    monthly_rent = Column(Float, nullable=False)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=True)
+    next_due_date = Column(Date, nullable=False)
+    active = Column(Boolean, default=True, nullable=False)
+    # Due date the last rent reminder was sent for, so reruns don't resend
+    reminded_for = Column(Date, nullable=True)
+
+    tenant = relationship("Tenant")
+    property = relationship("Property")
+
+    # The reminder scan walks active agreements in due-date order
+    __table_args__ = (
+        Index("ix_rental_agreements_due", "active", "next_due_date", "id"),
+        Index("ix_rental_agreements_tenant_id", "tenant_id"),
+    )
+
+class MaintenanceRequest(Base):
+    __tablename__ = "maintenance_requests"
+
+    id = Column(Integer, primary_key=True)
+    property_id = Column(Integer, ForeignKey("properties.id"), nullable=False)
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=True)
+    description = Column(String, nullable=False)
+    status = Column(String, default="open", nullable=False)
+    due_date = Column(Date, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    reminded_for = Column(Date, nullable=True)
+
+    property = relationship("Property")
+    tenant = relationship("Tenant")
+
+    __table_args__ = (
+        Index("ix_maintenance_requests_due", "status", "due_date", "id"),
+    )
+
+class LedgerEntry(Base):
+    __tablename__ = "ledger_entries"
+
+    # Append-only: corrections are posted as new adjustment entries. Amounts
+    # are integer cents, positive for what the tenant owes (rent charges)
+    # and negative for what they paid.
+    id = Column(Integer, primary_key=True)
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), nullable=False)
+    property_id = Column(Integer, ForeignKey("properties.id"), nullable=True)
+    agreement_id = Column(Integer, ForeignKey("rental_agreements.id"), nullable=True)
+    kind = Column(String, nullable=False)
+    amount_cents = Column(Integer, nullable=False)
+    # The tenant's balance right after this entry
+    balance_after_cents = Column(Integer, nullable=False)
+    # Rent period (the due date) a charge is for
+    period = Column(Date, nullable=True)
+    reference = Column(String, nullable=True)
+    description = Column(String, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    # Defined before the relationships: `property` is rebound below
+    @property
+    def amount(self) -> Decimal:
+        return Decimal(self.amount_cents).scaleb(-2)
+
+    @property
+    def balance_after(self) -> Decimal:
+        return Decimal(self.balance_after_cents).scaleb(-2)
+
+    tenant = relationship("Tenant")
+    property = relationship("Property")
+
+    __table_args__ = (
+        # Payment history pages walk this index newest first
+        Index("ix_ledger_entries_tenant_id", "tenant_id", "id"),
+        # A rent run can never charge the same period twice
+        Index("uq_ledger_entries_agreement_period", "agreement_id", "period", unique=True),
+    )
+
+class TenantBalance(Base):
+    __tablename__ = "tenant_balances"
+
+    # Running total of the tenant's ledger, updated with every posted entry
+    tenant_id = Column(Integer, ForeignKey("tenants.id"), primary_key=True)
+    balance_cents = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    @property
+    def balance(self) -> Decimal:
+        return Decimal(self.balance_cents).scaleb(-2)
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)
+    # Fingerprint of the request body, so a reused key with a different payload is refused
+    request_hash = Column(String, nullable=False)
+    entry_id = Column(Integer, ForeignKey("ledger_entries.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+
+class ScheduledJob(Base):
+    __tablename__ = "scheduled_jobs"
+
+    name = Column(String, primary_key=True)
+    interval_seconds = Column(Integer, nullable=False)
+    next_run_at = Column(DateTime, nullable=False)
+    # A worker owns the job while lease_expires_at is in the future
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    last_started_at = Column(DateTime, nullable=True)
+    last_finished_at = Column(DateTime, nullable=True)
+    last_status = Column(String, nullable=True)
+    last_error = Column(String, nullable=True)
+
 
+class AnalyticsCounter(Base):
+    __tablename__ = "analytics_counters"
 
+    # Dotted counter name, e.g. "applications" or "applications.status:pending"
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,50 @@
+#notifications.py
+# Outbound notifications (rent and maintenance reminders). Senders take a
+# whole batch at once so a real transport can pipeline or bulk-submit.
+# NOTIFICATION_SENDER selects the implementation as "module:Class"; the
+# default only logs.
+import importlib
+import logging
+import os
+from typing import List, NamedTuple
+
+logger = logging.getLogger(__name__)
+
+NOTIFICATION_SENDER = os.getenv("NOTIFICATION_SENDER", "app.notifications:LoggingSender")
+
+
+class Notification(NamedTuple):
+    recipient: str
+    subject: str
+    body: str
+
+
+class Sender:
+    def send_many(self, notifications: List[Notification]):
+        """Deliver a batch; raise to have the whole batch retried on the next run."""
+        raise NotImplementedError
+
+
+class LoggingSender(Sender):
+    """Local stand-in that writes notifications to the log."""
+
+    def send_many(self, notifications: List[Notification]):
+        for notification in notifications:
+            logger.info("Notify %s: %s", notification.recipient, notification.subject)
+
+
+class MemorySender(Sender):
+    """Keeps notifications in a list; handy when exercising the jobs by hand."""
+
+    def __init__(self):
+        self.sent: List[Notification] = []
+
+    def send_many(self, notifications: List[Notification]):
+        self.sent.extend(notifications)
+
+
+def load_sender(path: str = NOTIFICATION_SENDER) -> Sender:
+    module_name, _, class_name = path.partition(":")
+    if not class_name:
+        raise ValueError(f"NOTIFICATION_SENDER must look like 'module:Class', got {path!r}")
+    return getattr(importlib.import_module(module_name), class_name)()
@@ -0,0 +1,237 @@
+#ratelimit.py
+# Request admission control, applied before routing.
+# RateLimitMiddleware gives every caller a token bucket, keyed by user id when
+# the request carries a valid access token and by client IP otherwise.
+# Login and sign-up endpoints (which hash passwords) get a much tighter
+# per-IP budget. Buckets live in this worker's memory. With RATE_LIMIT_BACKEND
+# set, each budget is instead counted in a shared store as a sliding window, so
+# it holds across workers. local:// is an in-process stand-in for Redis.
+# ConcurrencyLimitMiddleware caps the requests in flight per worker. When a
+# request would wait longer than ADMISSION_MAX_WAIT_MS for a slot, it is shed
+# with 503 and Retry-After, so queueing can't run away during a spike.
+import asyncio
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional, Tuple
+from jose import JWTError, jwt
+from . import metrics
+from .cache import shared_backend_from_url
+from .security import ALGORITHM, SECRET_KEY
+
+RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "")
+RATE_LIMIT_USER = os.getenv("RATE_LIMIT_USER", "600/minute")
+RATE_LIMIT_ANONYMOUS = os.getenv("RATE_LIMIT_ANONYMOUS", "120/minute")
+RATE_LIMIT_SENSITIVE = os.getenv("RATE_LIMIT_SENSITIVE", "10/minute")
+# Only behind a proxy that sets it; otherwise clients could pick their own key
+RATE_LIMIT_TRUST_FORWARDED_FOR = os.getenv("RATE_LIMIT_TRUST_FORWARDED_FOR", "false").lower() in ("1", "true", "yes", "on")
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+ADMISSION_MAX_CONCURRENCY = int(os.getenv("ADMISSION_MAX_CONCURRENCY", "100"))
+ADMISSION_MAX_WAIT_MS = float(os.getenv("ADMISSION_MAX_WAIT_MS", "1000"))
+ADMISSION_RETRY_AFTER_SECONDS = int(os.getenv("ADMISSION_RETRY_AFTER_SECONDS", "1"))
+
+# Endpoints anyone can call that do bcrypt work or create rows
+SENSITIVE_ROUTES = {
+    ("POST", "/auth/token"),
+    ("POST", "/auth/users/"),
+    ("POST", "/admin/login/"),
+    ("POST", "/admin/register/"),
+    ("POST", "/tenants/"),
+}
+
+# Never limited, so health checks and scraping keep working under load
+EXEMPT_PATHS = {"/", "/metrics"}
+# Open for minutes at a time; they would pin concurrency slots
+LONG_LIVED_PATHS = {"/events/stream"}
+
+_PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+class Rate(NamedTuple):
+    limit: int
+    period: float
+
+    @classmethod
+    def parse(cls, value: str) -> "Rate":
+        """Parse ``"<count>/<second|minute|hour|day>"``, e.g. ``"10/minute"``."""
+        count, _, unit = value.partition("/")
+        unit = unit.strip().rstrip("s")
+        if unit not in _PERIODS:
+            raise ValueError(f"Unsupported rate: {value}")
+        return cls(int(count), _PERIODS[unit])
+
+
+class Decision(NamedTuple):
+    allowed: bool
+    remaining: int
+    retry_after: float
+
+
+class LocalTokenBuckets:
+    """Per-process token buckets; a bucket holds ``limit`` tokens and refills over ``period``."""
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, rate: Rate) -> Decision:
+        refill = rate.limit / rate.period
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (rate.limit, now))
+            tokens = min(rate.limit, tokens + (now - updated) * refill)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            # Evicting the oldest bucket only ever forgives a caller
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        retry_after = 0.0 if allowed else (1 - tokens) / refill
+        return Decision(allowed, int(tokens), retry_after)
+
+
+class SharedSlidingWindow:
+    """Sliding-window counter over a shared backend (``incr`` with TTL plus ``get``).
+
+    The previous fixed window's count is weighted by how much of it still
+    overlaps the sliding window, which needs only atomic increments.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def hit(self, key: str, rate: Rate) -> Decision:
+        now = time.time()
+        window = int(now // rate.period)
+        elapsed = now / rate.period - window
+        current = self.backend.incr(f"rl:{key}:{window}", ttl=rate.period * 2)
+        previous = int(self.backend.get(f"rl:{key}:{window - 1}") or 0)
+        count = previous * (1 - elapsed) + current
+        allowed = count <= rate.limit
+        retry_after = 0.0 if allowed else (1 - elapsed) * rate.period
+        return Decision(allowed, max(0, int(rate.limit - count)), retry_after)
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def client_ip(scope) -> str:
+    if RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded = _header(scope, b"x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def user_id(scope) -> Optional[int]:
+    """User id from a valid bearer token, without touching the database."""
+    authorization = _header(scope, b"authorization")
+    if not authorization or not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        payload = jwt.decode(authorization[7:], SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+    return payload.get("uid")
+
+
+async def _reject(send, status_code: int, detail: str, retry_after: float, headers=()):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimitMiddleware:
+    """ASGI middleware answering 429 with Retry-After once a caller's budget is spent."""
+
+    def __init__(self, app, backend: Optional[str] = RATE_LIMIT_BACKEND, user_rate: str = RATE_LIMIT_USER,
+                 anonymous_rate: str = RATE_LIMIT_ANONYMOUS, sensitive_rate: str = RATE_LIMIT_SENSITIVE):
+        self.app = app
+        shared = shared_backend_from_url(backend)
+        self.store = SharedSlidingWindow(shared) if shared is not None else LocalTokenBuckets()
+        self.user_rate = Rate.parse(user_rate)
+        self.anonymous_rate = Rate.parse(anonymous_rate)
+        self.sensitive_rate = Rate.parse(sensitive_rate)
+
+    def policy(self, scope) -> Tuple[str, str, Rate]:
+        """(policy name, bucket key, rate) for the request."""
+        if (scope["method"], scope["path"]) in SENSITIVE_ROUTES:
+            # Per IP even when signed in, so one stolen token can't widen the budget
+            return "sensitive", f"sensitive:{client_ip(scope)}", self.sensitive_rate
+        uid = user_id(scope)
+        if uid is not None:
+            return "user", f"user:{uid}", self.user_rate
+        return "anonymous", f"ip:{client_ip(scope)}", self.anonymous_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not RATE_LIMIT_ENABLED or scope["path"] in EXEMPT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        name, key, rate = self.policy(scope)
+        decision = self.store.hit(key, rate)
+        if decision.allowed:
+            await self.app(scope, receive, send)
+            return
+        metrics.RATE_LIMITED.inc(name)
+        await _reject(
+            send, 429, "Too many requests", decision.retry_after,
+            [(b"x-ratelimit-limit", str(rate.limit).encode()), (b"x-ratelimit-remaining", b"0")],
+        )
+
+
+class ConcurrencyLimitMiddleware:
+    """ASGI middleware capping in-flight requests and shedding those that queue too long."""
+
+    def __init__(self, app, max_concurrency: int = ADMISSION_MAX_CONCURRENCY,
+                 max_wait_ms: float = ADMISSION_MAX_WAIT_MS):
+        self.app = app
+        self.max_concurrency = max_concurrency
+        self.max_wait = max_wait_ms / 1000
+        self._slots: Optional[asyncio.Semaphore] = None
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or self.max_concurrency <= 0
+            or scope["path"] in EXEMPT_PATHS
+            or scope["path"] in LONG_LIVED_PATHS
+        ):
+            await self.app(scope, receive, send)
+            return
+        if self._slots is None:
+            # Created lazily so it binds to the serving event loop
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.max_wait)
+        except asyncio.TimeoutError:
+            metrics.REQUESTS_SHED.inc()
+            await _reject(send, 503, "Server busy, please retry", ADMISSION_RETRY_AFTER_SECONDS)
+            return
+        metrics.ADMISSION_WAIT.observe(time.perf_counter() - start)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._slots.release()
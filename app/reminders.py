@@ -0,0 +1,118 @@
+#reminders.py
+# Rent-due and maintenance reminder jobs. Each scan walks the due-date index
+# in keyset batches, fetching only the columns it needs joined with the
+# recipient's email, sends the batch through the sender and marks it
+# reminded in one executemany before committing. A rerun after a crash
+# resumes with the rows not yet marked.
+import os
+from datetime import timedelta
+from sqlalchemy import and_, bindparam, or_, select, update
+from sqlalchemy.orm import Session
+from . import models
+from .notifications import Notification
+
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "1000"))
+RENT_REMINDER_LEAD_DAYS = int(os.getenv("RENT_REMINDER_LEAD_DAYS", "3"))
+MAINTENANCE_REMINDER_LEAD_DAYS = int(os.getenv("MAINTENANCE_REMINDER_LEAD_DAYS", "1"))
+
+
+def _scan(db: Session, statement, due_column, id_column):
+    """Yield batches of rows in (due date, id) order using keyset pagination."""
+    last = None
+    while True:
+        page = statement
+        if last is not None:
+            last_due, last_id = last
+            page = page.where(or_(due_column > last_due, and_(due_column == last_due, id_column > last_id)))
+        rows = db.execute(page.order_by(due_column, id_column).limit(REMINDER_BATCH_SIZE)).all()
+        if not rows:
+            return
+        yield rows
+        last = (rows[-1].due_date, rows[-1].id)
+
+
+def _mark_reminded(db: Session, model, rows):
+    table = model.__table__
+    db.execute(
+        update(table).where(table.c.id == bindparam("row_id")).values(reminded_for=bindparam("due")),
+        [{"row_id": row.id, "due": row.due_date} for row in rows],
+    )
+
+
+def send_rent_reminders(db: Session, context) -> int:
+    """Remind tenants whose rent falls due within RENT_REMINDER_LEAD_DAYS."""
+    agreement = models.RentalAgreement
+    horizon = context.now.date() + timedelta(days=RENT_REMINDER_LEAD_DAYS)
+    statement = (
+        select(
+            agreement.id,
+            agreement.next_due_date.label("due_date"),
+            agreement.monthly_rent,
+            models.Tenant.name,
+            models.Tenant.email,
+            models.Property.title,
+        )
+        .join(models.Tenant, models.Tenant.id == agreement.tenant_id)
+        .join(models.Property, models.Property.id == agreement.property_id)
+        .where(
+            agreement.active.is_(True),
+            agreement.next_due_date <= horizon,
+            or_(agreement.reminded_for.is_(None), agreement.reminded_for < agreement.next_due_date),
+        )
+    )
+    sent = 0
+    for rows in _scan(db, statement, agreement.next_due_date, agreement.id):
+        notifications = [
+            Notification(
+                recipient=row.email,
+                subject=f"Rent of {row.monthly_rent:.2f} due on {row.due_date.isoformat()}",
+                body=f"Hi {row.name}, your rent for {row.title} is due on {row.due_date.isoformat()}.",
+            )
+            for row in rows
+            if row.email
+        ]
+        context.sender.send_many(notifications)
+        _mark_reminded(db, agreement, rows)
+        db.commit()
+        sent += len(notifications)
+        context.renew()
+    return sent
+
+
+def send_maintenance_reminders(db: Session, context) -> int:
+    """Remind property owners of open maintenance requests that are due soon or overdue."""
+    request = models.MaintenanceRequest
+    horizon = context.now.date() + timedelta(days=MAINTENANCE_REMINDER_LEAD_DAYS)
+    statement = (
+        select(
+            request.id,
+            request.due_date,
+            request.description,
+            models.Property.title,
+            models.User.email,
+        )
+        .join(models.Property, models.Property.id == request.property_id)
+        .join(models.User, models.User.id == models.Property.owner_id)
+        .where(
+            request.status == "open",
+            request.due_date <= horizon,
+            or_(request.reminded_for.is_(None), request.reminded_for < request.due_date),
+        )
+    )
+    sent = 0
+    for rows in _scan(db, statement, request.due_date, request.id):
+        notifications = [
+            Notification(
+                recipient=row.email,
+                subject=f"Maintenance due on {row.due_date.isoformat()} at {row.title}",
+                body=row.description,
+            )
+            for row in rows
+            if row.email
+        ]
+        context.sender.send_many(notifications)
+        _mark_reminded(db, request, rows)
+        db.commit()
+        sent += len(notifications)
+        context.renew()
+    return sent
@@ -0,0 +1,82 @@
+#replicas.py
+# Read-replica routing per request. ReadRoutingMiddleware lets GET and HEAD
+# requests read from a replica (see database.RoutingSession). After a caller
+# writes (any other method that succeeds), their reads are pinned to the
+# primary for READ_YOUR_WRITES_SECONDS, so they never see a replica that
+# hasn't caught up with their own change. Callers are identified by user id
+# from the access token, or by client IP when anonymous. The markers live in
+# this worker unless READ_YOUR_WRITES_URL names a shared backend (local:// or
+# redis://, as for the response cache); behind a load balancer that
+# doesn't pin clients to a worker, set it.
+import os
+from typing import Optional
+from . import metrics
+from .cache import TTLCache, shared_backend_from_url
+from .database import async_replica_engines, read_your_writes, use_replica
+from .ratelimit import client_ip, user_id
+
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+READ_YOUR_WRITES_URL = os.getenv("READ_YOUR_WRITES_URL")
+
+SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+class RecentWriters:
+    """Callers who wrote within the last ``ttl`` seconds."""
+
+    def __init__(self, ttl: float = READ_YOUR_WRITES_SECONDS, shared=None, maxsize: int = 100000):
+        self.ttl = ttl
+        self.shared = shared
+        self.local = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def mark(self, caller: str):
+        if self.shared is not None:
+            self.shared.set(f"rw:{caller}", b"1", self.ttl)
+        else:
+            self.local.set(caller, True)
+
+    def is_recent(self, caller: str) -> bool:
+        if self.shared is not None:
+            return self.shared.get(f"rw:{caller}") is not None
+        return self.local.get(caller, False)
+
+
+recent_writers = RecentWriters(shared=shared_backend_from_url(READ_YOUR_WRITES_URL))
+
+
+def caller_key(scope) -> str:
+    uid = user_id(scope)
+    return f"user:{uid}" if uid is not None else f"ip:{client_ip(scope)}"
+
+
+class ReadRoutingMiddleware:
+    """ASGI middleware choosing between replica and primary reads for each request."""
+
+    def __init__(self, app, writers: Optional[RecentWriters] = None):
+        self.app = app
+        self.writers = writers or recent_writers
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not async_replica_engines:
+            await self.app(scope, receive, send)
+            return
+        caller = caller_key(scope)
+        if scope["method"] in SAFE_METHODS:
+            replica = not self.writers.is_recent(caller)
+            metrics.READ_ROUTING.inc("replica" if replica else "primary")
+            token = use_replica.set(replica)
+            pinned = read_your_writes.set(not replica)
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                read_your_writes.reset(pinned)
+                use_replica.reset(token)
+            return
+
+        async def send_wrapper(message):
+            # Mark before the client can see the response and issue its next read
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                self.writers.mark(caller)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,191 @@
+#reports.py
+# Financial reports for the admin dashboard. Aggregation happens in SQL
+# (GROUP BY month / property / owner) and the grouped rows are streamed
+# from a server-side cursor, so memory stays flat however large the
+# portfolio or ledger is. XLSX output needs the optional openpyxl package;
+# the workbook is written in write-only mode to a temporary file and then
+# streamed back in chunks.
+import csv
+import io
+import os
+import tempfile
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import AsyncIterator, Callable, List, NamedTuple, Optional
+from sqlalchemy import and_, case, func, select
+from . import models
+from .database import AsyncSessionLocal, async_engine
+
+REPORT_BATCH_SIZE = int(os.getenv("REPORT_BATCH_SIZE", "1000"))
+XLSX_CHUNK_SIZE = 64 * 1024
+
+FORMATS = ("csv", "xlsx")
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+GROUPINGS = ("property", "owner")
+
+
+class Report(NamedTuple):
+    name: str
+    statement: object
+    columns: List[str]
+    # Turns a result row into the output cells
+    format_row: Callable
+
+
+def xlsx_available() -> bool:
+    try:
+        import openpyxl  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _money(cents) -> Decimal:
+    return Decimal(int(cents or 0)).scaleb(-2)
+
+
+def _month(column):
+    dialect = async_engine.dialect.name
+    if dialect == "sqlite":
+        return func.strftime("%Y-%m", column)
+    if dialect == "postgresql":
+        return func.to_char(column, "YYYY-MM")
+    return func.date_format(column, "%Y-%m")
+
+
+def revenue_report(group_by: str = "property", start: Optional[date] = None, end: Optional[date] = None) -> Report:
+    """Rent charged and payments collected per month and property (or owner)."""
+    entry = models.LedgerEntry
+    month = _month(entry.created_at).label("month")
+    charged = func.sum(case((entry.amount_cents > 0, entry.amount_cents), else_=0)).label("charged")
+    collected = func.sum(case((entry.amount_cents < 0, -entry.amount_cents), else_=0)).label("collected")
+    if group_by == "owner":
+        keys = [models.User.id.label("owner_id"), models.User.username.label("owner")]
+        columns = ["month", "owner_id", "owner", "charged", "collected", "outstanding", "entries"]
+    else:
+        keys = [
+            models.Property.id.label("property_id"),
+            models.Property.title.label("property"),
+            models.User.id.label("owner_id"),
+            models.User.username.label("owner"),
+        ]
+        columns = ["month", "property_id", "property", "owner_id", "owner", "charged", "collected", "outstanding", "entries"]
+    statement = (
+        select(month, *keys, charged, collected, func.count().label("entries"))
+        .select_from(entry)
+        .outerjoin(models.Property, models.Property.id == entry.property_id)
+        .outerjoin(models.User, models.User.id == models.Property.owner_id)
+        .group_by(month, *keys)
+        .order_by(month, keys[0])
+    )
+    if start is not None:
+        statement = statement.where(entry.created_at >= start)
+    if end is not None:
+        statement = statement.where(entry.created_at < end + timedelta(days=1))
+
+    def format_row(row):
+        cells = list(row[:-3])
+        return cells + [_money(row.charged), _money(row.collected), _money(row.charged - row.collected), row.entries]
+
+    return Report(f"revenue-by-{group_by}", statement, columns, format_row)
+
+
+def occupancy_report(group_by: str = "property", as_of: Optional[date] = None) -> Report:
+    """Occupancy and monthly rent roll per property (or owner) on ``as_of``."""
+    as_of = as_of or date.today()
+    agreement = models.RentalAgreement
+    current = and_(
+        agreement.property_id == models.Property.id,
+        agreement.active.is_(True),
+        agreement.start_date <= as_of,
+        (agreement.end_date.is_(None)) | (agreement.end_date >= as_of),
+    )
+    per_property = (
+        select(
+            models.Property.id.label("property_id"),
+            models.Property.title.label("property"),
+            models.Property.owner_id.label("owner_id"),
+            func.count(agreement.id).label("agreements"),
+            func.coalesce(func.sum(agreement.monthly_rent), 0).label("rent_roll"),
+        )
+        .select_from(models.Property)
+        .outerjoin(agreement, current)
+        .where(models.Property.deleted_at.is_(None))
+        .group_by(models.Property.id, models.Property.title, models.Property.owner_id)
+    )
+    if group_by == "owner":
+        properties = per_property.subquery()
+        statement = (
+            select(
+                properties.c.owner_id,
+                models.User.username.label("owner"),
+                func.count().label("properties"),
+                func.sum(case((properties.c.agreements > 0, 1), else_=0)).label("occupied"),
+                func.sum(properties.c.rent_roll).label("rent_roll"),
+            )
+            .select_from(properties)
+            .outerjoin(models.User, models.User.id == properties.c.owner_id)
+            .group_by(properties.c.owner_id, models.User.username)
+            .order_by(properties.c.owner_id)
+        )
+        columns = ["as_of", "owner_id", "owner", "properties", "occupied", "occupancy_rate", "rent_roll"]
+
+        def format_row(row):
+            rate = round(row.occupied / row.properties, 4) if row.properties else 0
+            return [as_of, row.owner_id, row.owner, row.properties, row.occupied, rate, round(row.rent_roll or 0, 2)]
+    else:
+        statement = per_property.order_by(models.Property.id)
+        columns = ["as_of", "property_id", "property", "owner_id", "occupied", "agreements", "rent_roll"]
+
+        def format_row(row):
+            return [as_of, row.property_id, row.property, row.owner_id, row.agreements > 0, row.agreements, round(row.rent_roll or 0, 2)]
+
+    return Report(f"occupancy-by-{group_by}", statement, columns, format_row)
+
+
+async def _partitions(report: Report) -> AsyncIterator[list]:
+    # Own session so the stream outlives the request's dependencies
+    async with AsyncSessionLocal() as session:
+        result = await session.stream(report.statement.execution_options(yield_per=REPORT_BATCH_SIZE))
+        async for partition in result.partitions():
+            yield [report.format_row(row) for row in partition]
+
+
+async def stream_csv(report: Report) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(report.columns)
+    async for rows in _partitions(report):
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+async def stream_xlsx(report: Report) -> AsyncIterator[bytes]:
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(report.name[:31])
+    sheet.append(report.columns)
+    async for rows in _partitions(report):
+        for row in rows:
+            # openpyxl writes Decimal as a number cell
+            sheet.append(row)
+    with tempfile.TemporaryFile() as spool:
+        workbook.save(spool)
+        spool.seek(0)
+        while True:
+            chunk = spool.read(XLSX_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def stream(report: Report, fmt: str):
+    return stream_xlsx(report) if fmt == "xlsx" else stream_csv(report)
@@ -1,12 +1,26 @@
 #admin.py
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
-from app.database import get_db
-from app.models import User, Property, Tenant, RentalApplication
-from app.schemas import UserCreate, UserRead
-from app.security import authenticate_user, create_access_token, get_current_active_user, get_password_hash
-from app.crud import create_user, get_users, update_user_password, update_user_role
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import fastjson, models, reports
+from app.database import get_async_db
+from app.models import User
+from app.schemas import (
+    ArchivedApplicationRead, ArchivedPropertyRead, MaintenanceRequestCreate, MaintenanceRequestRead, RentalAgreementCreate, RentalAgreementRead,
+    ScheduledJobRead, UserCreate, UserRead,
+)
+from app.scheduler import JobAlreadyRunning, scheduler
+from app.security import authenticate_user, create_user_access_token, get_current_active_user, get_password_hash_async
+from app.async_crud import (
+    create_maintenance_request, create_rental_agreement, create_user, get_analytics, get_archived_applications,
+    get_archived_properties, get_property,
+    get_scheduled_jobs, get_tenant, get_user_by_username_or_email, get_users, recompute_analytics,
+    update_user_password, update_user_role,
+)
 
 import logging
 
@@ -17,34 +31,24 @@ router = APIRouter()
 
 
 @router.post("/register/", response_model=UserRead, status_code=status.HTTP_201_CREATED)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Check if the username or email already exists
-    existing_user = db.query(User).filter((User.username == user.username) | (User.email == user.email)).first()
+    existing_user = await get_user_by_username_or_email(db, user.username, user.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username or email already registered. Please use a different username or email."
         )
-    # Hash the password and create a new User instance
-    hashed_password = get_password_hash(user.password)
-    db_user = User(
-        username=user.username,
-        email=user.email,
-        hashed_password=hashed_password,
-        is_active=True,  # Assuming default is active, adjust if your logic differs
-        is_admin=False   # Assuming default is not an admin, adjust if your logic differs
-    )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    return db_user
+    # Hash the password and create a new User (active, non-admin by default)
+    hashed_password = await get_password_hash_async(user.password)
+    return await create_user(db, user=user, hashed_password=hashed_password)
 
 
 @router.post("/login/", response_model=dict)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
     logger.debug(f"Attempting to log in user: {form_data.username}")
     
-    user = authenticate_user(db, form_data.username, form_data.password)
+    user = await authenticate_user(db, form_data.username, form_data.password)
     if not user:
         logger.warning(f"Login failed for user: {form_data.username}")
         raise HTTPException(
@@ -52,7 +56,7 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
             detail="Incorrect username or password"
         )
 
-    access_token = create_access_token(data={"sub": user.username})
+    access_token = create_user_access_token(user)
     logger.info(f"User {form_data.username} logged in successfully")
     return {
         "access_token": access_token,
@@ -60,34 +64,155 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
     }
 
 @router.put("/update-password/")
-def update_password(username: str, new_password: str, db: Session = Depends(get_db)):
-    hashed_password = get_password_hash(new_password)
-    return update_user_password(db=db, username=username, hashed_password=hashed_password)
+async def update_password(username: str, new_password: str, db: AsyncSession = Depends(get_async_db)):
+    hashed_password = await get_password_hash_async(new_password)
+    return await update_user_password(db=db, username=username, hashed_password=hashed_password)
 
 @router.get("/users/", response_model=list[UserRead])
-def list_users(skip: int = 0, limit: int = 10, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+async def list_users(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized to access this resource")
-    users = get_users(db=db, skip=skip, limit=limit)
+    if fastjson.enabled():
+        rows = await get_users(db=db, skip=skip, limit=limit, columns=fastjson.columns(models.User, UserRead))
+        return fastjson.list_response(rows, UserRead)
+    users = await get_users(db=db, skip=skip, limit=limit)
     return users
 
 @router.put("/users/{user_id}/role", response_model=UserRead)
-def update_user_role_endpoint(user_id: int, role: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+async def update_user_role_endpoint(user_id: int, role: str, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized to access this resource")
-    user = update_user_role(db=db, user_id=user_id, role=role)
+    user = await update_user_role(db=db, user_id=user_id, role=role)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     return user
 
 @router.get("/analytics/", response_model=dict)
-def view_analytics(db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+async def view_analytics(db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not authorized to access this resource")
-    analytics = {
-        "total_users": db.query(User).count(),
-        "total_properties": db.query(Property).count(),
-        "total_tenants": db.query(Tenant).count(),
-        "total_applications": db.query(RentalApplication).count(),
-    }
-    return analytics
+    return await get_analytics(db)
+
+@router.post("/analytics/recompute", response_model=dict)
+async def recompute_analytics_endpoint(db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to access this resource")
+    return await recompute_analytics(db)
+
+@router.post("/agreements/", response_model=RentalAgreementRead, status_code=status.HTTP_201_CREATED)
+async def create_rental_agreement_endpoint(agreement: RentalAgreementCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to access this resource")
+    if not await get_tenant(db, agreement.tenant_id):
+        raise HTTPException(status_code=404, detail="Tenant not found")
+    if not await get_property(db, agreement.property_id):
+        raise HTTPException(status_code=404, detail="Property not found")
+    return await create_rental_agreement(db, agreement)
+
+@router.post("/maintenance/", response_model=MaintenanceRequestRead, status_code=status.HTTP_201_CREATED)
+async def create_maintenance_request_endpoint(request: MaintenanceRequestCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to access this resource")
+    if not await get_property(db, request.property_id):
+        raise HTTPException(status_code=404, detail="Property not found")
+    return await create_maintenance_request(db, request)
+
+@router.get("/jobs/", response_model=list[ScheduledJobRead])
+async def list_jobs(db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to access this resource")
+    return await get_scheduled_jobs(db)
+
+@router.post("/jobs/{name}/run", response_model=dict)
+async def run_job(name: str, current_user: User = Depends(get_current_active_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to access this resource")
+    if name not in scheduler.jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    try:
+        result = await asyncio.to_thread(scheduler.run_job, name, True)
+    except JobAlreadyRunning:
+        raise HTTPException(status_code=409, detail="Job is already running on another worker")
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=f"Job failed: {exc}")
+    return {"job": name, "result": result}
+
+def _report_response(report: reports.Report, format: str):
+    if format not in reports.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    if format == "xlsx" and not reports.xlsx_available():
+        raise HTTPException(status_code=501, detail="XLSX reports need the openpyxl package")
+    return StreamingResponse(
+        reports.stream(report, format),
+        media_type=reports.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename={report.name}.{format}"},
+    )
+
+@router.get("/reports/revenue")
+async def revenue_report(
+    format: str = "csv",
+    group_by: str = "property",
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: User = Depends(get_current_active_user),
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to access this resource")
+    if group_by not in reports.GROUPINGS:
+        raise HTTPException(status_code=400, detail=f"Unsupported grouping: {group_by}")
+    return _report_response(reports.revenue_report(group_by, start, end), format)
+
+@router.get("/reports/occupancy")
+async def occupancy_report(
+    format: str = "csv",
+    group_by: str = "property",
+    as_of: Optional[date] = None,
+    current_user: User = Depends(get_current_active_user),
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to access this resource")
+    if group_by not in reports.GROUPINGS:
+        raise HTTPException(status_code=400, detail=f"Unsupported grouping: {group_by}")
+    return _report_response(reports.occupancy_report(group_by, as_of), format)
+
+@router.get("/archive/applications", response_model=list[ArchivedApplicationRead])
+async def list_archived_applications(
+    response: Response,
+    tenant_id: Optional[int] = None,
+    property_id: Optional[int] = None,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to access this resource")
+    try:
+        rows, next_cursor = await get_archived_applications(
+            db, tenant_id=tenant_id, property_id=property_id, status=status, cursor=cursor, limit=limit
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
+
+@router.get("/archive/properties", response_model=list[ArchivedPropertyRead])
+async def list_archived_properties(
+    response: Response,
+    owner_id: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_active_user),
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to access this resource")
+    try:
+        rows, next_cursor = await get_archived_properties(db, owner_id=owner_id, cursor=cursor, limit=limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return rows
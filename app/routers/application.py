@@ -1,43 +1,118 @@
 #application.py
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app.database import get_db
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_async_db
 from app.security import get_current_active_user
-from app.schemas import RentalApplicationCreate, RentalApplicationRead, RentalApplicationUpdate
-from app.crud import create_application, get_application, update_application_status, list_applications
+from app import crud, fastjson
+from app.ingest import APPLICATION_RETRY_AFTER_SECONDS, QueueFull, application_ingestor
+from app.schemas import (
+    ApplicationReview, ApplicationReviewResult, ApplicationStatus, ApplicationSubmissionRead, RentalApplicationCreate,
+    RentalApplicationDetail, RentalApplicationRead, RentalApplicationUpdate,
+)
+from app.async_crud import (
+    create_application, get_application_for_user, get_application_submission_for_user, list_applications,
+    list_user_applications, review_applications, update_application_status,
+)
 from app.models import User, RentalApplication
 
 
 
 router = APIRouter()
 
+APPLICATION_REVIEW_MAX_BATCH = int(os.getenv("APPLICATION_REVIEW_MAX_BATCH", "1000"))
+
 @router.post("/", response_model=RentalApplicationRead)
-def submit_application(application: RentalApplicationCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+async def submit_application(application: RentalApplicationCreate, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
     if not current_user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Authentication required")
-    db_application = create_application(db=db, application=application)
+    try:
+        db_application = await create_application(db=db, application=application)
+    except crud.ApplicationRejected as exc:
+        code = status.HTTP_409_CONFLICT if exc.reason == crud.DUPLICATE_PENDING else status.HTTP_404_NOT_FOUND
+        raise HTTPException(status_code=code, detail=exc.reason)
     return db_application
 
+@router.post("/submissions", response_model=ApplicationSubmissionRead, status_code=status.HTTP_202_ACCEPTED)
+async def queue_application(application: RentalApplicationCreate, request: Request, response: Response, current_user: User = Depends(get_current_active_user)):
+    # Checks and the insert happen in the next group commit; poll status_url for the outcome
+    try:
+        submission_id = application_ingestor.submit(application, current_user.id)
+    except QueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many submissions in flight, please retry shortly",
+            headers={"Retry-After": str(APPLICATION_RETRY_AFTER_SECONDS)},
+        )
+    status_url = str(request.url_for("get_submission_status", submission_id=submission_id))
+    response.headers["Location"] = status_url
+    return ApplicationSubmissionRead(
+        id=submission_id,
+        status="queued",
+        tenant_id=application.tenant_id,
+        property_id=application.property_id,
+        status_url=status_url,
+    )
+
+@router.get("/submissions/{submission_id}", response_model=ApplicationSubmissionRead)
+async def get_submission_status(submission_id: str, request: Request, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    # Scoped like GET /{application_id}: other users' submissions read as missing
+    submission = application_ingestor.local_status(submission_id, current_user.id, current_user.is_admin)
+    if submission is None:
+        db_submission = await get_application_submission_for_user(
+            db, submission_id, current_user.id, current_user.is_admin
+        )
+        if db_submission is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Submission not found")
+        submission = ApplicationSubmissionRead.model_validate(db_submission)
+    submission.status_url = str(request.url)
+    return submission
+
+@router.get("/mine", response_model=list[RentalApplicationDetail])
+async def list_my_applications(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    # Tenant and property come from two selectin queries, not one per row
+    return await list_user_applications(db=db, user_id=current_user.id, skip=skip, limit=limit)
+
 @router.get("/{application_id}", response_model=RentalApplicationRead)
-def get_application_endpoint(application_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    application = get_application(db=db, application_id=application_id)
+async def get_application_endpoint(application_id: int, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    # Ownership is part of the query, so applications the user can't see read as missing
+    application = await get_application_for_user(
+        db=db, application_id=application_id, user_id=current_user.id, is_admin=current_user.is_admin
+    )
     if not application:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Application not found")
-    if application.tenant.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access this application")
     return application
 
 @router.put("/{application_id}/status", response_model=RentalApplicationRead)
-def update_application_status_endpoint(application_id: int, status: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    application = get_application(db=db, application_id=application_id)
-    if not application:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Application not found")
+async def update_application_status_endpoint(application_id: int, new_status: ApplicationStatus = Query(..., alias="status"), db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to update application status")
-    updated_application = update_application_status(db=db, application_id=application_id, status=status)
+    try:
+        updated_application = await update_application_status(db=db, application_id=application_id, status=new_status)
+    except crud.ApplicationRejected as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=exc.reason)
+    if not updated_application:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Application not found")
     return updated_application
 
+@router.post("/review", response_model=list[ApplicationReviewResult])
+async def review_applications_endpoint(review: ApplicationReview, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    # One transaction for the whole batch; approving one application rejects its property's other pending ones
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to review applications")
+    if len(review.decisions) > APPLICATION_REVIEW_MAX_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"At most {APPLICATION_REVIEW_MAX_BATCH} decisions per request",
+        )
+    return await review_applications(db=db, decisions=review.decisions)
+
 @router.get("/", response_model=list[RentalApplicationRead])
-def list_applications_endpoint(skip: int = 0, limit: int = 10, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    applications = list_applications(db=db, skip=skip, limit=limit)
+async def list_applications_endpoint(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_async_db), current_user: User = Depends(get_current_active_user)):
+    if fastjson.enabled():
+        rows = await list_applications(
+            db=db, skip=skip, limit=limit, columns=fastjson.columns(RentalApplication, RentalApplicationRead)
+        )
+        return fastjson.list_response(rows, RentalApplicationRead)
+    applications = await list_applications(db=db, skip=skip, limit=limit)
     return applications
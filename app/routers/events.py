@@ -0,0 +1,74 @@
+# events.py
+import asyncio
+import json
+import os
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from fastapi.security import OAuth2PasswordBearer
+from app import database, security
+from app.events import CLOSED, OVERFLOW, TOPICS, TooManySubscribers, event_bus
+
+router = APIRouter()
+
+EVENT_HEARTBEAT_SECONDS = float(os.getenv("EVENT_HEARTBEAT_SECONDS", "15"))
+# How long browsers wait before reconnecting, in milliseconds
+EVENT_RETRY_MS = int(os.getenv("EVENT_RETRY_MS", "3000"))
+
+# Anonymous subscribers are allowed and only see public events
+optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token", auto_error=False)
+
+
+def _format(event_type: str, data) -> str:
+    return f"event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+@router.get("/stream")
+async def stream_events(
+    topics: Optional[str] = Query(None, description="Comma-separated: applications, properties"),
+    token: Optional[str] = Depends(optional_oauth2_scheme),
+):
+    wanted = TOPICS if not topics else tuple(topic.strip() for topic in topics.split(",") if topic.strip())
+    unknown = set(wanted) - set(TOPICS)
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown topics: {', '.join(sorted(unknown))}")
+    user_id, is_admin = None, False
+    if token:
+        # A short-lived session just for auth; a dependency session would stay open for the whole stream
+        async with database.AsyncSessionLocal() as db:
+            user = await security.get_current_active_user(await security.get_current_user(db, token))
+        user_id, is_admin = user.id, user.is_admin
+    try:
+        subscription = event_bus.subscribe(user_id, is_admin, wanted)
+    except TooManySubscribers:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many open event streams",
+            headers={"Retry-After": str(EVENT_RETRY_MS // 1000 or 1)},
+        )
+
+    async def stream():
+        try:
+            yield f"retry: {EVENT_RETRY_MS}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle connection
+                    yield ": keepalive\n\n"
+                    continue
+                if event is CLOSED:
+                    return
+                if event is OVERFLOW:
+                    # Fell too far behind; the client should refetch, then reconnect
+                    yield _format("resync", {})
+                    return
+                yield _format(event.type, event.data)
+        finally:
+            event_bus.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
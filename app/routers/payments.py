@@ -0,0 +1,75 @@
+# payments.py
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import async_crud, database, ledger, schemas
+from app.security import get_current_active_user
+
+router = APIRouter()
+
+
+async def _check_tenant_access(db: AsyncSession, tenant_id: int, current_user):
+    tenant = await async_crud.get_tenant(db, tenant_id)
+    if tenant is None:
+        raise HTTPException(status_code=404, detail="Tenant not found")
+    # Tenants see their own ledger, admins everyone's
+    if not current_user.is_admin and tenant.user_id != current_user.id:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to access this ledger")
+    return tenant
+
+
+@router.post("/", response_model=schemas.LedgerEntryRead, status_code=status.HTTP_201_CREATED)
+async def record_payment(
+    payment: schemas.PaymentCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=255),
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: schemas.UserRead = Depends(get_current_active_user)
+):
+    # Posted by admins and by the payment gateway integration; gateways retry
+    # with the same Idempotency-Key and get the original entry back
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to record payments")
+    if await async_crud.get_tenant(db, payment.tenant_id) is None:
+        raise HTTPException(status_code=404, detail="Tenant not found")
+    try:
+        entry, replayed = await async_crud.record_payment(db, payment, idempotency_key)
+    except ledger.IdempotencyConflict as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    if replayed:
+        response.status_code = status.HTTP_200_OK
+        response.headers["Idempotent-Replayed"] = "true"
+    return entry
+
+
+@router.get("/tenants/{tenant_id}/balance", response_model=schemas.TenantBalanceRead)
+async def read_balance(
+    tenant_id: int,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: schemas.UserRead = Depends(get_current_active_user)
+):
+    await _check_tenant_access(db, tenant_id, current_user)
+    balance = await async_crud.get_tenant_balance(db, tenant_id)
+    if balance is None:
+        # Nothing posted yet
+        return schemas.TenantBalanceRead(tenant_id=tenant_id, balance=0)
+    return balance
+
+
+@router.get("/tenants/{tenant_id}/history", response_model=List[schemas.LedgerEntryRead])
+async def read_history(
+    tenant_id: int,
+    response: Response,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: schemas.UserRead = Depends(get_current_active_user)
+):
+    await _check_tenant_access(db, tenant_id, current_user)
+    try:
+        entries, next_cursor = await async_crud.get_ledger_history(db, tenant_id, cursor=cursor, limit=limit)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return entries
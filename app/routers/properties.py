@@ -1,18 +1,38 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from app import schemas, crud
-from app.database import get_db
+import re
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import bulk, crud, fastjson, models, schemas, async_crud
+from app.cache import cached_json_response
+from app.database import get_async_db
 from app.security import get_current_active_user
 
 
 
 router = APIRouter()
 
+_VERSION_ETAG = re.compile(r'^"v(\d+)"$')
+
+
+def property_etag(version: int) -> str:
+    return f'"v{version}"'
+
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Version named by an If-Match header; None when absent or ``*``."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    # If-Match uses strong comparison, so weak tags never match
+    match = _VERSION_ETAG.match(if_match.strip())
+    if match is None:
+        raise HTTPException(status_code=412, detail="If-Match does not name a current version of this property")
+    return int(match.group(1))
+
 @router.post("/", response_model=schemas.PropertyRead)
-def create_property(
+async def create_property(
     property: schemas.PropertyCreate,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: schemas.UserRead = Depends(get_current_active_user)
 ):
     # Ensure that the current user is authenticated
@@ -20,37 +40,199 @@ def create_property(
         raise HTTPException(status_code=401, detail="Authentication required")
     
     # Create a new property with the current user as the owner
-    db_property = crud.create_property(db=db, property=property, owner_id=current_user.id)
+    db_property = await async_crud.create_property(db=db, property=property, owner_id=current_user.id)
     return db_property
 
+@router.post("/import", response_model=schemas.BulkImportResult)
+async def import_properties(
+    request: Request,
+    format: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.UserRead = Depends(get_current_active_user)
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to import properties")
+    # Rows are owned by the importing admin, like single-row creation
+    try:
+        fmt = bulk.detect_format(format, request.headers.get("content-type"))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return await bulk.import_records(
+        db,
+        request.stream(),
+        fmt,
+        schemas.PropertyCreate,
+        lambda session, rows: crud.bulk_create_properties(session, rows, current_user.id),
+    )
+
+@router.get("/export")
+async def export_properties(
+    format: str = "csv",
+    current_user: schemas.UserRead = Depends(get_current_active_user)
+):
+    if format not in bulk.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    columns = ["id", "title", "description", "price", "location", "number_of_bedrooms", "latitude", "longitude", "owner_id"]
+    statement = bulk.export_statement(models.Property, columns).where(models.Property.deleted_at.is_(None))
+    # Admins export the whole portfolio, everyone else their own listings
+    if not current_user.is_admin:
+        statement = statement.where(models.Property.owner_id == current_user.id)
+    return StreamingResponse(
+        bulk.export_rows(statement, columns, format),
+        media_type=bulk.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=properties.{format}"},
+    )
+
 @router.put("/{property_id}", response_model=schemas.PropertyRead)
-def update_property(property_id: int, property: schemas.PropertyUpdate, db: Session = Depends(get_db)):
-    db_property = crud.get_property(db=db, property_id=property_id)
+async def update_property(
+    property_id: int,
+    property: schemas.PropertyUpdate,
+    response: Response,
+    if_match: Optional[str] = Header(None),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: schemas.UserRead = Depends(get_current_active_user)
+):
+    expected_version = parse_if_match(if_match)
+    # Same rule as delete: the owner or an admin
+    db_property = await async_crud.get_property(db=db, property_id=property_id)
+    if not db_property:
+        raise HTTPException(status_code=404, detail="Property not found")
+    if db_property.owner_id != current_user.id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Not authorized to update this property")
+    try:
+        db_property = await async_crud.update_property(
+            db=db, property_id=property_id, property=property, expected_version=expected_version
+        )
+    except crud.StaleVersionError as exc:
+        raise HTTPException(status_code=412, detail=str(exc), headers={"ETag": property_etag(exc.current_version)})
     if not db_property:
         raise HTTPException(status_code=404, detail="Property not found")
-    for key, value in property.dict(exclude_unset=True).items():
-        setattr(db_property, key, value)
-    db.commit()
-    db.refresh(db_property)
+    response.headers["ETag"] = property_etag(db_property.version)
     return db_property
 
 
 @router.delete("/{property_id}")
-def delete_property(
+async def delete_property(
     property_id: int,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: schemas.UserRead = Depends(get_current_active_user)
 ):
     # Ensure that the property belongs to the current user or the user is an admin
-    db_property = crud.get_property(db=db, property_id=property_id)
+    db_property = await async_crud.get_property(db=db, property_id=property_id)
     if not db_property or (db_property.owner_id != current_user.id and not current_user.is_admin):
         raise HTTPException(status_code=403, detail="Not authorized to delete this property")
     
     # Delete the property
-    return crud.delete_property(db=db, property_id=property_id)
+    return await async_crud.delete_property(db=db, property_id=property_id)
 
 @router.get("/", response_model=List[schemas.PropertyRead])
-def list_properties(db: Session = Depends(get_db)):
-    return crud.get_properties(db=db)
+async def list_properties(
+    request: Request,
+    location: Optional[str] = None,
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    min_bedrooms: Optional[int] = Query(None, ge=0),
+    max_bedrooms: Optional[int] = Query(None, ge=0),
+    owner_id: Optional[int] = None,
+    sort: str = "id",
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+):
+    fast = fastjson.enabled()
+
+    async def produce():
+        try:
+            properties, next_cursor = await async_crud.get_properties(
+                db=db,
+                location=location,
+                min_price=min_price,
+                max_price=max_price,
+                min_bedrooms=min_bedrooms,
+                max_bedrooms=max_bedrooms,
+                owner_id=owner_id,
+                sort=sort,
+                cursor=cursor,
+                limit=limit,
+                columns=fastjson.columns(models.Property, schemas.PropertyRead) if fast else None,
+            )
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        if fast:
+            encoded = fastjson.encode_rows(properties, schemas.PropertyRead)
+            if encoded is not None:
+                properties = encoded
+        # The cursor for the next page travels in a header so the body stays a plain list
+        return properties, {"X-Next-Cursor": next_cursor} if next_cursor else {}
+
+    return await cached_json_response(request, "properties", List[schemas.PropertyRead], produce)
+
+@router.get("/search", response_model=List[schemas.PropertyRead])
+async def search_properties(
+    request: Request,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db),
+):
+    async def produce():
+        try:
+            return await async_crud.search_properties(db=db, query=q, limit=limit), {}
+        except NotImplementedError as exc:
+            raise HTTPException(status_code=501, detail=str(exc))
+
+    return await cached_json_response(request, "properties", List[schemas.PropertyRead], produce)
+
+@router.get("/nearby", response_model=List[schemas.PropertyNearby])
+async def nearby_properties(
+    request: Request,
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(5, gt=0, le=500),
+    limit: int = Query(50, ge=1, le=200),
+    db: AsyncSession = Depends(get_async_db),
+):
+    async def produce():
+        matches = await async_crud.get_properties_nearby(
+            db=db, latitude=lat, longitude=lon, radius_km=radius_km, limit=limit
+        )
+        results = [
+            dict(schemas.PropertyRead.model_validate(db_property).model_dump(), distance_km=round(distance, 3))
+            for db_property, distance in matches
+        ]
+        return results, {}
+
+    return await cached_json_response(request, "properties", List[schemas.PropertyNearby], produce)
+
+@router.get("/viewport", response_model=List[schemas.PropertyRead])
+async def viewport_properties(
+    request: Request,
+    south: float = Query(..., ge=-90, le=90),
+    west: float = Query(..., ge=-180, le=180),
+    north: float = Query(..., ge=-90, le=90),
+    east: float = Query(..., ge=-180, le=180),
+    limit: int = Query(200, ge=1, le=500),
+    db: AsyncSession = Depends(get_async_db),
+):
+    if south > north:
+        raise HTTPException(status_code=400, detail="south must not be greater than north")
+
+    async def produce():
+        properties = await async_crud.get_properties_in_viewport(
+            db=db, south=south, west=west, north=north, east=east, limit=limit
+        )
+        return properties, {}
+
+    return await cached_json_response(request, "properties", List[schemas.PropertyRead], produce)
+
+@router.get("/{property_id}", response_model=schemas.PropertyRead)
+async def read_property(property_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    async def produce():
+        db_property = await async_crud.get_property(db=db, property_id=property_id)
+        if db_property is None:
+            raise HTTPException(status_code=404, detail="Property not found")
+        # Version-based so clients can send it back as If-Match on update
+        return db_property, {"ETag": property_etag(db_property.version)}
+
+    return await cached_json_response(request, "properties", schemas.PropertyRead, produce)
 
 
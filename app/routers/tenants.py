@@ -1,35 +1,77 @@
 # tenants.py
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from app import crud, models, schemas, database
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import async_crud, bulk, crud, fastjson, models, schemas, database
+from app.cache import cached_json_response
 from app.security import get_current_active_user  # Ensure only authenticated users can access
 
 router = APIRouter()
 
 
 @router.post("/", response_model=schemas.TenantRead)
-def create_tenant(
+async def create_tenant(
     tenant: schemas.TenantCreate,
-    db: Session = Depends(database.get_db)
+    db: AsyncSession = Depends(database.get_async_db)
 ):
     # Check if the email is already registered
-    existing_tenant = db.query(models.Tenant).filter(models.Tenant.email == tenant.email).first()
+    existing_tenant = await async_crud.get_tenant_by_email(db, tenant.email)
     if existing_tenant:
         raise HTTPException(status_code=400, detail="Email is already registered")
 
-    return crud.create_tenant(db=db, tenant=tenant)
+    return await async_crud.create_tenant(db=db, tenant=tenant)
+
+@router.post("/import", response_model=schemas.BulkImportResult)
+async def import_tenants(
+    request: Request,
+    format: Optional[str] = None,
+    db: AsyncSession = Depends(database.get_async_db),
+    current_user: schemas.UserRead = Depends(get_current_active_user)
+):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to import tenants")
+    try:
+        fmt = bulk.detect_format(format, request.headers.get("content-type"))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return await bulk.import_records(db, request.stream(), fmt, schemas.TenantCreate, crud.bulk_create_tenants)
+
+@router.get("/export")
+async def export_tenants(format: str = "csv", current_user: schemas.UserRead = Depends(get_current_active_user)):
+    if not current_user.is_admin:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not authorized to export tenants")
+    if format not in bulk.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format: {format}")
+    columns = ["id", "name", "email", "user_id"]
+    return StreamingResponse(
+        bulk.export_rows(bulk.export_statement(models.Tenant, columns), columns, format),
+        media_type=bulk.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=tenants.{format}"},
+    )
 
 @router.get("/", response_model=List[schemas.TenantRead])
-def read_tenants(skip: int = 0, limit: int = 10, db: Session = Depends(database.get_db)):
-    return crud.get_tenants(db, skip=skip, limit=limit)
+async def read_tenants(request: Request, skip: int = 0, limit: int = 10, db: AsyncSession = Depends(database.get_async_db)):
+    async def produce():
+        if fastjson.enabled():
+            rows = await async_crud.get_tenants(
+                db, skip=skip, limit=limit, columns=fastjson.columns(models.Tenant, schemas.TenantRead)
+            )
+            encoded = fastjson.encode_rows(rows, schemas.TenantRead)
+            return (rows if encoded is None else encoded), {}
+        return await async_crud.get_tenants(db, skip=skip, limit=limit), {}
+
+    return await cached_json_response(request, "tenants", List[schemas.TenantRead], produce)
 
 @router.get("/{tenant_id}", response_model=schemas.TenantRead)
-def read_tenant(tenant_id: int, db: Session = Depends(database.get_db)):
-    db_tenant = crud.get_tenant(db, tenant_id=tenant_id)
-    if db_tenant is None:
-        raise HTTPException(status_code=404, detail="Tenant not found")
-    return db_tenant
+async def read_tenant(tenant_id: int, request: Request, db: AsyncSession = Depends(database.get_async_db)):
+    async def produce():
+        db_tenant = await async_crud.get_tenant(db, tenant_id=tenant_id)
+        if db_tenant is None:
+            raise HTTPException(status_code=404, detail="Tenant not found")
+        return db_tenant, {}
+
+    return await cached_json_response(request, "tenants", schemas.TenantRead, produce)
 
 # @router.post("/", response_model=schemas.TenantRead)
 # def create_tenant(
@@ -0,0 +1,225 @@
+#scheduler.py
+# In-process periodic job runner started from the app lifespan. Job state
+# lives in the scheduled_jobs table and a run first takes a time-limited
+# lease with a conditional UPDATE, so when several workers (or hosts) run
+# the app only one of them executes a given job; a crashed worker's lease
+# simply expires. Jobs are sync functions run in a thread with their own
+# session, and renew the lease as they make progress.
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Dict, NamedTuple, Optional
+from sqlalchemy import insert, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from . import archive, ledger, models, reminders
+from .database import SessionLocal
+from .notifications import Sender, load_sender
+
+logger = logging.getLogger(__name__)
+
+SCHEDULER_ENABLED = os.getenv("SCHEDULER_ENABLED", "true").lower() in ("1", "true", "yes", "on")
+SCHEDULER_POLL_SECONDS = float(os.getenv("SCHEDULER_POLL_SECONDS", "30"))
+SCHEDULER_LEASE_SECONDS = int(os.getenv("SCHEDULER_LEASE_SECONDS", "300"))
+SCHEDULER_RETRY_SECONDS = int(os.getenv("SCHEDULER_RETRY_SECONDS", "300"))
+REMINDER_INTERVAL_SECONDS = int(os.getenv("REMINDER_INTERVAL_SECONDS", "86400"))
+
+
+class LeaseLost(Exception):
+    """Another worker took over the job after our lease expired."""
+
+
+class JobAlreadyRunning(Exception):
+    pass
+
+
+class JobContext(NamedTuple):
+    now: datetime
+    sender: Sender
+    # Extends the lease; call between batches of a long run
+    renew: Callable[[], None]
+
+
+class Job(NamedTuple):
+    name: str
+    interval_seconds: int
+    run: Callable
+
+
+class Scheduler:
+    def __init__(self, session_factory=SessionLocal, poll_interval: float = SCHEDULER_POLL_SECONDS,
+                 lease_seconds: int = SCHEDULER_LEASE_SECONDS):
+        self.session_factory = session_factory
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.jobs: Dict[str, Job] = {}
+        self.sender: Optional[Sender] = None
+        self._task = None
+
+    def register(self, name: str, interval_seconds: int, run: Callable):
+        """``run(db, context)`` does the work and returns a count for the log."""
+        self.jobs[name] = Job(name, interval_seconds, run)
+
+    def ensure_rows(self, db):
+        """Create missing job rows and sync intervals; safe to run from every worker at once."""
+        existing = {
+            name: interval
+            for name, interval in db.execute(select(models.ScheduledJob.name, models.ScheduledJob.interval_seconds))
+        }
+        now = datetime.utcnow()
+        missing = [
+            {"name": job.name, "interval_seconds": job.interval_seconds, "next_run_at": now}
+            for job in self.jobs.values()
+            if job.name not in existing
+        ]
+        if missing:
+            self._insert_missing(db, missing)
+        for job in self.jobs.values():
+            if job.name in existing and existing[job.name] != job.interval_seconds:
+                db.execute(
+                    update(models.ScheduledJob)
+                    .where(models.ScheduledJob.name == job.name)
+                    .values(interval_seconds=job.interval_seconds)
+                )
+        db.commit()
+
+    def _insert_missing(self, db, rows):
+        # Another worker booting at the same time may insert the same rows
+        table = models.ScheduledJob.__table__
+        dialect = db.get_bind().dialect.name
+        if dialect in ("sqlite", "postgresql"):
+            if dialect == "sqlite":
+                from sqlalchemy.dialects.sqlite import insert as upsert
+            else:
+                from sqlalchemy.dialects.postgresql import insert as upsert
+            db.execute(upsert(table).on_conflict_do_nothing(index_elements=[table.c.name]), rows)
+            return
+        for row in rows:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(table).values(**row))
+            except IntegrityError:
+                pass
+
+    def _acquire(self, db, name: str, now: datetime, force: bool) -> bool:
+        job = models.ScheduledJob
+        statement = (
+            update(job)
+            .where(job.name == name, or_(job.lease_expires_at.is_(None), job.lease_expires_at < now))
+            .values(
+                lease_owner=self.worker_id,
+                lease_expires_at=now + timedelta(seconds=self.lease_seconds),
+                last_started_at=now,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        if not force:
+            statement = statement.where(job.next_run_at <= now)
+        acquired = db.execute(statement).rowcount == 1
+        db.commit()
+        return acquired
+
+    def _renew(self, name: str):
+        with self.session_factory() as db:
+            job = models.ScheduledJob
+            renewed = db.execute(
+                update(job)
+                .where(job.name == name, job.lease_owner == self.worker_id)
+                .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=self.lease_seconds))
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+        if not renewed:
+            raise LeaseLost(name)
+
+    def _release(self, db, name: str, next_run_at: datetime, status: str, error: Optional[str]):
+        job = models.ScheduledJob
+        db.execute(
+            update(job)
+            .where(job.name == name, job.lease_owner == self.worker_id)
+            .values(
+                lease_owner=None,
+                lease_expires_at=None,
+                next_run_at=next_run_at,
+                last_finished_at=datetime.utcnow(),
+                last_status=status,
+                last_error=error,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+
+    def run_job(self, name: str, force: bool = False):
+        """Run ``name`` if it is due (or ``force``) and not leased elsewhere.
+
+        Returns the job's result, or None when it was not due. Raises
+        JobAlreadyRunning when forced while another worker holds the lease.
+        """
+        job = self.jobs[name]
+        now = datetime.utcnow()
+        with self.session_factory() as db:
+            if not self._acquire(db, name, now, force):
+                if force:
+                    raise JobAlreadyRunning(name)
+                return None
+            try:
+                context = JobContext(now=now, sender=self.sender or load_sender(), renew=lambda: self._renew(name))
+                result = job.run(db, context)
+            except Exception as exc:
+                logger.exception("Scheduled job %s failed", name)
+                db.rollback()
+                retry_at = datetime.utcnow() + timedelta(seconds=min(SCHEDULER_RETRY_SECONDS, job.interval_seconds))
+                self._release(db, name, retry_at, "failed", str(exc)[:500])
+                raise
+            logger.info("Scheduled job %s finished: %s", name, result)
+            self._release(db, name, now + timedelta(seconds=job.interval_seconds), "succeeded", None)
+            return result
+
+    def run_due(self):
+        for name in self.jobs:
+            try:
+                self.run_job(name)
+            except Exception:
+                # Already logged and rescheduled; keep going with the other jobs
+                pass
+
+    async def _loop(self):
+        while True:
+            try:
+                await asyncio.to_thread(self.run_due)
+            except Exception:
+                logger.exception("Scheduler poll failed")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        if self._task is not None:
+            return
+        self.sender = self.sender or load_sender()
+        with self.session_factory() as db:
+            self.ensure_rows(db)
+        if SCHEDULER_ENABLED:
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+scheduler = Scheduler()
+# Registration order is run order: charge rent before reminding about the next due date
+scheduler.register("rent_charges", REMINDER_INTERVAL_SECONDS, ledger.post_rent_charges)
+scheduler.register("rent_reminders", REMINDER_INTERVAL_SECONDS, reminders.send_rent_reminders)
+scheduler.register("maintenance_reminders", REMINDER_INTERVAL_SECONDS, reminders.send_maintenance_reminders)
+scheduler.register("idempotency_key_cleanup", 3600, ledger.purge_idempotency_keys)
+# Properties first: archiving one also moves its applications
+scheduler.register("property_archival", archive.ARCHIVE_INTERVAL_SECONDS, archive.archive_properties)
+scheduler.register("application_archival", archive.ARCHIVE_INTERVAL_SECONDS, archive.archive_applications)
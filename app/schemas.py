@@ -1,7 +1,8 @@
 #schemas.py
-from datetime import datetime
-from pydantic import BaseModel, EmailStr
-from typing import Optional
+from datetime import date, datetime
+from decimal import Decimal
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import List, Literal, Optional
 
 # Pydantic model for user creation
 class User(BaseModel):
@@ -35,6 +36,8 @@ class PropertyBase(BaseModel):
     price: float
     location: str
     number_of_bedrooms: int
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
 
 # Schema for creating a new property
 class PropertyCreate(PropertyBase):
@@ -44,6 +47,7 @@ class PropertyCreate(PropertyBase):
 class PropertyRead(PropertyBase):
     id: int
     owner_id: int
+    version: int = 1
 
     class Config:
         from_attributes = True  # Pydantic V2 compatibility
@@ -55,6 +59,20 @@ class PropertyUpdate(BaseModel):
     price: Optional[float] = None
     location: Optional[str] = None
     number_of_bedrooms: Optional[int] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+
+    # Omit a field to leave it unchanged; these columns can't be cleared
+    @field_validator("title", "price", "location", "number_of_bedrooms")
+    @classmethod
+    def not_null(cls, value):
+        if value is None:
+            raise ValueError("may be omitted but not null")
+        return value
+
+# Schema for a radius search result, nearest first
+class PropertyNearby(PropertyRead):
+    distance_km: float
 
 # Pydantic model for tenant
 class TenantBase(BaseModel):
@@ -75,6 +93,9 @@ class TenantRead(BaseModel):
         orm_mode = True
 
 
+# The statuses an application can be in; analytics keeps a counter per status
+ApplicationStatus = Literal["pending", "approved", "rejected"]
+
 # Pydantic model for rental application creation
 class RentalApplicationBase(BaseModel):
     tenant_id: int
@@ -91,13 +112,149 @@ class RentalApplicationRead(RentalApplicationBase):
     class Config:
         from_attributes = True  # Pydantic V2 compatibility
 
+# Application with its tenant and property, for eagerly loaded listings
+class RentalApplicationDetail(RentalApplicationRead):
+    tenant: Optional[TenantRead] = None
+    property: Optional[PropertyRead] = None
+
+# A submission queued through the ingestion path; status is queued,
+# accepted, rejected or failed
+class ApplicationSubmissionRead(BaseModel):
+    id: str
+    status: str
+    tenant_id: int
+    property_id: int
+    application_id: Optional[int] = None
+    error: Optional[str] = None
+    status_url: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
 # Pydantic model for rental application update
 class RentalApplicationUpdate(BaseModel):
+    status: Optional[ApplicationStatus] = None
+
+# One decision in a batch review; only pending applications can be decided
+class ApplicationDecision(BaseModel):
+    id: int
+    status: Literal["approved", "rejected"]
+
+class ApplicationReview(BaseModel):
+    decisions: List[ApplicationDecision] = Field(..., min_length=1)
+
+# Per-application outcome of a batch review: updated, skipped (see error)
+# or auto_rejected because a competing application was approved
+class ApplicationReviewResult(BaseModel):
+    id: int
+    outcome: str
     status: Optional[str] = None
+    error: Optional[str] = None
+
+# Rows moved to the archive tables by the archival jobs
+class ArchivedPropertyRead(PropertyRead):
+    owner_id: Optional[int] = None
+    deleted_at: Optional[datetime] = None
+    archived_at: datetime
+
+class ArchivedApplicationRead(RentalApplicationRead):
+    archived_at: datetime
+
+# Rental agreements drive the rent-due reminders
+class RentalAgreementCreate(BaseModel):
+    tenant_id: int
+    property_id: int
+    monthly_rent: float = Field(..., gt=0)
+    start_date: date
+    end_date: Optional[date] = None
+    next_due_date: date
+
+class RentalAgreementRead(RentalAgreementCreate):
+    id: int
+    active: bool
+    reminded_for: Optional[date] = None
+
+    class Config:
+        from_attributes = True
+
+class MaintenanceRequestCreate(BaseModel):
+    property_id: int
+    tenant_id: Optional[int] = None
+    description: str
+    due_date: date
+
+class MaintenanceRequestRead(MaintenanceRequestCreate):
+    id: int
+    status: str
+    created_at: Optional[datetime] = None
+    reminded_for: Optional[date] = None
+
+    class Config:
+        from_attributes = True
+
+# Payments ledger; money is exposed as decimals with two places
+class PaymentCreate(BaseModel):
+    tenant_id: int
+    property_id: Optional[int] = None
+    amount: Decimal = Field(..., gt=0, max_digits=12, decimal_places=2)
+    reference: Optional[str] = None
+    description: Optional[str] = None
+
+class LedgerEntryRead(BaseModel):
+    id: int
+    tenant_id: int
+    property_id: Optional[int] = None
+    agreement_id: Optional[int] = None
+    kind: str
+    amount: Decimal
+    balance_after: Decimal
+    period: Optional[date] = None
+    reference: Optional[str] = None
+    description: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class TenantBalanceRead(BaseModel):
+    tenant_id: int
+    balance: Decimal
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
+class ScheduledJobRead(BaseModel):
+    name: str
+    interval_seconds: int
+    next_run_at: datetime
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+    last_started_at: Optional[datetime] = None
+    last_finished_at: Optional[datetime] = None
+    last_status: Optional[str] = None
+    last_error: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+# Result of a bulk CSV / NDJSON import
+class BulkImportError(BaseModel):
+    row: int
+    error: str
+
+class BulkImportResult(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BulkImportError] = []
 
 # Pydantic model for token data
 class TokenData(BaseModel):
     username: Optional[str] = None  # Use Optional[str] for Python 3.9 compatibility
+    user_id: Optional[int] = None
+    token_version: Optional[int] = None
+    is_admin: Optional[bool] = None
+    is_active: Optional[bool] = None
 
 class Token(BaseModel):
     access_token: str
@@ -0,0 +1,205 @@
+#search.py
+# Full-text search over property titles, descriptions and locations.
+# SQLite uses an FTS5 table kept in sync by the crud write paths (inside the
+# same transaction); Postgres uses a generated tsvector column with a GIN
+# index plus pg_trgm for typo tolerance. The backend is picked from the
+# connection's dialect.
+import re
+from typing import Iterable, List, Sequence, Tuple
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+MAX_TYPO_CANDIDATES = 5
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# (id, title, description, location)
+PropertyDocument = Tuple[int, str, str, str]
+
+
+def tokenize(query: str) -> List[str]:
+    return [token.lower() for token in _TOKEN.findall(query or "")]
+
+
+def within_one_edit(a: str, b: str) -> bool:
+    """True when ``a`` and ``b`` differ by at most one insertion, deletion, substitution or transposition."""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) == len(b):
+        diffs = [i for i, (x, y) in enumerate(zip(a, b)) if x != y]
+        if len(diffs) == 1:
+            return True
+        return len(diffs) == 2 and diffs[1] == diffs[0] + 1 and a[diffs[0]] == b[diffs[1]] and a[diffs[1]] == b[diffs[0]]
+    shorter, longer = (a, b) if len(a) < len(b) else (b, a)
+    for i in range(len(longer)):
+        if longer[:i] + longer[i + 1:] == shorter:
+            return True
+    return False
+
+
+class SearchBackend:
+    def install(self, connection: Connection):
+        """Create the index structures if missing and backfill them."""
+
+    def index(self, db: Session, documents: Iterable[PropertyDocument]):
+        """Add or replace documents; runs in the caller's transaction."""
+
+    def remove(self, db: Session, property_ids: Sequence[int]):
+        """Drop documents; runs in the caller's transaction."""
+
+    def search(self, db: Session, query: str, limit: int) -> List[int]:
+        """Return matching property ids, best match first."""
+        raise NotImplementedError
+
+
+class SQLiteFTS5Backend(SearchBackend):
+    def install(self, connection: Connection):
+        exists = connection.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'properties_fts'"
+        ).first()
+        if exists:
+            return
+        # prefix indexes make 2- and 3-character prefix queries cheap
+        connection.exec_driver_sql(
+            "CREATE VIRTUAL TABLE properties_fts USING fts5("
+            "title, description, location, tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        connection.exec_driver_sql("CREATE VIRTUAL TABLE properties_fts_vocab USING fts5vocab(properties_fts, 'row')")
+        connection.exec_driver_sql(
+            "INSERT INTO properties_fts (rowid, title, description, location) "
+            "SELECT id, coalesce(title, ''), coalesce(description, ''), coalesce(location, '') FROM properties"
+        )
+
+    def index(self, db: Session, documents: Iterable[PropertyDocument]):
+        rows = [
+            {"id": id, "title": title or "", "description": description or "", "location": location or ""}
+            for id, title, description, location in documents
+        ]
+        if not rows:
+            return
+        self.remove(db, [row["id"] for row in rows])
+        db.execute(
+            text(
+                "INSERT INTO properties_fts (rowid, title, description, location) "
+                "VALUES (:id, :title, :description, :location)"
+            ),
+            rows,
+        )
+
+    def remove(self, db: Session, property_ids: Sequence[int]):
+        if property_ids:
+            db.execute(text("DELETE FROM properties_fts WHERE rowid = :id"), [{"id": id} for id in property_ids])
+
+    def _typo_candidates(self, db: Session, token: str) -> List[str]:
+        # Anchor on the first character so the vocabulary lookup is a range scan
+        rows = db.execute(
+            text(
+                "SELECT term FROM properties_fts_vocab WHERE term >= :low AND term < :high "
+                "AND length(term) BETWEEN :min_len AND :max_len ORDER BY doc DESC"
+            ),
+            {"low": token[0], "high": token[0] + "\U0010ffff", "min_len": len(token) - 1, "max_len": len(token) + 1},
+        )
+        candidates = [term for (term,) in rows if term != token and within_one_edit(term, token)]
+        return candidates[:MAX_TYPO_CANDIDATES]
+
+    def _match(self, db: Session, expression: str, limit: int) -> List[int]:
+        # bm25 column weights: title, description, location
+        rows = db.execute(
+            text(
+                "SELECT rowid FROM properties_fts WHERE properties_fts MATCH :expression "
+                "ORDER BY bm25(properties_fts, 10.0, 1.0, 5.0) LIMIT :limit"
+            ),
+            {"expression": expression, "limit": limit},
+        )
+        return [rowid for (rowid,) in rows]
+
+    def search(self, db: Session, query: str, limit: int) -> List[int]:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        # Every term matches as a prefix: "apart" finds "apartment"
+        ids = self._match(db, " ".join(f'"{token}"*' for token in tokens), limit)
+        if ids:
+            return ids
+        # Nothing matched: allow one typo per term using the index vocabulary
+        groups = []
+        for token in tokens:
+            alternatives = [f'"{token}"*'] + [f'"{term}"' for term in self._typo_candidates(db, token)]
+            groups.append("(" + " OR ".join(alternatives) + ")")
+        return self._match(db, " AND ".join(groups), limit)
+
+
+class PostgresBackend(SearchBackend):
+    def install(self, connection: Connection):
+        connection.exec_driver_sql("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        # A generated column stays in sync on every write, so index/remove are no-ops
+        connection.exec_driver_sql(
+            "ALTER TABLE properties ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+            "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(location, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(description, '')), 'C')) STORED"
+        )
+        connection.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_properties_search_vector ON properties USING gin (search_vector)"
+        )
+        connection.exec_driver_sql(
+            "CREATE INDEX IF NOT EXISTS ix_properties_title_trgm ON properties USING gin (title gin_trgm_ops)"
+        )
+
+    def search(self, db: Session, query: str, limit: int) -> List[int]:
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        rows = db.execute(
+            text(
+                "SELECT id FROM properties WHERE search_vector @@ to_tsquery('simple', :tsquery) "
+                "ORDER BY ts_rank(search_vector, to_tsquery('simple', :tsquery)) DESC LIMIT :limit"
+            ),
+            {"tsquery": " & ".join(f"{token}:*" for token in tokens), "limit": limit},
+        ).all()
+        if rows:
+            return [id for (id,) in rows]
+        # Typo fallback through trigram similarity on the title
+        rows = db.execute(
+            text(
+                "SELECT id FROM properties WHERE title % :query "
+                "ORDER BY similarity(title, :query) DESC LIMIT :limit"
+            ),
+            {"query": " ".join(tokens), "limit": limit},
+        )
+        return [id for (id,) in rows]
+
+
+BACKENDS = {"sqlite": SQLiteFTS5Backend(), "postgresql": PostgresBackend()}
+
+
+def backend_for(dialect_name: str) -> SearchBackend:
+    try:
+        return BACKENDS[dialect_name]
+    except KeyError:
+        raise NotImplementedError(f"Full-text search is not available for {dialect_name}")
+
+
+def get_backend(db: Session) -> SearchBackend:
+    return backend_for(db.get_bind().dialect.name)
+
+
+def ensure_schema(engine):
+    """Create (and backfill) the search index for ``engine``; safe to run repeatedly."""
+    if engine.dialect.name not in BACKENDS:
+        return
+    with engine.begin() as connection:
+        backend_for(engine.dialect.name).install(connection)
+
+
+def index_properties(db: Session, properties):
+    if db.get_bind().dialect.name in BACKENDS:
+        get_backend(db).index(db, [(p.id, p.title, p.description, p.location) for p in properties])
+
+
+def remove_properties(db: Session, property_ids: Sequence[int]):
+    if db.get_bind().dialect.name in BACKENDS:
+        get_backend(db).remove(db, property_ids)
@@ -1,12 +1,13 @@
 #security.py
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import NamedTuple, Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
-from app import models, database
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import async_crud, models, database
+from app.cache import principal_cache
+from app.hashing import hashing_service, pwd_context
 from app.schemas import TokenData
 
 # Secret key, algorithms, and token expiration settings
@@ -14,9 +15,6 @@ SECRET_KEY = "your-secret-key"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-# Context for password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
 # Function to verify password
@@ -27,12 +25,19 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+# Async variants run bcrypt in the hashing process pool (429 when it is saturated)
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await hashing_service.verify(plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await hashing_service.hash(password)
+
 # Function to authenticate user
-def authenticate_user(db: Session, username: str, password: str):
-    user = db.query(models.User).filter(models.User.username == username).first()
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    user = await async_crud.get_user_by_username(db, username)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password_async(password, user.hashed_password):
         return False
     return user
 
@@ -47,8 +52,33 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+
+class Principal(NamedTuple):
+    """The authenticated caller; exposes the User fields the routers rely on."""
+    id: int
+    username: str
+    is_admin: bool
+    is_active: bool
+    token_version: int
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "Principal":
+        return cls(user.id, user.username, bool(user.is_admin), bool(user.is_active), user.token_version or 0)
+
+
+# Function to create an access token carrying the claims needed to authorize requests
+def create_user_access_token(user: models.User, expires_delta: Optional[timedelta] = None):
+    claims = {
+        "sub": user.username,
+        "uid": user.id,
+        "adm": bool(user.is_admin),
+        "act": bool(user.is_active),
+        "ver": user.token_version or 0,
+    }
+    return create_access_token(data=claims, expires_delta=expires_delta)
+
 # Function to get current user
-def get_current_user(db: Session = Depends(database.get_db), token: str = Depends(oauth2_scheme)):
+async def get_current_user(db: AsyncSession = Depends(database.get_async_db), token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -59,16 +89,42 @@ def get_current_user(db: Session = Depends(database.get_db), token: str = Depend
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
-        token_data = TokenData(username=username)
+        token_data = TokenData(
+            username=username,
+            user_id=payload.get("uid"),
+            token_version=payload.get("ver"),
+            is_admin=payload.get("adm"),
+            is_active=payload.get("act"),
+        )
     except JWTError:
         raise credentials_exception
-    user = db.query(models.User).filter(models.User.username == token_data.username).first()
-    if user is None:
+
+    # Tokens issued before versioned claims still need the user row
+    if None in (token_data.user_id, token_data.token_version, token_data.is_admin, token_data.is_active):
+        user = await async_crud.get_user_by_username(db, token_data.username)
+        if user is None:
+            raise credentials_exception
+        return Principal.from_user(user)
+
+    # Role and password changes bump the token version, so once the version
+    # matches, the claims are current. Only the version is looked up: from the
+    # cache, refreshed from the DB once per TTL and dropped by crud on a bump
+    # (see PrincipalCache for how long other workers may lag without a shared backend)
+    current_version = principal_cache.get(token_data.user_id)
+    if current_version is None:
+        user = await async_crud.get_user(db, token_data.user_id)
+        if user is None:
+            raise credentials_exception
+        current_version = user.token_version or 0
+        principal_cache.set(user.id, current_version, is_admin=user.is_admin)
+    if current_version != token_data.token_version:
         raise credentials_exception
-    return user
+    return Principal(
+        token_data.user_id, token_data.username, token_data.is_admin, token_data.is_active, token_data.token_version
+    )
 
 # Function to get the current authenticated and active user
-def get_current_active_user(current_user: models.User = Depends(get_current_user)):
+async def get_current_active_user(current_user: Principal = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
@@ -0,0 +1,74 @@
+#warmup.py
+# Start-up warming. warm_up() runs in each worker's lifespan: it opens
+# WARM_POOL_CONNECTIONS pooled connections up front and runs the hot read
+# queries once, so SQLAlchemy's compiled-statement cache and the pydantic
+# serializers are ready before the first request. preload() does the same
+# work in a parent process (gunicorn --preload) so forked workers inherit
+# it, and then releases its connections.
+import asyncio
+import logging
+import os
+from typing import List
+from sqlalchemy import text
+from sqlalchemy.orm import Session, configure_mappers
+from . import analytics, crud, schemas
+from .cache import _type_adapter
+from .database import AsyncSessionLocal, DB_POOL_SIZE, async_engine
+
+logger = logging.getLogger(__name__)
+
+WARM_POOL_CONNECTIONS = int(os.getenv("WARM_POOL_CONNECTIONS", str(min(DB_POOL_SIZE, 4))))
+
+# Response models serialized through cached_json_response
+RESPONSE_MODELS = [
+    List[schemas.PropertyRead],
+    schemas.PropertyRead,
+    List[schemas.PropertyNearby],
+    List[schemas.TenantRead],
+    schemas.TenantRead,
+]
+
+
+def _run_hot_queries(db: Session):
+    crud.get_properties(db, limit=1)
+    crud.get_property(db, 0)
+    crud.get_tenants(db, limit=1)
+    crud.get_tenant(db, 0)
+    crud.get_user(db, 0)
+    crud.get_user_by_username(db, "")
+    crud.list_applications(db, limit=1)
+    crud.get_application_for_user(db, 0, 0, False)
+    analytics.snapshot(db)
+
+
+async def _warm_pool(connections: int):
+    # Hold them all at once so the pool really opens that many
+    held = [await async_engine.connect() for _ in range(max(1, connections))]
+    try:
+        await asyncio.gather(*(connection.execute(text("SELECT 1")) for connection in held))
+    finally:
+        for connection in held:
+            await connection.close()
+
+
+async def warm_up(connections: int = WARM_POOL_CONNECTIONS):
+    configure_mappers()
+    for model in RESPONSE_MODELS:
+        _type_adapter(model)
+    try:
+        await _warm_pool(connections)
+        async with AsyncSessionLocal() as db:
+            await db.run_sync(_run_hot_queries)
+    except Exception:
+        # A cold cache is slower, not broken; let the app come up anyway
+        logger.exception("Warm-up failed")
+
+
+def preload():
+    """Warm this process before forking workers, leaving no open connections behind."""
+
+    async def run():
+        await warm_up(connections=1)
+        await async_engine.dispose()
+
+    asyncio.run(run())
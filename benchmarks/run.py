@@ -0,0 +1,275 @@
+#run.py
+# Load-test driver for the API hot paths. Each scenario is a request shape
+# that the harness fires at a fixed concurrency, either against the app
+# in-process (through httpx's ASGI transport, lifespan included) or over HTTP
+# against a running server. For every scenario it records p50/p95/p99
+# latency, throughput, errors, and the database statements per request,
+# taken from the app's own /metrics. With --baseline, results are compared
+# to a stored run and the exit status is 1 on a regression.
+#
+#   python -m benchmarks.seed --properties 100000 --tenants 100000 --applications 100000
+#   python -m benchmarks.run --output results.json --baseline benchmarks/baseline.json
+#
+# Against a server, start it with RATE_LIMIT_ENABLED=false (and, for query
+# counts that mean something, a single worker), then pass --url.
+import argparse
+import asyncio
+import json
+import math
+import os
+import platform
+import random
+import re
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, NamedTuple
+import httpx
+from sqlalchemy.engine import make_url
+from .seed import BENCH_PASSWORD, BENCH_USERNAME, LOCATIONS
+
+# Higher is worse for latency and queries, lower is worse for throughput
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms", "queries_per_request")
+HIGHER_IS_BETTER = ("throughput_rps",)
+
+
+class Scenario(NamedTuple):
+    method: str
+    # Route template as labelled in /metrics
+    route: str
+    # Builds (path, request kwargs) for one request
+    build: Callable[[random.Random, dict], tuple]
+    # Fraction of --requests to send; bcrypt-bound scenarios run far fewer
+    share: float = 1.0
+
+
+def _auth(context: dict) -> dict:
+    return {"Authorization": f"Bearer {context['token']}"}
+
+
+def _properties(rng: random.Random, context: dict):
+    params = {"limit": 20}
+    choice = rng.random()
+    if choice < 0.4:
+        params["location"] = rng.choice(LOCATIONS)[0]
+    elif choice < 0.7:
+        params["min_bedrooms"] = rng.randint(1, 4)
+        params["max_price"] = rng.randrange(800, 4000, 100)
+    elif choice < 0.85:
+        params.update(sort="price", min_price=rng.randrange(400, 3000, 100))
+    return "/properties/", {"params": params}
+
+
+SCENARIOS: Dict[str, Scenario] = {
+    "auth_token": Scenario(
+        "POST", "/auth/token",
+        lambda rng, context: ("/auth/token", {"data": {"username": BENCH_USERNAME, "password": BENCH_PASSWORD}}),
+        share=0.1,
+    ),
+    "properties": Scenario("GET", "/properties/", _properties),
+    "tenants": Scenario(
+        "GET", "/tenants/",
+        lambda rng, context: ("/tenants/", {"params": {"skip": rng.randrange(0, 1000, 10), "limit": 20}}),
+    ),
+    "applications": Scenario(
+        "GET", "/applications/",
+        lambda rng, context: ("/applications/", {"params": {"skip": rng.randrange(0, 1000, 10), "limit": 20}, "headers": _auth(context)}),
+    ),
+    "admin_analytics": Scenario(
+        "GET", "/admin/analytics/",
+        lambda rng, context: ("/admin/analytics/", {"headers": _auth(context)}),
+    ),
+}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(fraction * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+_QUERY_SERIES = re.compile(r'^http_request_db_queries_(sum|count)\{method="([^"]*)",route="([^"]*)"\} (\S+)$')
+
+
+async def query_totals(client: httpx.AsyncClient) -> Dict[tuple, float]:
+    """Statement totals per (method, route, sum|count) from the app's /metrics."""
+    response = await client.get("/metrics")
+    totals = {}
+    for line in response.text.splitlines():
+        match = _QUERY_SERIES.match(line)
+        if match:
+            kind, method, route, value = match.groups()
+            totals[(method, route, kind)] = float(value)
+    return totals
+
+
+async def login(client: httpx.AsyncClient) -> str:
+    response = await client.post("/auth/token", data={"username": BENCH_USERNAME, "password": BENCH_PASSWORD})
+    if response.status_code != 200:
+        raise SystemExit(f"Could not log in as {BENCH_USERNAME} ({response.status_code}); seed with benchmarks.seed first")
+    return response.json()["access_token"]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, context: dict, requests: int,
+                       concurrency: int, warmup: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    requests = max(1, int(requests * scenario.share))
+    warmup = int(warmup * scenario.share)
+
+    async def fire():
+        path, kwargs = scenario.build(rng, context)
+        return await client.request(scenario.method, path, **kwargs)
+
+    for _ in range(warmup):
+        await fire()
+
+    before = await query_totals(client)
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                response = await fire()
+                failed = str(response.status_code) if response.status_code >= 400 else None
+            except httpx.HTTPError as exc:
+                failed = type(exc).__name__
+            latencies.append(time.perf_counter() - start)
+            if failed:
+                errors[failed] = errors.get(failed, 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    after = await query_totals(client)
+
+    key = (scenario.method, scenario.route)
+    statements = after.get(key + ("sum",), 0) - before.get(key + ("sum",), 0)
+    observed = after.get(key + ("count",), 0) - before.get(key + ("count",), 0)
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 2) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        "queries_per_request": round(statements / observed, 2) if observed else None,
+    }
+
+
+async def run_all(client: httpx.AsyncClient, names: List[str], requests: int, concurrency: int,
+                  warmup: int, seed: int) -> Dict[str, dict]:
+    context = {"token": await login(client)}
+    results = {}
+    for index, name in enumerate(names):
+        results[name] = await run_scenario(client, SCENARIOS[name], context, requests, concurrency, warmup, seed + index)
+        print(f"{name}: {results[name]}", file=sys.stderr)
+    return results
+
+
+async def run_in_process(names, requests, concurrency, warmup, seed) -> Dict[str, dict]:
+    # Read at import time, so set before the app is imported
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    os.environ.setdefault("SCHEDULER_ENABLED", "false")
+    from app.main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            return await run_all(client, names, requests, concurrency, warmup, seed)
+
+
+async def run_over_http(url, names, requests, concurrency, warmup, seed) -> Dict[str, dict]:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+        return await run_all(client, names, requests, concurrency, warmup, seed)
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Regressions of ``results`` against ``baseline`` beyond ``tolerance`` (a fraction)."""
+    regressions = []
+    for name, current in results["scenarios"].items():
+        previous = baseline.get("scenarios", {}).get(name)
+        if previous is None:
+            continue
+        for metric in LOWER_IS_BETTER:
+            old, new = previous.get(metric), current.get(metric)
+            if old is None or new is None:
+                continue
+            if new > old * (1 + tolerance):
+                regressions.append(f"{name}.{metric}: {old} -> {new}")
+        for metric in HIGHER_IS_BETTER:
+            old, new = previous.get(metric), current.get(metric)
+            if old and new is not None and new < old * (1 - tolerance):
+                regressions.append(f"{name}.{metric}: {old} -> {new}")
+        if current["errors"] and not previous.get("errors"):
+            regressions.append(f"{name}.errors: {current['errors']}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the API hot paths")
+    parser.add_argument("--url", help="Benchmark a running server instead of the app in-process")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=1000, help="Measured requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=50, help="Unmeasured requests per scenario")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Write the results JSON here as well as to stdout")
+    parser.add_argument("--baseline", help="Compare against this results file")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed slowdown before a metric counts as a regression")
+    parser.add_argument("--save-baseline", action="store_true", help="Store this run as the new --baseline")
+    args = parser.parse_args(argv)
+
+    if args.url:
+        scenarios = asyncio.run(run_over_http(args.url, args.scenarios, args.requests, args.concurrency, args.warmup, args.seed))
+    else:
+        scenarios = asyncio.run(run_in_process(args.scenarios, args.requests, args.concurrency, args.warmup, args.seed))
+    results = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "mode": "http" if args.url else "in-process",
+            "url": args.url,
+            "database": make_url(os.getenv("DATABASE_URL", "sqlite:///./test.db")).render_as_string(hide_password=True),
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "scenarios": scenarios,
+    }
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w") as handle:
+            handle.write(output + "\n")
+
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, "w") as handle:
+            handle.write(output + "\n")
+        return
+    if args.baseline:
+        try:
+            with open(args.baseline) as handle:
+                baseline = json.load(handle)
+        except FileNotFoundError:
+            raise SystemExit(f"No baseline at {args.baseline}; rerun with --save-baseline to create it")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions against " + args.baseline + ":\n  " + "\n  ".join(regressions), file=sys.stderr)
+            raise SystemExit(1)
+        print(f"No regressions against {args.baseline}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,168 @@
+#seed.py
+# Synthetic portfolio for the benchmarks. Rows go in through Core executemany
+# in chunks, which keeps a million-row seed to minutes. The schema comes from
+# `app.cli migrate`; the search and geo indexes and the analytics counters
+# are then built from the seeded tables in chunks. Seed into an empty
+# database; point DATABASE_URL at a scratch one.
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import func, insert, select
+from app import analytics, cli, geo, models, search
+from app.database import SessionLocal
+from app.security import get_password_hash
+
+BENCH_USERNAME = "bench-admin"
+BENCH_PASSWORD = "bench-password"
+CHUNK_SIZE = 10000
+
+LOCATIONS = [
+    ("Berlin", 52.52, 13.40), ("Hamburg", 53.55, 9.99), ("Munich", 48.14, 11.58),
+    ("Cologne", 50.94, 6.96), ("Frankfurt", 50.11, 8.68), ("Stuttgart", 48.78, 9.18),
+    ("Leipzig", 51.34, 12.37), ("Dresden", 51.05, 13.74), ("Vienna", 48.21, 16.37),
+    ("Zurich", 47.38, 8.54),
+]
+WORDS = ["bright", "quiet", "spacious", "renovated", "cosy", "modern", "garden", "balcony", "loft", "studio",
+         "central", "family", "penthouse", "terrace", "parking", "furnished"]
+STATUSES = ["pending", "approved", "rejected"]
+
+
+def _chunks(rows, size=CHUNK_SIZE):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _insert(db, model, rows):
+    count = 0
+    for chunk in _chunks(rows):
+        db.execute(insert(model.__table__), chunk)
+        count += len(chunk)
+    return count
+
+
+def _index_properties(db):
+    # The rows went in through Core, past the crud paths that index them
+    prop = models.Property
+    last_id = 0
+    while True:
+        documents = db.execute(
+            select(prop.id, prop.title, prop.description, prop.location, prop.latitude, prop.longitude)
+            .where(prop.id > last_id)
+            .order_by(prop.id)
+            .limit(CHUNK_SIZE)
+        ).all()
+        if not documents:
+            return
+        search.index_properties(db, documents)
+        geo.index_properties(db, [(doc.id, doc.latitude, doc.longitude) for doc in documents])
+        db.commit()
+        last_id = documents[-1].id
+
+
+def _users(count, hashed_password):
+    # One hash for every user; bcrypt per row would dominate the seed
+    yield {"username": BENCH_USERNAME, "email": "bench-admin@example.com", "hashed_password": hashed_password,
+           "is_active": True, "is_admin": True, "token_version": 0}
+    for index in range(1, count):
+        yield {"username": f"user{index}", "email": f"user{index}@example.com", "hashed_password": hashed_password,
+               "is_active": True, "is_admin": False, "token_version": 0}
+
+
+def _properties(rng, count, owners):
+    for index in range(count):
+        location, lat, lon = rng.choice(LOCATIONS)
+        words = rng.sample(WORDS, 3)
+        yield {
+            "title": f"{words[0].title()} {rng.randint(1, 5)}-room flat in {location}",
+            "description": " ".join(words + rng.sample(WORDS, 4)),
+            "price": round(rng.uniform(400, 4000), 2),
+            "location": location,
+            "number_of_bedrooms": rng.randint(1, 5),
+            "latitude": round(lat + rng.uniform(-0.15, 0.15), 6),
+            "longitude": round(lon + rng.uniform(-0.2, 0.2), 6),
+            "owner_id": rng.randint(1, owners),
+            "version": 1,
+        }
+
+
+def _tenants(count, users):
+    for index in range(count):
+        yield {"name": f"Tenant {index}", "email": f"tenant{index}@example.com", "user_id": index % users + 1}
+
+
+def _applications(rng, count, tenants, properties):
+    start = datetime.utcnow() - timedelta(days=365)
+    pending = set()
+    for _ in range(count):
+        tenant_id, property_id = rng.randint(1, tenants), rng.randint(1, properties)
+        status = rng.choice(STATUSES)
+        if status == "pending":
+            # At most one pending application per pair (uq_rental_applications_pending)
+            if (tenant_id, property_id) in pending:
+                status = "rejected"
+            else:
+                pending.add((tenant_id, property_id))
+        yield {
+            "tenant_id": tenant_id,
+            "property_id": property_id,
+            "status": status,
+            "submission_date": start + timedelta(seconds=rng.randint(0, 365 * 86400)),
+        }
+
+
+def seed(properties: int, tenants: int, applications: int, users: int = 1000, seed: int = 42) -> dict:
+    """Seed an empty database and return the row counts and timings."""
+    cli.migrate()
+    rng = random.Random(seed)
+    counts = {}
+    timings = {}
+    db = SessionLocal()
+    try:
+        if db.scalar(select(func.count()).select_from(models.User)):
+            raise SystemExit("The benchmark database is not empty; point DATABASE_URL at a fresh one")
+        hashed_password = get_password_hash(BENCH_PASSWORD)
+        users = max(1, users)
+        for name, model, rows in [
+            ("users", models.User, _users(users, hashed_password)),
+            ("properties", models.Property, _properties(rng, properties, users)),
+            ("tenants", models.Tenant, _tenants(tenants, users)),
+            ("applications", models.RentalApplication, _applications(rng, applications, max(1, tenants), max(1, properties))),
+        ]:
+            started = time.perf_counter()
+            counts[name] = _insert(db, model, rows)
+            db.commit()
+            timings[name] = round(time.perf_counter() - started, 2)
+    finally:
+        db.close()
+
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        _index_properties(db)
+        analytics.recompute(db)
+    finally:
+        db.close()
+    timings["indexes"] = round(time.perf_counter() - started, 2)
+    return {"rows": counts, "seconds": timings}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed a synthetic portfolio for the benchmarks")
+    parser.add_argument("--properties", type=int, default=10000)
+    parser.add_argument("--tenants", type=int, default=10000)
+    parser.add_argument("--applications", type=int, default=10000)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args(argv)
+    print(seed(args.properties, args.tenants, args.applications, args.users, args.seed))
+
+
+if __name__ == "__main__":
+    main()
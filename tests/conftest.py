@@ -0,0 +1,68 @@
+# Shared fixtures. The app is configured through the environment at import
+# time, so point it at a throwaway database before anything imports app.
+import itertools
+import os
+import sqlite3
+import tempfile
+
+_DB_DIR = tempfile.mkdtemp(prefix="property-rental-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_DB_DIR}/primary.db"
+os.environ.setdefault("AUTO_MIGRATE", "1")
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("SCHEDULER_ENABLED", "false")
+
+import pytest
+from fastapi.testclient import TestClient
+
+_names = itertools.count()
+
+
+@pytest.fixture(scope="session")
+def db_dir():
+    return _DB_DIR
+
+
+@pytest.fixture(scope="session")
+def client():
+    import app.main
+
+    with TestClient(app.main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture(scope="session")
+def make_user(client, db_dir):
+    """Create a user and return bearer headers for them."""
+
+    def make(is_admin: bool = False):
+        name = f"user{next(_names)}"
+        response = client.post("/auth/users/", json={"username": name, "email": f"{name}@example.com", "password": "secret-pw"})
+        assert response.status_code == 200, response.text
+        if is_admin:
+            with sqlite3.connect(f"{db_dir}/primary.db") as db:
+                db.execute("UPDATE users SET is_admin = 1 WHERE username = ?", (name,))
+        token = client.post("/auth/token", data={"username": name, "password": "secret-pw"}).json()["access_token"]
+        return {"Authorization": f"Bearer {token}"}
+
+    return make
+
+
+@pytest.fixture(scope="session")
+def admin_headers(make_user):
+    return make_user(is_admin=True)
+
+
+@pytest.fixture
+def property_payload():
+    def payload(**overrides):
+        data = {
+            "title": "Flat",
+            "description": "Two rooms",
+            "price": 1200.0,
+            "location": "Berlin",
+            "number_of_bedrooms": 2,
+        }
+        data.update(overrides)
+        return data
+
+    return payload
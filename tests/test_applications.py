@@ -0,0 +1,67 @@
+import itertools
+import time
+import pytest
+
+_emails = itertools.count()
+
+
+@pytest.fixture
+def application(client, admin_headers, property_payload):
+    def make(tenant_id=None, property_id=None):
+        if property_id is None:
+            property_id = client.post("/properties/", json=property_payload(), headers=admin_headers).json()["id"]
+        if tenant_id is None:
+            email = f"applicant{next(_emails)}@example.com"
+            tenant_id = client.post("/tenants/", json={"name": "Applicant", "email": email}).json()["id"]
+        response = client.post("/applications/", json={"tenant_id": tenant_id, "property_id": property_id}, headers=admin_headers)
+        assert response.status_code == 200, response.text
+        return response.json()
+
+    return make
+
+
+def _set_status(client, headers, application_id, value):
+    return client.put(f"/applications/{application_id}/status", params={"status": value}, headers=headers)
+
+
+def test_status_must_be_known(client, admin_headers, application):
+    created = application()
+    assert _set_status(client, admin_headers, created["id"], "maybe").status_code == 422
+    assert _set_status(client, admin_headers, created["id"], "approved").json()["status"] == "approved"
+
+
+def test_reopening_a_duplicate_pending_application_conflicts(client, admin_headers, application):
+    first = application()
+    assert _set_status(client, admin_headers, first["id"], "rejected").status_code == 200
+    second = application(tenant_id=first["tenant_id"], property_id=first["property_id"])
+    response = _set_status(client, admin_headers, first["id"], "pending")
+    assert response.status_code == 409
+    assert client.get(f"/applications/{first['id']}", headers=admin_headers).json()["status"] == "rejected"
+    assert client.get(f"/applications/{second['id']}", headers=admin_headers).json()["status"] == "pending"
+
+
+def test_missing_application_is_404_and_non_admin_is_403(client, admin_headers, make_user):
+    assert _set_status(client, admin_headers, 10**9, "rejected").status_code == 404
+    assert _set_status(client, make_user(), 10**9, "rejected").status_code == 403
+
+
+def test_submission_status_is_scoped_to_the_submitter(client, admin_headers, make_user, property_payload):
+    submitter, other = make_user(), make_user()
+    property_id = client.post("/properties/", json=property_payload(), headers=admin_headers).json()["id"]
+    tenant_id = client.post("/tenants/", json={"name": "Queued", "email": "queued@example.com"}).json()["id"]
+    queued = client.post(
+        "/applications/submissions", json={"tenant_id": tenant_id, "property_id": property_id}, headers=submitter
+    )
+    assert queued.status_code == 202
+    path = f"/applications/submissions/{queued.json()['id']}"
+
+    assert client.get(path, headers=submitter).status_code == 200
+    assert client.get(path, headers=other).status_code == 404
+    assert client.get(path, headers=admin_headers).status_code == 200
+    # Also once the writer has persisted the outcome
+    for _ in range(50):
+        if client.get(path, headers=submitter).json()["status"] != "queued":
+            break
+        time.sleep(0.05)
+    assert client.get(path, headers=submitter).json()["status"] == "accepted"
+    assert client.get(path, headers=other).status_code == 404
@@ -0,0 +1,84 @@
+import csv
+import io
+import pytest
+
+CSV_HEADER = "title,description,price,location,number_of_bedrooms\n"
+
+
+@pytest.mark.parametrize("path", ["/properties/import", "/tenants/import"])
+def test_import_is_admin_only(client, make_user, path):
+    response = client.post(path, params={"format": "csv"}, content=CSV_HEADER, headers=make_user())
+    assert response.status_code == 403
+
+
+def test_admin_imports_properties(client, admin_headers):
+    body = CSV_HEADER + "Loft,Top floor,900,Berlin,1\nBad,,not-a-price,Berlin,1\n"
+    result = client.post("/properties/import", params={"format": "csv"}, content=body, headers=admin_headers).json()
+    assert result["inserted"] == 1
+    assert result["failed"] == 1
+    assert result["errors"][0]["row"] == 2
+
+
+def _exported(client, headers, marker):
+    body = client.get("/properties/export", params={"format": "csv"}, headers=headers).text
+    rows = list(csv.DictReader(io.StringIO(body)))
+    return [(row["title"], row["description"], row["price"]) for row in rows if row["title"].startswith(marker)]
+
+
+def test_csv_export_round_trips(client, admin_headers, property_payload):
+    descriptions = ["line one\nline two", 'says "hi", then\n\nleaves', "trailing newline\n", "plain"]
+    for index, description in enumerate(descriptions):
+        body = property_payload(title=f"roundtrip-{index}", description=description)
+        assert client.post("/properties/", json=body, headers=admin_headers).status_code == 200
+    exported = client.get("/properties/export", params={"format": "csv"}, headers=admin_headers).text
+    before = _exported(client, admin_headers, "roundtrip-")
+
+    result = client.post("/properties/import", params={"format": "csv"}, content=exported, headers=admin_headers).json()
+    assert result["failed"] == 0, result["errors"]
+
+    after = _exported(client, admin_headers, "roundtrip-")
+    assert sorted(after) == sorted(before * 2)
+    assert {description for _, description, _ in before} == set(descriptions)
+
+
+def test_unclosed_quote_is_reported(client, admin_headers):
+    body = CSV_HEADER + 'Loft,"never closed,900,Berlin,1\nStudio,ok,800,Berlin,1\n'
+    result = client.post("/properties/import", params={"format": "csv"}, content=body, headers=admin_headers).json()
+    assert result["inserted"] == 0
+    assert result["errors"] == [{"row": 1, "error": "unclosed quoted field at end of input"}]
+
+
+def test_failed_batch_is_reported_and_import_continues(client, admin_headers, monkeypatch):
+    from sqlalchemy import insert
+    from app import bulk, crud, models
+    from app.database import SessionLocal
+
+    monkeypatch.setattr(bulk, "BULK_BATCH_SIZE", 2)
+    write_batch = crud.bulk_create_tenants
+    calls = []
+
+    def racing_write_batch(db, rows):
+        calls.append(rows)
+        if len(calls) == 2:
+            # A concurrent request takes an email after the duplicate check has passed
+            with SessionLocal() as other:
+                other.add(models.Tenant(name="racer", email=rows[1]["email"]))
+                other.commit()
+            db.execute(insert(models.Tenant), rows)
+        return write_batch(db, rows)
+
+    monkeypatch.setattr(crud, "bulk_create_tenants", racing_write_batch)
+    body = "name,email\n" + "".join(f"T{index},batch{index}@example.com\n" for index in range(6))
+    response = client.post("/tenants/import", params={"format": "csv"}, content=body, headers=admin_headers)
+    assert response.status_code == 200
+    result = response.json()
+    assert result["inserted"] == 4
+    assert result["failed"] == 2
+    assert [error["row"] for error in result["errors"]] == [3, 4]
+    assert result["errors"][0]["error"].startswith("batch rejected by the database")
+
+
+def test_stray_quote_in_unquoted_field_stays_in_its_row(client, admin_headers):
+    body = CSV_HEADER + 'Shed,5" wide door,300,Berlin,1\nStudio,ok,800,Berlin,1\nLoft,"two\nlines",900,Berlin,2\n'
+    result = client.post("/properties/import", params={"format": "csv"}, content=body, headers=admin_headers).json()
+    assert result == {"inserted": 3, "failed": 0, "errors": []}
@@ -0,0 +1,105 @@
+# Golden tests: the fast path must produce exactly the bytes the schema path does
+from datetime import datetime
+from typing import List
+import pytest
+from pydantic import TypeAdapter
+from app import fastjson, schemas
+from app.cache import response_cache
+
+pytest.importorskip("orjson")
+
+TEXTS = ["plain", "Ünïcödé 住宅 🏠", 'quote " and \\ backslash', "tab\tnew\nline", "</script>", "  ", ""]
+FLOATS = [0.0, -0.0, 0.1, 1.0, 1200.5, 1 / 3, 1e-7, 5e-324, 123456789.123, 9999999999999998.0, 1e15, -1e15, 2.5e-5]
+
+
+def _schema_bytes(schema, rows) -> bytes:
+    adapter = TypeAdapter(List[schema])
+    data = [dict(zip(fastjson.fields(schema), row)) for row in rows]
+    return adapter.dump_json(adapter.validate_python(data))
+
+
+def _assert_identical(schema, rows):
+    assert fastjson.encode_rows(rows, schema) == _schema_bytes(schema, rows)
+
+
+def test_property_rows():
+    rows = [
+        (text, text or None, price, "Berlin", 2, lat, lon, index, 7, 1)
+        for index, (text, price) in enumerate(zip(TEXTS * 2, FLOATS))
+        for lat, lon in [(None, None), (52.520008, 13.404954), (-0.0, 180.0)]
+    ]
+    _assert_identical(schemas.PropertyRead, rows)
+
+
+def test_tenant_rows():
+    rows = [(index, text or "x", f"t{index}@example.com") for index, text in enumerate(TEXTS)]
+    _assert_identical(schemas.TenantRead, rows)
+
+
+def test_application_rows():
+    dates = [None, datetime(2026, 1, 2, 3, 4, 5), datetime(2026, 1, 2, 3, 4, 5, 600), datetime(1999, 12, 31, 23, 59, 59, 999999)]
+    rows = [(1, 2, index, status, date) for index, (status, date) in enumerate(zip(["pending", "approved", "rejected", "ä\""], dates))]
+    _assert_identical(schemas.RentalApplicationRead, rows)
+
+
+def test_user_rows():
+    rows = [(text or "u", f"u{index}@example.com", index, bool(index % 2), not index % 3) for index, text in enumerate(TEXTS)]
+    _assert_identical(schemas.UserRead, rows)
+
+
+@pytest.mark.parametrize("price", [1e16, -1e16, 1.5e17, 1e300])
+def test_large_floats_fall_back(price):
+    row = ("t", None, price, "Berlin", 1, None, None, 1, 1, 1)
+    assert fastjson.encode_rows([row], schemas.PropertyRead) is None
+    response = fastjson.list_response([row], schemas.PropertyRead)
+    assert response == [row]
+
+
+def test_large_coordinates_are_checked_too():
+    # Optional[float] columns are checked as well as plain float ones
+    assert fastjson._float_positions(schemas.PropertyRead) == (2, 5, 6)
+
+
+@pytest.fixture(scope="module")
+def seeded(client, admin_headers):
+    for index, text in enumerate(TEXTS):
+        body = {
+            "title": text or "t", "description": text or None, "price": FLOATS[index], "location": "Berlin",
+            "number_of_bedrooms": index, "latitude": None if index % 2 else 1 / 3, "longitude": None,
+        }
+        created = client.post("/properties/", json=body, headers=admin_headers)
+        assert created.status_code == 200
+        tenant = client.post("/tenants/", json={"name": text or "t", "email": f"golden{index}@example.com"})
+        assert tenant.status_code == 200
+        application = {"tenant_id": tenant.json()["id"], "property_id": created.json()["id"]}
+        assert client.post("/applications/", json=application, headers=admin_headers).status_code == 200
+        user = {"username": f"{text or 'u'}{index}", "email": f"golden{index}@example.com", "password": "secret-pw"}
+        assert client.post("/auth/users/", json=user).status_code == 200
+
+
+@pytest.mark.parametrize("path", ["/properties/", "/tenants/", "/applications/", "/admin/users/"])
+def test_endpoints_identical_with_fast_path_on_and_off(client, admin_headers, seeded, monkeypatch, path):
+    encoded = []
+    encode_rows = fastjson.encode_rows
+    monkeypatch.setattr(fastjson, "encode_rows", lambda rows, schema: encoded.append(schema) or encode_rows(rows, schema))
+    bodies = []
+    for fast in (False, True):
+        monkeypatch.setattr(fastjson, "FAST_LIST_RESPONSES", fast)
+        response_cache.invalidate("properties", "tenants")
+        response = client.get(path, params={"limit": 100}, headers=admin_headers)
+        assert response.status_code == 200
+        bodies.append(response.content)
+    assert encoded, "the fast path was not taken"
+    assert bodies[0] == bodies[1]
+    assert len(response.json()) > 1
+
+
+def test_endpoint_falls_back_for_large_floats(client, admin_headers, property_payload, monkeypatch):
+    client.post("/properties/", json=property_payload(price=1e17), headers=admin_headers)
+    bodies = []
+    for fast in (False, True):
+        monkeypatch.setattr(fastjson, "FAST_LIST_RESPONSES", fast)
+        response_cache.invalidate("properties")
+        bodies.append(client.get("/properties/", params={"limit": 100, "sort": "-price"}).content)
+    assert bodies[0] == bodies[1]
+    assert b"1e+17" in bodies[1]
@@ -0,0 +1,15 @@
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+from app import metrics
+
+
+def test_failed_statements_do_not_leak_start_times():
+    engine = metrics.instrument_engine(create_engine("sqlite://"))
+    with engine.connect() as conn:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text("SELECT * FROM missing_table"))
+        assert conn.info["query_start"] == []
+        assert conn.execute(text("SELECT 1")).scalar() == 1
+        assert conn.info["query_start"] == []
@@ -0,0 +1,37 @@
+from sqlalchemy import inspect, text
+from app import cli, database
+
+# The tables as the first release created them
+BASELINE_SCHEMA = [
+    "CREATE TABLE users (id INTEGER PRIMARY KEY, username VARCHAR, email VARCHAR, hashed_password VARCHAR, "
+    "is_active BOOLEAN, is_admin BOOLEAN)",
+    "CREATE TABLE properties (id INTEGER PRIMARY KEY, title VARCHAR, description VARCHAR, price FLOAT, "
+    "location VARCHAR, number_of_bedrooms INTEGER, owner_id INTEGER REFERENCES users (id))",
+    "CREATE TABLE tenants (id INTEGER PRIMARY KEY, name VARCHAR, email VARCHAR, user_id INTEGER REFERENCES users (id))",
+    "CREATE TABLE rental_applications (id INTEGER PRIMARY KEY, tenant_id INTEGER REFERENCES tenants (id), "
+    "property_id INTEGER REFERENCES properties (id), status VARCHAR, submission_date DATETIME)",
+    "INSERT INTO users VALUES (1, 'old', 'old@example.com', 'x', 1, 0)",
+    "INSERT INTO properties VALUES (1, 'Old flat', NULL, 900, 'Berlin', 2, 1)",
+]
+
+
+def test_migrate_upgrades_a_baseline_database(tmp_path):
+    engine = database.create_db_engine(f"sqlite:///{tmp_path}/baseline.db")
+    with engine.begin() as connection:
+        for statement in BASELINE_SCHEMA:
+            connection.exec_driver_sql(statement)
+
+    cli.migrate(bind=engine)
+    cli.migrate(bind=engine)
+
+    inspector = inspect(engine)
+    columns = {column["name"] for column in inspector.get_columns("properties")}
+    assert {"latitude", "longitude", "version", "deleted_at"} <= columns
+    assert "token_version" in {column["name"] for column in inspector.get_columns("users")}
+    assert "ix_properties_location_price" in {index["name"] for index in inspector.get_indexes("properties")}
+    assert "uq_rental_applications_pending" in {index["name"] for index in inspector.get_indexes("rental_applications")}
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT version, deleted_at FROM properties")).one() == (1, None)
+        assert connection.execute(text("SELECT token_version FROM users")).scalar() == 0
+        # The backfilled row is live and searchable
+        assert connection.execute(text("SELECT count(*) FROM properties_fts")).scalar() == 1
@@ -0,0 +1,87 @@
+import base64
+import json
+
+import pytest
+
+
+@pytest.fixture
+def listing(client, make_user, property_payload):
+    owner = make_user()
+    created = client.post("/properties/", json=property_payload(), headers=owner).json()
+    return owner, created
+
+
+@pytest.mark.parametrize("field", ["title", "price", "location", "number_of_bedrooms"])
+def test_update_rejects_null_for_required_fields(client, listing, field):
+    owner, created = listing
+    response = client.put(f"/properties/{created['id']}", json={field: None}, headers=owner)
+    assert response.status_code == 422
+    current = client.get(f"/properties/{created['id']}", headers=owner)
+    assert current.status_code == 200
+    assert current.json()["version"] == created["version"]
+
+
+def test_update_can_clear_optional_fields(client, listing):
+    owner, created = listing
+    response = client.put(f"/properties/{created['id']}", json={"description": None}, headers=owner)
+    assert response.status_code == 200
+    assert response.json()["description"] is None
+
+
+def test_update_requires_owner_or_admin(client, listing, make_user, admin_headers):
+    owner, created = listing
+    path = f"/properties/{created['id']}"
+    assert client.put(path, json={"title": "Anonymous"}).status_code == 401
+    assert client.put(path, json={"title": "Stranger"}, headers=make_user()).status_code == 403
+    assert client.put(path, json={"title": "Owner"}, headers=owner).json()["title"] == "Owner"
+    assert client.put(path, json={"title": "Admin"}, headers=admin_headers).json()["title"] == "Admin"
+    assert client.put("/properties/999999999", json={"title": "Gone"}, headers=owner).status_code == 404
+
+
+def _cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("params", [
+    {"cursor": _cursor(["id", None, None])},
+    {"cursor": _cursor(["id", None, [1]])},
+    {"cursor": _cursor(["id", None, "abc"])},
+    {"cursor": _cursor(["id", None, True])},
+    {"cursor": _cursor(["id", None])},
+    {"cursor": _cursor({"a": 1, "b": 2, "c": 3})},
+    {"cursor": _cursor([1, None, 1])},
+    {"cursor": _cursor(["price", "cheap", 1]), "sort": "price"},
+    {"cursor": _cursor(["price", None, 1]), "sort": "price"},
+    {"cursor": _cursor(["bedrooms", 2.5, 1]), "sort": "bedrooms"},
+    {"cursor": "not base64 at all!"},
+    {"cursor": _cursor("nope")},
+])
+def test_malformed_cursor_is_400(client, params):
+    response = client.get("/properties/", params=params)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+def test_cursor_pages_through_by_price(client, make_user, property_payload):
+    owner = make_user()
+    for price in (100.5, 200, 300.25):
+        client.post("/properties/", json=property_payload(location="Cursorville", price=price), headers=owner)
+    first = client.get("/properties/", params={"location": "Cursorville", "sort": "price", "limit": 2})
+    second = client.get(
+        "/properties/",
+        params={"location": "Cursorville", "sort": "price", "limit": 2, "cursor": first.headers["X-Next-Cursor"]},
+    )
+    assert [item["price"] for item in first.json() + second.json()] == [100.5, 200, 300.25]
+
+
+def test_nearby_returns_the_closest_first(client, make_user, property_payload):
+    owner = make_user()
+    ids = [
+        client.post(
+            "/properties/", json=property_payload(latitude=-33.0 + offset, longitude=151.0), headers=owner
+        ).json()["id"]
+        for offset in (0.03, 0.01, 0.02, 1.0)
+    ]
+    response = client.get("/properties/nearby", params={"lat": -33.0, "lon": 151.0, "radius_km": 10, "limit": 2})
+    assert [item["id"] for item in response.json()] == [ids[1], ids[2]]
+    assert response.json()[0]["distance_km"] < response.json()[1]["distance_km"]
@@ -0,0 +1,59 @@
+import sqlite3
+import pytest
+from app import database, replicas
+from app.cache import response_cache
+
+
+@pytest.fixture
+def lagging_replica(monkeypatch, db_dir):
+    """Route replica reads to a snapshot of the primary; call the fixture to take it."""
+    path = f"{db_dir}/replica.db"
+    engine = database.create_async_db_engine(f"sqlite:///{path}")
+
+    def snapshot():
+        with sqlite3.connect(f"{db_dir}/primary.db") as primary, sqlite3.connect(path) as replica:
+            primary.backup(replica)
+
+    monkeypatch.setattr(replicas, "async_replica_engines", [engine])
+    monkeypatch.setitem(database.AsyncSessionLocal.kw, "replicas", [engine.sync_engine])
+    yield snapshot
+
+
+def test_writer_reads_own_write_after_replica_read(client, make_user, property_payload, lagging_replica):
+    writer, reader = make_user(), make_user()
+    client.post("/properties/", json=property_payload(title="Before"), headers=writer)
+    lagging_replica()
+
+    created = client.post("/properties/", json=property_payload(title="After"), headers=writer).json()
+
+    # Another client's read is served by the replica, which hasn't seen the write
+    other = client.get("/properties/", params={"limit": 100}, headers=reader)
+    assert created["id"] not in [item["id"] for item in other.json()]
+
+    # The writer is pinned to the primary and must not get that response from the cache
+    own = client.get("/properties/", params={"limit": 100}, headers=writer)
+    assert created["id"] in [item["id"] for item in own.json()]
+    assert client.get(f"/properties/{created['id']}", headers=writer).status_code == 200
+
+
+def test_primary_reads_still_fill_the_cache(client, make_user, property_payload):
+    writer = make_user()
+    created = client.post("/properties/", json=property_payload(title="Cached"), headers=writer).json()
+    path = f"/properties/{created['id']}"
+    client.get(path)
+    assert response_cache.get(response_cache.key("properties", f"{path}?")) is not None
+
+
+def test_replica_reads_fill_the_cache(client, make_user, property_payload, lagging_replica, db_dir):
+    writer, reader = make_user(), make_user()
+    created = client.post("/properties/", json=property_payload(title="Replicated"), headers=writer).json()
+    lagging_replica()
+    path = f"/properties/{created['id']}"
+
+    assert client.get(path, headers=reader).json()["title"] == "Replicated"
+    assert response_cache.get(response_cache.key("properties", f"{path}?")) is not None
+
+    # Change the replica behind the cache's back: the next read is a hit
+    with sqlite3.connect(f"{db_dir}/replica.db") as replica:
+        replica.execute("UPDATE properties SET title = 'Changed' WHERE id = ?", (created["id"],))
+    assert client.get(path, headers=reader).json()["title"] == "Replicated"
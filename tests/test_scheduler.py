@@ -0,0 +1,53 @@
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+from app import cli, database, models
+from app.scheduler import Scheduler, scheduler
+
+
+def _session_factory(tmp_path):
+    engine = database.create_db_engine(f"sqlite:///{tmp_path}/scheduler.db")
+    database.Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)
+
+
+def _job_names(session_factory):
+    with session_factory() as db:
+        return sorted(db.scalars(select(models.ScheduledJob.name)))
+
+
+def test_migrate_seeds_job_rows(tmp_path):
+    engine = database.create_db_engine(f"sqlite:///{tmp_path}/migrated.db")
+    cli.migrate(bind=engine)
+    cli.migrate(bind=engine)
+    assert _job_names(sessionmaker(bind=engine)) == sorted(scheduler.jobs)
+
+
+def test_workers_booting_together_do_not_collide(tmp_path):
+    session_factory = _session_factory(tmp_path)
+    other = Scheduler(session_factory=session_factory)
+
+    class RacingScheduler(Scheduler):
+        def _insert_missing(self, db, rows):
+            # The other worker inserts between our read and our insert
+            with session_factory() as other_db:
+                other.ensure_rows(other_db)
+            super()._insert_missing(db, rows)
+
+    racing = RacingScheduler(session_factory=session_factory)
+    for worker in (other, racing):
+        worker.register("job", 60, lambda db, context: 0)
+    with session_factory() as db:
+        racing.ensure_rows(db)
+    with session_factory() as db:
+        assert db.scalar(select(func.count()).select_from(models.ScheduledJob)) == 1
+
+
+def test_interval_changes_are_synced(tmp_path):
+    session_factory = _session_factory(tmp_path)
+    for interval in (60, 120):
+        worker = Scheduler(session_factory=session_factory)
+        worker.register("job", interval, lambda db, context: 0)
+        with session_factory() as db:
+            worker.ensure_rows(db)
+    with session_factory() as db:
+        assert db.scalar(select(models.ScheduledJob.interval_seconds)) == 120
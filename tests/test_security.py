@@ -0,0 +1,56 @@
+from app import security
+from app.cache import LocalSharedBackend, PrincipalCache, principal_cache
+
+
+def _claims(headers):
+    token = headers["Authorization"].split()[1]
+    return security.jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
+
+
+def _login(client, username):
+    token = client.post("/auth/token", data={"username": username, "password": "secret-pw"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_role_comes_from_claims_and_change_revokes_token(client, make_user, admin_headers):
+    headers = make_user()
+    claims = _claims(headers)
+    user_id, username = claims["uid"], claims["sub"]
+    assert client.get("/admin/analytics/", headers=headers).status_code == 403
+
+    assert client.put(f"/admin/users/{user_id}/role", params={"role": "admin"}, headers=admin_headers).status_code == 200
+    # The old token says adm=false and carries the old version
+    assert client.get("/admin/analytics/", headers=headers).status_code == 401
+    assert client.get("/admin/analytics/", headers=_login(client, username)).status_code == 200
+
+
+def test_only_the_version_is_cached(client, make_user):
+    headers = make_user()
+    user_id = _claims(headers)["uid"]
+    principal_cache.pop(user_id)
+    assert client.get("/applications/mine", headers=headers).status_code == 200
+    assert principal_cache.get(user_id) == 0
+
+
+def test_tokens_without_role_claims_use_the_user_row(client, admin_headers):
+    claims = _claims(admin_headers)
+    legacy = security.create_access_token({"sub": claims["sub"], "uid": claims["uid"], "ver": claims["ver"]})
+    response = client.get("/admin/analytics/", headers={"Authorization": f"Bearer {legacy}"})
+    assert response.status_code == 200
+
+
+def test_shared_principal_cache_drops_the_version_for_every_worker():
+    shared = LocalSharedBackend()
+    worker_a, worker_b = PrincipalCache(shared=shared), PrincipalCache(shared=shared)
+    worker_a.set(7, 3)
+    assert worker_b.get(7) == 3
+    worker_b.pop(7)
+    assert worker_a.get(7) is None
+
+
+def test_admin_versions_expire_sooner():
+    cache = PrincipalCache(ttl=60, admin_ttl=0)
+    cache.set(1, 0)
+    cache.set(2, 0, is_admin=True)
+    assert cache.get(1) == 0
+    assert cache.get(2) is None